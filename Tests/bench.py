@@ -0,0 +1,228 @@
+"""
+Offline benchmark suite for the GitHub tools and the agent team.
+
+Every fixture of `Tests/stubs.py` is replayed through a local GitHub GraphQL
+stub, and the agents run against a stub OpenAI endpoint, so no network or
+API keys are needed. Reports per-tool latency, peak allocations and output
+tokens plus end-to-end agent turn latency and prompt tokens, and fails when
+a metric regresses past the stored baseline.
+
+    python Tests/bench.py                    # run and compare with Tests/bench_baseline.json
+    python Tests/bench.py --update-baseline  # store the current numbers as the baseline
+"""
+import argparse, json, os, sys, time, tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stubs import FIXTURES, StubGitHubServer, StubOpenAIServer, estimate_tokens
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+
+# Allowed regression per metric kind, as a fraction of the baseline
+TOLERANCES = {"ms": 0.5, "kb": 0.2, "tokens": 0.1, "requests": 0.0}
+# Latency differences below this many milliseconds are noise
+MIN_MS_REGRESSION = 5.0
+
+TOOLS = ["get_full_profile", "get_user_stats", "get_repo_stats", "get_contribution_stats", "get_contribution_history"]
+
+def configure_environment(github_url: str, openai_url: str):
+  """
+  Point the fetch layer and the agents at the stubs, before they are imported.
+  """
+  os.environ["GITHUB_GRAPHQL_URL"] = github_url
+  os.environ["GITHUB_ACCESS_TOKEN"] = "stub-token"
+  os.environ["GITHUB_CACHE_URL"] = ""
+  os.environ["GITHUB_BUDGET_PATH"] = ""
+  os.environ["ANSWER_CACHE_URL"] = ""
+  os.environ["OPENAI_BASE_URL"] = f"{openai_url}/v1"
+  os.environ["OPENAI_API_KEY"] = "stub-key"
+
+def reset_state():
+  """
+  Start every measurement cold: empty response cache.
+  """
+  from github_tools.cache import get_cache
+  get_cache().clear()
+
+def measure(function, *args, repeat: int = 3) -> dict:
+  """
+  Best wall time in ms over `repeat` cold runs, then peak traced allocations in KB of one more run.
+  """
+  timings = []
+  for _ in range(repeat):
+    reset_state()
+    start = time.perf_counter()
+    result = function(*args)
+    timings.append((time.perf_counter() - start) * 1000)
+
+  reset_state()
+  tracemalloc.start()
+  function(*args)
+  _, peak = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+  return {"ms": min(timings), "kb": peak / 1024, "result": result}
+
+def bench_tools(github: StubGitHubServer, repeat: int) -> dict:
+  from github_tools import github_tools
+
+  metrics = {}
+  for fixture_name, fixture in FIXTURES.items():
+    for tool_name in TOOLS:
+      tool = getattr(github_tools, tool_name)
+      before = len(github.requests)
+      run = measure(tool, fixture.login, repeat=repeat)
+      key = f"{fixture_name}/{tool_name}"
+      metrics[f"{key}/ms"] = run["ms"]
+      metrics[f"{key}/kb"] = run["kb"]
+      metrics[f"{key}/tokens"] = estimate_tokens(str(run["result"]))
+      metrics[f"{key}/requests"] = (len(github.requests) - before) / (repeat + 1)
+  return metrics
+
+# Turns of the long session benchmark
+SESSION_TURNS = 12
+# Concurrent chat sessions of the serving benchmark, and the stub model's latency per call
+SERVING_SESSIONS = 8
+SERVING_MODEL_DELAY = 0.05
+
+def fresh_agent():
+  """
+  New agent team, so no chat history carries over from earlier measurements.
+  """
+  import github_agent
+  for factory in (github_agent.get_stats_agent, github_agent.get_main_agent):
+    factory.cache_clear()
+  agent = github_agent.get_main_agent()
+  for member in [agent, *agent.team]:
+    member.debug_mode = False
+  return agent
+
+def bench_agents(openai: StubOpenAIServer, repeat: int) -> dict:
+  metrics = {}
+  for fixture_name, fixture in FIXTURES.items():
+    openai.username = fixture.login
+    timings, tokens = [], []
+    for _ in range(repeat):
+      reset_state()
+      agent = fresh_agent()
+
+      before = len(openai.prompt_tokens)
+      start = time.perf_counter()
+      agent.run(f"Show me the GitHub stats of {fixture.login}")
+      timings.append((time.perf_counter() - start) * 1000)
+      tokens.append(sum(openai.prompt_tokens[before:]))
+
+    metrics[f"{fixture_name}/agent_turn/ms"] = min(timings)
+    metrics[f"{fixture_name}/agent_turn/tokens"] = max(tokens)
+  metrics.update(bench_session(openai))
+  metrics.update(bench_serving(openai))
+  return metrics
+
+def bench_session(openai: StubOpenAIServer) -> dict:
+  """
+  Latency and prompt tokens of the last turn of a long chat session, which grow with unbounded history.
+  """
+  fixture = FIXTURES["years-10"]
+  openai.username = fixture.login
+  reset_state()
+  agent = fresh_agent()
+  for _ in range(SESSION_TURNS):
+    before = len(openai.prompt_tokens)
+    start = time.perf_counter()
+    agent.run(f"Show me the contribution stats of {fixture.login}")
+    elapsed = (time.perf_counter() - start) * 1000
+  return {
+    f"session/turn_{SESSION_TURNS}/ms": elapsed,
+    f"session/turn_{SESSION_TURNS}/tokens": max(openai.prompt_tokens[before:]),
+  }
+
+def bench_serving(openai: StubOpenAIServer) -> dict:
+  """
+  Wall time of one turn in each of `SERVING_SESSIONS` sessions at once, with a slow model.
+
+  With enough slots this stays close to a single turn instead of growing with the number of sessions.
+  """
+  import github_agent
+  from serving import AgentServer
+
+  def build():
+    agent = github_agent.build_main_agent()
+    for member in [agent, *agent.team]:
+      member.debug_mode = False
+    return agent
+
+  fixture = FIXTURES["small"]
+  openai.username = fixture.login
+  openai.delay = SERVING_MODEL_DELAY
+  reset_state()
+  server = AgentServer(build, max_concurrency=SERVING_SESSIONS)
+  # Warm up the agent pool, building the agents is not what is measured
+  for turn in [server.submit(f"session-{i}", "Hi") for i in range(SERVING_SESSIONS)]:
+    list(turn)
+
+  start = time.perf_counter()
+  turns = [server.submit(f"session-{i}", f"Show me the GitHub stats of {fixture.login}") for i in range(SERVING_SESSIONS)]
+  for turn in turns:
+    list(turn)
+  elapsed = (time.perf_counter() - start) * 1000
+  openai.delay = 0.0
+  return {f"serving/{SERVING_SESSIONS}_sessions/ms": elapsed}
+
+def compare(metrics: dict, baseline: dict) -> list:
+  """
+  Return a description of every metric that regressed past its tolerance.
+  """
+  regressions = []
+  for key, value in metrics.items():
+    if key not in baseline:
+      continue
+    base = baseline[key]
+    kind = key.rsplit("/", 1)[1]
+    limit = base * (1 + TOLERANCES[kind])
+    if kind == "ms":
+      limit = max(limit, base + MIN_MS_REGRESSION)
+    if value > limit:
+      regressions.append(f"{key}: {value:.1f} > {limit:.1f} (baseline {base:.1f})")
+  return regressions
+
+def main(argv=None) -> int:
+  parser = argparse.ArgumentParser(description="Offline benchmarks for the GitHub tools and agents.")
+  parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement, the best one counts")
+  parser.add_argument("--skip-agents", action="store_true", help="Only benchmark the tools")
+  parser.add_argument("--update-baseline", action="store_true", help="Store the results as the new baseline")
+  parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline JSON file")
+  args = parser.parse_args(argv)
+
+  with StubGitHubServer() as github, StubOpenAIServer() as openai:
+    configure_environment(github.url, openai.url)
+    metrics = bench_tools(github, args.repeat)
+    if not args.skip_agents:
+      metrics.update(bench_agents(openai, args.repeat))
+
+  width = max(map(len, metrics))
+  for key, value in metrics.items():
+    print(f"{key:<{width}}  {value:10.1f}")
+
+  if args.update_baseline:
+    with open(args.baseline, "w", encoding="UTF-8") as file:
+      json.dump({key: round(value, 2) for key, value in metrics.items()}, file, indent=2, sort_keys=True)
+      file.write("\n")
+    print(f"\nBaseline written to {args.baseline}")
+    return 0
+
+  if not os.path.exists(args.baseline):
+    print(f"\nNo baseline at {args.baseline}, run with --update-baseline first")
+    return 0
+  with open(args.baseline, "r", encoding="UTF-8") as file:
+    regressions = compare(metrics, json.load(file))
+  if regressions:
+    print("\nRegressions:")
+    for regression in regressions:
+      print(f"  {regression}")
+    return 1
+  print("\nNo regressions")
+  return 0
+
+if __name__ == "__main__":
+  sys.exit(main())
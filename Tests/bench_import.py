@@ -0,0 +1,60 @@
+"""
+Import-time guard for the agent entry points.
+
+Runs `python -X importtime` in a fresh interpreter for each module, reports
+the cumulative import time and fails when it exceeds the budget or when a
+heavy dependency is imported eagerly.
+
+    python Tests/bench_import.py [--budget-ms 300]
+"""
+import argparse, os, subprocess, sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must only be imported when an agent or the Playground is built
+LAZY_MODULES = ("agno.playground", "agno.agent", "agno.models.openai", "fastapi", "openai")
+
+CHECKS = {
+  "github_agent": 150,
+  "fast_path": 600,
+}
+
+def import_times(module: str) -> dict:
+  """
+  Import `module` in a fresh interpreter and return {imported module: cumulative microseconds}.
+  """
+  result = subprocess.run(
+    [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+    cwd=ROOT, capture_output=True, text=True, check=True,
+  )
+  times = {}
+  for line in result.stderr.splitlines():
+    if not line.startswith("import time:") or "|" not in line:
+      continue
+    _, cumulative, name = line[len("import time:"):].split("|")
+    if cumulative.strip().isdigit():
+      times[name.strip()] = int(cumulative)
+  return times
+
+def main(argv=None) -> int:
+  parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+  parser.add_argument("--budget-ms", type=float, help="Budget for every module, overrides the defaults")
+  parser.add_argument("--runs", type=int, default=3, help="Take the best of this many runs")
+  args = parser.parse_args(argv)
+
+  failed = False
+  for module, budget in CHECKS.items():
+    budget = args.budget_ms or budget
+    runs = [import_times(module) for _ in range(args.runs)]
+    best = min(run.get(module, 0) for run in runs) / 1000
+    eager = sorted(name for name in runs[0] if name in LAZY_MODULES)
+
+    ok = best <= budget and not eager
+    failed |= not ok
+    print(f"{'OK  ' if ok else 'FAIL'} import {module}: {best:.1f} ms (budget {budget:.0f} ms)")
+    for name in eager:
+      print(f"     eagerly imports {name}")
+  return 1 if failed else 0
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -0,0 +1,411 @@
+"""
+Local stand-ins for the GitHub GraphQL API and the OpenAI chat completions API.
+
+The GitHub stub replays deterministic responses generated from a `Fixture`
+(a small user, a 100-repo user, a 1000-repo org, a 10-year calendar, ...)
+and answers every query the fetch layer sends: combined profile queries,
+repository and language pages, yearly contribution windows and aliased
+bulk queries. The OpenAI stub speaks just enough of `/v1/chat/completions`
+to drive the agents: it calls the first tool it is offered once, then answers.
+"""
+import json, os, random, re, socket, threading, time
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+LANGUAGES = ["Python", "JavaScript", "TypeScript", "Go", "Rust", "C", "C++", "Java", "Shell", "HTML", "CSS", "Dockerfile"]
+
+@dataclass
+class Fixture:
+  """
+  Shape of a synthetic GitHub account.
+
+  Args:
+    login (str): Username the fixture answers to.
+    repositories (int): Number of owned repositories.
+    languages_per_repo (int): Languages of a normal repository.
+    wide_repositories (int): Repositories with more than 100 languages, to exercise language paging.
+    years (int): Years since the account was created.
+    seed (int): Seed of the generated counts.
+    pushes (dict): Repository index -> pushes since the fixture was created, see `push`.
+  """
+  login: str
+  repositories: int
+  languages_per_repo: int = 3
+  wide_repositories: int = 0
+  years: int = 1
+  seed: int = 1
+  pushes: dict = field(default_factory=dict)
+
+  @property
+  def created_at(self) -> str:
+    return f"{date.today().year - self.years + 1}-01-15T10:00:00Z"
+
+  def day_count(self, day: date) -> int:
+    # Deterministic and cheap: hash the day with the seed
+    value = hash((self.seed, day.toordinal())) % 10
+    return 0 if value < 4 else value - 3
+
+  def calendar(self, start: date, end: date) -> dict:
+    days = []
+    day = start
+    while day <= end:
+      days.append({"contributionCount": self.day_count(day), "date": day.isoformat()})
+      day += timedelta(days=1)
+    weeks = [{"contributionDays": days[i:i + 7]} for i in range(0, len(days), 7)]
+    return {"totalContributions": sum(d["contributionCount"] for d in days), "weeks": weeks}
+
+  def push(self, index: int):
+    """
+    Simulate a push to a repository: it gets a new `pushedAt` and different languages.
+    """
+    self.pushes[index] = self.pushes.get(index, 0) + 1
+
+  def pushed_at(self, index: int) -> str:
+    day = date(2020, 1, 1) + timedelta(days=index % 1000 + 1000 * self.pushes.get(index, 0))
+    return f"{day.isoformat()}T12:00:00Z"
+
+  def languages(self, index: int, after: int = 0) -> dict:
+    if index < self.wide_repositories:
+      names = [f"Lang{i}" for i in range(150)]
+    else:
+      rng = random.Random(self.seed * 100003 + index + 7919 * self.pushes.get(index, 0))
+      names = rng.sample(LANGUAGES, min(self.languages_per_repo, len(LANGUAGES)))
+    page = names[after:after + 100]
+    edges = [{"node": {"name": name, "color": "#3572A5"}, "size": 1000 * (len(names) - after - i)} for i, name in enumerate(page)]
+    return {
+      "totalCount": len(names),
+      "totalSize": sum(edge["size"] for edge in edges),
+      "pageInfo": {"hasNextPage": after + 100 < len(names), "endCursor": str(after + 100)},
+      "edges": edges,
+    }
+
+  def repositories_page(self, after: int = 0) -> dict:
+    end = min(after + 100, self.repositories)
+    return {
+      "totalCount": self.repositories,
+      "pageInfo": {"hasNextPage": end < self.repositories, "endCursor": str(end)},
+      "edges": [{"node": self.repository(i)} for i in range(after, end)],
+    }
+
+  def repository(self, index: int) -> dict:
+    pushed_at = self.pushed_at(index)
+    return {"name": f"repo-{index}", "pushedAt": pushed_at, "updatedAt": pushed_at, "languages": self.languages(index)}
+
+  def listing_page(self, after: int = 0) -> dict:
+    end = min(after + 100, self.repositories)
+    return {
+      "totalCount": self.repositories,
+      "pageInfo": {"hasNextPage": end < self.repositories, "endCursor": str(end)},
+      "nodes": [{"name": f"repo-{i}", "pushedAt": self.pushed_at(i), "updatedAt": self.pushed_at(i)} for i in range(after, end)],
+    }
+
+  def user(self) -> dict:
+    today = date.today()
+    collection = {
+      "totalCommitContributions": 321,
+      "totalPullRequestContributions": 45,
+      "totalIssueContributions": 6,
+      "restrictedContributionsCount": 12,
+      "contributionCalendar": self.calendar(today - timedelta(days=364), today),
+    }
+    return {
+      "name": self.login.title(),
+      "bio": "Synthetic benchmark account",
+      "location": "Localhost",
+      "createdAt": self.created_at,
+      "avatarUrl": f"https://avatars.example.com/{self.login}",
+      "followers": {"totalCount": 42},
+      "following": {"totalCount": 7},
+      "repositoryCount": {"totalCount": self.repositories},
+      "contributionsCollection": collection,
+      "repositories": self.repositories_page(),
+    }
+
+  def year(self, year: int) -> dict:
+    today = date.today()
+    end = min(date(year, 12, 31), today)
+    return {"user": {"contributionsCollection": {
+      "restrictedContributionsCount": 1,
+      "contributionCalendar": self.calendar(date(year, 1, 1), end),
+    }}}
+
+FIXTURES = {
+  "small": Fixture("small-user", repositories=5, years=1, seed=1),
+  "repos-100": Fixture("hundred-repos", repositories=100, languages_per_repo=5, years=3, seed=2),
+  "org-1000": Fixture("big-org", repositories=1000, languages_per_repo=4, wide_repositories=2, years=5, seed=3),
+  "years-10": Fixture("veteran", repositories=30, years=10, seed=4),
+}
+
+class _StubServer:
+  """
+  Threaded HTTP server on a free localhost port, usable as a context manager.
+  """
+
+  def __init__(self, handler):
+    self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    self.server.stub = self
+    self.requests = []
+    self.delay = 0.0
+    self._lock = threading.Lock()
+
+  @property
+  def url(self) -> str:
+    return f"http://127.0.0.1:{self.server.server_port}"
+
+  def record(self, payload: dict):
+    with self._lock:
+      self.requests.append(payload)
+
+  def __enter__(self):
+    threading.Thread(target=self.server.serve_forever, daemon=True).start()
+    return self
+
+  def __exit__(self, *exc):
+    self.server.shutdown()
+    self.server.server_close()
+
+class _JSONHandler(BaseHTTPRequestHandler):
+  protocol_version = "HTTP/1.1"
+
+  def setup(self):
+    super().setup()
+    # Headers and body are written separately, without this Nagle adds ~40 ms per response
+    self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+  def log_message(self, *args):
+    pass
+
+  def read_json(self) -> dict:
+    return json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+
+  def send_json(self, payload, status=200, headers=None):
+    body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+    self.send_response(status)
+    self.send_header("Content-Type", "application/json")
+    self.send_header("Content-Length", str(len(body)))
+    for name, value in (headers or {}).items():
+      self.send_header(name, value)
+    self.end_headers()
+    self.wfile.write(body)
+
+class _GitHubHandler(_JSONHandler):
+
+  def do_POST(self):
+    stub = self.server.stub
+    payload = self.read_json()
+    stub.record(payload)
+    if stub.delay:
+      time.sleep(stub.delay)
+    rate_limit = {
+      "X-RateLimit-Remaining": str(stub.remaining),
+      "X-RateLimit-Reset": str(int(time.time() + stub.reset_in)),
+    }
+    failure = stub.next_failure()
+    if failure is not None:
+      status, headers, body = failure
+      self.send_json(body or {"message": f"Stub failure {status}"}, status=status, headers=dict(rate_limit, **headers))
+      return
+    query, variables = payload["query"], payload.get("variables") or {}
+    data = stub.answer(query, variables)
+    body = {"data": data}
+    # Like GitHub, unknown users and repositories come with a NOT_FOUND error next to the other data
+    missing = [alias for alias, value in data.items() if value is None]
+    if missing:
+      body["errors"] = [{"type": "NOT_FOUND", "path": [alias], "message": f"Could not resolve to a node for '{alias}'."} for alias in missing]
+    self.send_json(body, headers=rate_limit)
+
+class StubGitHubServer(_StubServer):
+  """
+  GraphQL endpoint answering from the fixtures, keyed by login.
+
+  Args:
+    fixtures (iterable): Fixtures to serve, all of `FIXTURES` by default.
+
+  Attributes:
+    failures (list): (status, headers, body) answered to the next requests instead of data, see `fail`.
+    remaining (int): `X-RateLimit-Remaining` of every response.
+    reset_in (float): Seconds until the `X-RateLimit-Reset` of every response.
+  """
+
+  def __init__(self, fixtures=None):
+    super().__init__(_GitHubHandler)
+    self.fixtures = {fixture.login.lower(): fixture for fixture in (fixtures or FIXTURES.values())}
+    self.failures = []
+    self.remaining = 4999
+    self.reset_in = 3600
+
+  def fail(self, status: int, headers: dict = None, times: int = 1, body: dict = None):
+    """
+    Answer the next `times` requests with `status`, extra `headers` and `body`, e.g. 502,
+    a 403 with Retry-After or a 200 with `{"data": None, "errors": [...]}`. A bytes
+    `body` is sent as is, e.g. a cut off response.
+    """
+    with self._lock:
+      self.failures += [(status, headers or {}, body)] * times
+
+  def next_failure(self):
+    with self._lock:
+      return self.failures.pop(0) if self.failures else None
+
+  def answer(self, query: str, variables: dict) -> dict:
+    aliased = re.findall(r"(\w+):\s*repository\(owner:\s*\$login,\s*name:\s*\$(\w+)\)", query)
+    if aliased:
+      fixture = self.fixtures[variables["login"].lower()]
+      data = {alias: self._repository_languages(fixture, variables[variable]) for alias, variable in aliased}
+      data["rateLimit"] = {"cost": 1, "remaining": 4999, "resetAt": "2099-01-01T00:00:00Z"}
+      return data
+    if "repository(owner:" in query:
+      fixture = self.fixtures[variables["login"].lower()]
+      index = int(variables["name"].split("-")[1])
+      return {"repository": {"languages": fixture.languages(index, int(variables["after"]))}}
+    if "contributionsCollection(from:" in query:
+      return self.fixtures[variables["login"].lower()].year(int(variables["from"][:4]))
+    if "after: $after" in query and "languages" not in query:
+      fixture = self.fixtures[variables["login"].lower()]
+      return {"user": {"repositories": fixture.listing_page(int(variables["after"] or 0))}}
+    if "after: $after" in query:
+      fixture = self.fixtures[variables["login"].lower()]
+      return {"user": {"repositories": fixture.repositories_page(int(variables["after"] or 0))}}
+
+    data = {}
+    for alias, variable in re.findall(r"(\w+):\s*user\(login:\s*\$(\w+)\)", query) or [("user", "login")]:
+      fixture = self.fixtures.get(variables[variable].lower())
+      data[alias] = fixture.user() if fixture else None
+    if "rateLimit" in query:
+      data["rateLimit"] = {"cost": len(data), "remaining": 4999, "resetAt": "2099-01-01T00:00:00Z"}
+    return data
+
+  @staticmethod
+  def _repository_languages(fixture: Fixture, name: str):
+    index = int(name.split("-")[1])
+    if index >= fixture.repositories:
+      return None
+    return {"languages": fixture.languages(index)}
+
+_shared_github = None
+
+def shared_github_server(*fixtures) -> StubGitHubServer:
+  """
+  The process wide GitHub stub, started and configured as `GITHUB_GRAPHQL_URL` on first use.
+
+  The GraphQL client reads its endpoint once, so test modules collected into
+  one pytest run must share a server. Extra fixtures are added to it.
+  """
+  global _shared_github
+  if _shared_github is None:
+    _shared_github = StubGitHubServer().__enter__()
+    os.environ["GITHUB_GRAPHQL_URL"] = _shared_github.url
+    os.environ["GITHUB_ACCESS_TOKEN"] = "stub-token"
+    os.environ["GITHUB_CACHE_URL"] = ""
+    os.environ["GITHUB_BUDGET_PATH"] = ""
+    os.environ["ANSWER_CACHE_URL"] = ""
+  for fixture in fixtures:
+    _shared_github.fixtures[fixture.login.lower()] = fixture
+  return _shared_github
+
+_shared_openai = None
+
+def shared_openai_server() -> "StubOpenAIServer":
+  """
+  The process wide model stub, started and configured as `OPENAI_BASE_URL` on first use.
+
+  The agents share one OpenAI client, which reads its endpoint once.
+  """
+  global _shared_openai
+  if _shared_openai is None:
+    _shared_openai = StubOpenAIServer().__enter__()
+    os.environ["OPENAI_BASE_URL"] = f"{_shared_openai.url}/v1"
+    os.environ["OPENAI_API_KEY"] = "stub-key"
+  return _shared_openai
+
+# Tool the stub model calls when it is offered several
+PREFERRED_TOOLS = ["get_full_profile", "get_contribution_stats", "get_user_stats", "get_repo_stats"]
+
+def estimate_tokens(text: str) -> int:
+  """
+  About 4 characters per token, close enough to compare prompt sizes between runs.
+  """
+  return len(text) // 4 + 1
+
+class _OpenAIHandler(_JSONHandler):
+
+  def do_POST(self):
+    stub = self.server.stub
+    payload = self.read_json()
+    stub.record(payload)
+    if stub.delay:
+      time.sleep(stub.delay)
+
+    messages = payload.get("messages", [])
+    prompt_tokens = sum(estimate_tokens(json.dumps(message.get("content") or "")) for message in messages)
+    stub.prompt_tokens.append(prompt_tokens)
+    message = stub.reply(payload)
+    usage = {"prompt_tokens": prompt_tokens, "completion_tokens": 20, "total_tokens": prompt_tokens + 20}
+
+    if payload.get("stream"):
+      self._send_stream(payload["model"], message, usage)
+    else:
+      self.send_json({
+        "id": "chatcmpl-stub", "object": "chat.completion", "created": int(time.time()), "model": payload["model"],
+        "choices": [{"index": 0, "message": message, "finish_reason": "tool_calls" if message.get("tool_calls") else "stop"}],
+        "usage": usage,
+      })
+
+  def _send_stream(self, model: str, message: dict, usage: dict):
+    def chunk(delta, finish_reason=None, usage=None):
+      body = {"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+              "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+      if usage:
+        body["usage"] = usage
+      return f"data: {json.dumps(body)}\n\n".encode()
+
+    if message.get("tool_calls"):
+      calls = [dict(call, index=i) for i, call in enumerate(message["tool_calls"])]
+      parts = [chunk({"role": "assistant", "tool_calls": calls}), chunk({}, "tool_calls", usage)]
+    else:
+      words = message["content"].split(" ")
+      parts = [chunk({"role": "assistant", "content": ""})]
+      parts += [chunk({"content": word + " "}) for word in words]
+      parts.append(chunk({}, "stop", usage))
+    body = b"".join(parts) + b"data: [DONE]\n\n"
+    self.send_response(200)
+    self.send_header("Content-Type", "text/event-stream")
+    self.send_header("Content-Length", str(len(body)))
+    self.end_headers()
+    self.wfile.write(body)
+
+class StubOpenAIServer(_StubServer):
+  """
+  OpenAI compatible `/v1/chat/completions` endpoint.
+
+  While the conversation has no tool result yet it calls the first offered
+  tool (delegating to a team member if it can), afterwards it answers with
+  a short fixed text.
+
+  Args:
+    username (str): Username passed to the GitHub stats tools.
+  """
+
+  def __init__(self, username: str = "small-user"):
+    super().__init__(_OpenAIHandler)
+    self.username = username
+    self.prompt_tokens = []
+
+  def reply(self, payload: dict) -> dict:
+    tools = [tool["function"]["name"] for tool in payload.get("tools") or []]
+    messages = payload.get("messages", [])
+    # Only the current turn counts, earlier turns come back as chat history
+    last_user = max((i for i, message in enumerate(messages) if message.get("role") == "user"), default=0)
+    called = any(message.get("role") == "tool" for message in messages[last_user:])
+    if tools and not called:
+      name = next((tool for tool in tools if tool.startswith("transfer_task_to_")), None)
+      if name:
+        arguments = {"task_description": f"Get the stats of {self.username}", "expected_output": "Stats", "additional_information": ""}
+      else:
+        name = next((tool for tool in PREFERRED_TOOLS if tool in tools), tools[0])
+        arguments = {"username": self.username}
+      return {"role": "assistant", "content": None, "tool_calls": [
+        {"id": f"call_{len(self.requests)}", "type": "function", "function": {"name": name, "arguments": json.dumps(arguments)}}
+      ]}
+    return {"role": "assistant", "content": f"Here are the GitHub stats of {self.username}. They have been busy."}
@@ -0,0 +1,157 @@
+"""
+The contribution analytics tools must read the calendar of the contribution
+stats model, cached or prefetched, like the other stats tools, and the window
+and gap arithmetic of `github_tools.analytics` must hold at the calendar edges.
+
+Runs against the stub GitHub server.
+"""
+import time
+from datetime import date, timedelta
+
+from stubs import FIXTURES, shared_github_server
+
+_github = shared_github_server()
+
+from github_tools import prefetch
+from github_tools.analytics import (
+  rolling_averages, trailing_weeks, weekday_distribution, inactivity_gaps, burnout_signals, forecast, contribution_trends,
+)
+from github_tools.cache import get_cache
+from github_tools.contribution_calendar import ContributionCalendar
+from github_tools.github_tools import (
+  get_contribution_stats, get_contribution_trends, get_weekday_distribution, get_burnout_signals, get_activity_forecast,
+)
+from github_tools.models import UserStats, ContributionStats, ProfileStats
+from github_tools.prefetch import PrefetchScheduler
+from github_tools.tracing import start_trace
+
+LOGIN = FIXTURES["years-10"].login
+TOOLS = (get_contribution_trends, get_weekday_distribution, get_burnout_signals, get_activity_forecast)
+
+# A Monday
+START = date(2024, 1, 1)
+
+def _calendar(counts) -> ContributionCalendar:
+  return ContributionCalendar(START, counts)
+
+def _day(index: int) -> date:
+  return START + timedelta(days=index)
+
+def test_tools_reuse_the_contribution_stats():
+  _github.delay = 0.0
+  get_cache().clear()
+  get_contribution_stats(LOGIN)
+  with start_trace() as trace:
+    answers = [tool(LOGIN) for tool in TOOLS]
+  assert all(isinstance(answer, str) for answer in answers)
+  assert not [stage for stage in trace.summary() if stage["stage"] == "github.graphql"]
+  assert not [current for current in trace.spans if current.name == "process" and current.attributes.get("operation") == "ContributionStats"]
+
+def test_tools_answer_watched_users_from_memory():
+  # A watched user the stub server does not know, so any fetch would fail
+  calendar = ContributionCalendar(date.today() - timedelta(days=99), [3, 0, 5, 1] * 25)
+  profile = ProfileStats(UserStats(name="Watched", created_at="2020-01-01T00:00:00Z"), contributions=ContributionStats.from_calendar(calendar))
+  scheduler = PrefetchScheduler(["watched-dev"], compute=lambda username: profile).start()
+  prefetch._scheduler = scheduler
+  try:
+    deadline = time.monotonic() + 5
+    while scheduler.get("watched-dev") is None:
+      assert time.monotonic() < deadline, "timed out"
+      time.sleep(0.01)
+    before = len(_github.requests)
+    for tool in TOOLS:
+      assert "errors" not in tool("watched-dev"), tool.__name__
+    assert len(_github.requests) == before
+  finally:
+    prefetch._scheduler = None
+    scheduler.stop()
+
+def test_tools_report_unknown_users():
+  for tool in TOOLS:
+    assert "errors" in tool("no-such-user")
+
+def test_empty_calendar():
+  calendar = _calendar([])
+  assert all(values == {"average": 0.0, "previous": 0.0, "change": None} for values in rolling_averages(calendar).values())
+  assert trailing_weeks(calendar) == []
+  assert inactivity_gaps(calendar) == []
+  signals = burnout_signals(calendar)
+  assert signals["days_since_last_contribution"] is None and signals["longest_gap"] == 0 and signals["risk"] == "low"
+  assert forecast(calendar) == {"weekly": [0, 0, 0, 0], "total": 0, "trend": 0.0, "start": START, "expected_active_days": 0}
+  trends = contribution_trends(calendar)
+  assert trends["monthly"] == [] and trends["best_month"] is None and trends["worst_month"] is None
+  assert [weekday["total"] for weekday in weekday_distribution(calendar)] == [0] * 7
+
+def test_calendar_under_a_week():
+  calendar = _calendar([7, 7, 7])
+  # Days before the calendar count as idle
+  assert rolling_averages(calendar, windows=(7,)) == {7: {"average": 3.0, "previous": 0.0, "change": None}}
+  assert trailing_weeks(calendar) == []
+  prediction = forecast(calendar)
+  assert prediction["weekly"] == [0, 0, 0, 0] and prediction["start"] == _day(3)
+  assert burnout_signals(calendar)["days_since_last_contribution"] == 0
+
+def test_rolling_averages_compare_with_the_window_before():
+  calendar = _calendar([1] * 7 + [3] * 7)
+  assert rolling_averages(calendar, windows=(7, 14)) == {
+    7: {"average": 3.0, "previous": 1.0, "change": 200},
+    14: {"average": 2.0, "previous": 0.0, "change": None},
+  }
+
+def test_trailing_weeks_end_on_the_last_day():
+  assert trailing_weeks(_calendar([5] * 7)) == [35]
+  # The two days before the first complete week are left out
+  assert trailing_weeks(_calendar(range(1, 17))) == [sum(range(3, 10)), sum(range(10, 17))]
+
+def test_weekday_distribution_follows_the_start_weekday():
+  weekdays = weekday_distribution(_calendar([1, 0, 0, 0, 0, 0, 2] * 2))
+  assert (weekdays[0]["weekday"], weekdays[0]["total"], weekdays[0]["share"], weekdays[0]["active_rate"]) == ("Monday", 2, 33.3, 100.0)
+  assert (weekdays[6]["weekday"], weekdays[6]["total"], weekdays[6]["share"]) == ("Sunday", 4, 66.7)
+  assert weekdays[1]["active_rate"] == 0.0
+  wednesday = weekday_distribution(ContributionCalendar(date(2024, 1, 3), [5]))
+  assert [weekday["total"] for weekday in wednesday] == [0, 0, 5, 0, 0, 0, 0]
+
+def test_inactivity_gaps():
+  calendar = _calendar([1, 0, 0, 0, 1, 0, 0, 1])
+  assert inactivity_gaps(calendar, 3) == [(_day(1), 3)]
+  assert inactivity_gaps(calendar, 2) == [(_day(1), 3), (_day(5), 2)]
+  assert inactivity_gaps(_calendar([0, 0, 0, 1]), 3) == [(_day(0), 3)]
+  # A gap running up to the last day counts
+  assert inactivity_gaps(_calendar([1, 0, 0, 0]), 3) == [(_day(1), 3)]
+  assert inactivity_gaps(_calendar([1, 0, 0]), 3) == []
+
+def test_gap_running_to_the_end_is_a_high_risk():
+  signals = burnout_signals(_calendar([2] * 100 + [0] * 20), min_gap=14)
+  assert signals["days_since_last_contribution"] == 20
+  assert signals["gaps"] == [(_day(100), 20)] and signals["longest_gap"] == 20
+  assert signals["risk"] == "high"
+
+def test_burst_followed_by_a_break():
+  # Eight steady weeks, a burst week, two idle weeks, then steady again
+  signals = burnout_signals(_calendar([1] * 56 + [5] * 7 + [0] * 14 + [1] * 28), min_gap=14)
+  assert signals["gaps"] == [(_day(63), 14)]
+  assert signals["bursts_before_breaks"] == [_day(56)]
+  assert signals["days_since_last_contribution"] == 0
+  assert signals["risk"] == "moderate"
+  # Without the break the burst is no signal
+  assert burnout_signals(_calendar([1] * 56 + [5] * 7 + [1] * 42), min_gap=14)["bursts_before_breaks"] == []
+
+def test_risk_thresholds():
+  def risk(usual: int, recent: int) -> tuple:
+    signals = burnout_signals(_calendar([usual] * 84 + [recent] * 28))
+    return signals["recent_change"], signals["risk"]
+
+  assert risk(2, 1) == (-50, "high")
+  assert risk(4, 3) == (-25, "moderate")
+  assert risk(5, 4) == (-20, "low")
+  assert risk(0, 1) == (None, "low")
+
+def test_forecast_extends_the_weekly_trend():
+  # Week k has k + 1 contributions a day, so the weekly total grows by 7
+  prediction = forecast(_calendar([week + 1 for week in range(12) for _ in range(7)]))
+  assert prediction["weekly"] == [91, 98, 105, 112] and prediction["trend"] == 7.0
+  assert prediction["total"] == 406 and prediction["expected_active_days"] == 28
+  assert prediction["start"] == _day(84)
+  # A falling trend never goes below zero, nor do the active days exceed the contributions
+  falling = forecast(_calendar([6 - week for week in range(6) for _ in range(7)]))
+  assert falling["weekly"] == [0, 0, 0, 0] and falling["expected_active_days"] == 0
@@ -0,0 +1,101 @@
+"""
+Repeated questions must be answered from the answer cache until the GitHub
+data behind them changes, while follow-ups always reach the agent.
+
+Runs the agent team against the stub model and the stub GitHub server.
+"""
+import os, tempfile, time
+
+from stubs import Fixture, shared_github_server, shared_openai_server
+
+FIXTURE = Fixture("answer-user", repositories=3, years=2, seed=7)
+
+_github = shared_github_server(FIXTURE)
+_openai = shared_openai_server()
+
+import github_agent
+from answer_cache import AnswerCache, normalize_prompt
+from github_tools.cache import get_cache
+from serving import AgentServer
+
+def _server(cache: AnswerCache) -> AgentServer:
+  def build():
+    agent = github_agent.build_main_agent()
+    for member in [agent, *agent.team]:
+      member.debug_mode = False
+    return agent
+  return AgentServer(build, max_concurrency=2, answer_cache=cache)
+
+def _ask(server: AgentServer, prompt: str, session: str) -> tuple:
+  """
+  The answer to `prompt` and the number of model calls it took.
+  """
+  before = len(_openai.requests)
+  chunks = list(server.submit(session, prompt))
+  answer = "".join(chunk.content for chunk in chunks if chunk.event == "RunResponse" and isinstance(chunk.content, str))
+  return answer, len(_openai.requests) - before
+
+def _reset():
+  get_cache().clear()
+  _github.delay = 0.0
+  _openai.username = FIXTURE.login
+  FIXTURE.pushes.clear()
+
+def test_prompts_are_normalized():
+  assert normalize_prompt("Hey, what's @Answer-User's longest streak?") == "what answer-user longest streak"
+  assert normalize_prompt("What languages does answer-user use") == normalize_prompt("what languages does Answer-User use?!")
+
+def test_repeated_question_skips_the_model():
+  _reset()
+  cache = AnswerCache(url="")
+  server = _server(cache)
+  answer, calls = _ask(server, f"What languages does {FIXTURE.login} use?", "first")
+  assert calls > 0 and answer
+  repeated, calls = _ask(server, f"what languages does {FIXTURE.login.upper()} use", "second")
+  assert calls == 0
+  assert repeated == answer
+  assert cache.stats()["hit"] == 1
+
+def test_changed_data_runs_the_agent_again():
+  _reset()
+  cache = AnswerCache(url="")
+  server = _server(cache)
+  prompt = f"Show me the GitHub stats of {FIXTURE.login}"
+  _ask(server, prompt, "first")
+  FIXTURE.push(1)
+  # The stored responses expire
+  get_cache().clear()
+  _, calls = _ask(server, prompt, "second")
+  assert calls > 0 and cache.stats()["stale"] == 1
+  _, calls = _ask(server, prompt, "third")
+  assert calls == 0
+
+def test_follow_ups_are_not_cached():
+  _reset()
+  server = _server(AnswerCache(url=""))
+  _ask(server, "And what about their streak?", "first")
+  _, calls = _ask(server, "And what about their streak?", "second")
+  assert calls > 0
+
+def test_cached_answer_goes_into_the_chat_history():
+  _reset()
+  server = _server(AnswerCache(url=""))
+  prompt = f"Show me the GitHub stats of {FIXTURE.login}"
+  answer, _ = _ask(server, prompt, "first")
+  _ask(server, prompt, "second")
+  _ask(server, "And their streak?", "second")
+  history = [message.get("content") for message in _openai.requests[-1]["messages"] if message.get("role") == "assistant"]
+  assert answer.strip() in [(content or "").strip() for content in history]
+
+def test_answers_are_stored_on_disk_and_expire():
+  path = os.path.join(tempfile.mkdtemp(), "answers.db")
+  first = AnswerCache(url=f"sqlite:///{path}", ttl=0.5, version=lambda usernames: "v1")
+  assert first.save("stats of octocat", "They have been busy.", ["octocat"])
+  # Another process, or the next start, finds the answer
+  second = AnswerCache(url=f"sqlite:///{path}", ttl=0.5, version=lambda usernames: "v1")
+  assert second.lookup("Stats of @octocat?") == "They have been busy."
+  time.sleep(0.6)
+  assert second.lookup("stats of octocat") is None
+  # Answers about users the prompt does not name are never stored
+  assert not second.save("stats of my colleague", "They have been busy.", ["octocat"])
+  assert second.stats()["hit_rate"] == 0.5
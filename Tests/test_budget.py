@@ -0,0 +1,139 @@
+"""
+The rate limit budget must be shared between processes and hand out points
+by priority: batch work only spends what interactive lookups leave over.
+
+Each `RateLimitBudget` opens its own connection to the SQLite file, like a
+separate process would.
+"""
+import asyncio, multiprocessing, os, socket, sqlite3, tempfile, threading, time
+
+import httpx, requests
+from github_tools.budget import RateLimitBudget, priority, INTERACTIVE, BATCH
+from github_tools.client import GraphQLClient, AsyncGraphQLClient
+
+POLL = 0.02
+
+def _budget(path: str, **kwargs) -> RateLimitBudget:
+  return RateLimitBudget(path, token="test-token", interactive_reserve=10, batch_reserve=20, poll_interval=POLL, **kwargs)
+
+def _path() -> str:
+  return os.path.join(tempfile.mkdtemp(), "budget.db")
+
+def _report(budget: RateLimitBudget, remaining: int, reset_in: float = 3600, operation: str = "seed", cost: int = 1):
+  """
+  Release a query whose response reported `remaining` points.
+  """
+  grant = budget.acquire(operation, INTERACTIVE, max_wait=0)
+  reset_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(time.time() + reset_in))
+  budget.release(grant, {"data": {"rateLimit": {"cost": cost, "remaining": remaining, "resetAt": reset_at}}})
+
+def test_reservations_are_shared_between_connections():
+  path = _path()
+  first, second = _budget(path), _budget(path)
+  _report(first, 100)
+  granted = [first.acquire("query", BATCH, max_wait=0) for _ in range(50)]
+  granted += [second.acquire("query", BATCH, max_wait=0) for _ in range(30)]
+  assert all(grant.id is not None for grant in granted)
+  # 100 - 80 reserved - 1 < 20: more batch work has to wait
+  assert second.acquire("query", BATCH, max_wait=0).id is None
+  # Interactive queries may go down to 10 points
+  assert second.acquire("query", INTERACTIVE, max_wait=0).id is not None
+  assert first.snapshot()["reserved"] == 81
+
+def test_batch_yields_to_waiting_interactive_query():
+  path = _path()
+  holder, interactive, batch = _budget(path), _budget(path), _budget(path)
+  _report(holder, 100)
+  _report(interactive, 100, operation="heavy", cost=45)
+  _report(holder, 100, operation="hold", cost=50)
+  held = holder.acquire("hold", INTERACTIVE)
+
+  granted = []
+  def run(budget, operation, level):
+    granted.append((budget.acquire(operation, level).id, level))
+
+  waiting = threading.Thread(target=run, args=(interactive, "heavy", INTERACTIVE))
+  waiting.start()
+  while not interactive.snapshot()["waiting"][INTERACTIVE]:
+    time.sleep(POLL)
+  # 100 - 50 - 1 fits the batch floor, but an interactive query is waiting
+  background = threading.Thread(target=run, args=(batch, "small", BATCH))
+  background.start()
+  time.sleep(5 * POLL)
+  assert granted == []
+
+  holder.release(held)
+  waiting.join()
+  background.join()
+  # Reservation ids grow in the order the points were handed out
+  assert [level for _, level in sorted(granted)] == [INTERACTIVE, BATCH]
+
+def test_exhausted_budget_waits_for_the_reset():
+  budget = _budget(_path())
+  # resetAt has whole seconds, so the window resets 1 to 2 seconds from now
+  _report(budget, 0, reset_in=2)
+  grant = budget.acquire("query", INTERACTIVE)
+  assert grant.id is not None
+  assert grant.waited > 0.5
+
+def test_out_of_order_responses_keep_the_lowest_count():
+  budget = _budget(_path())
+  _report(budget, 100)
+  _report(budget, 120)
+  assert budget.snapshot()["remaining"] == 100
+  # A new window replaces the count
+  _report(budget, 4999, reset_in=7200)
+  assert budget.snapshot()["remaining"] == 4999
+
+def test_priority_of_the_context_is_used():
+  budget = _budget(_path())
+  with priority(BATCH):
+    assert budget.acquire("query").priority == BATCH
+  assert budget.acquire("query").priority == INTERACTIVE
+
+def _grab(path: str, count: int, granted):
+  budget = _budget(path)
+  granted.put(sum(budget.acquire("query", BATCH, max_wait=0).id is not None for _ in range(count)))
+
+def test_processes_never_overspend():
+  path = _path()
+  _report(_budget(path), 120)
+  granted = multiprocessing.Queue()
+  processes = [multiprocessing.Process(target=_grab, args=(path, 60, granted)) for _ in range(4)]
+  for process in processes:
+    process.start()
+  total = sum(granted.get(timeout=60) for _ in processes)
+  for process in processes:
+    process.join()
+  # 120 points, 20 kept back from batch work
+  assert total == 100
+
+class _LockedBudget(RateLimitBudget):
+  # Storing the outcome of a query fails, like on a database another process keeps locked
+  def release(self, grant, data=None, headers=None):
+    raise sqlite3.OperationalError("database is locked")
+
+def _closed_url() -> str:
+  with socket.socket() as listener:
+    listener.bind(("127.0.0.1", 0))
+    return f"http://127.0.0.1:{listener.getsockname()[1]}"
+
+def test_failed_release_keeps_the_request_error():
+  url = _closed_url()
+  client = GraphQLClient(base_url=url, max_retries=0, budget=_LockedBudget("", token="test-token"))
+  try:
+    client.execute("{ viewer { login } }")
+    assert False, "the query reached a closed port"
+  except requests.exceptions.ConnectionError:
+    pass
+
+  async def run():
+    client = AsyncGraphQLClient(base_url=url, max_retries=0, budget=_LockedBudget("", token="test-token"))
+    try:
+      await client.execute("{ viewer { login } }")
+      assert False, "the query reached a closed port"
+    except httpx.ConnectError:
+      pass
+    finally:
+      await client.aclose()
+  asyncio.run(run())
@@ -0,0 +1,42 @@
+"""
+Bulk analysis must only report users as missing when GitHub says so: a
+batch query GitHub could not run is split and retried.
+
+Runs against the stub GitHub server.
+"""
+from stubs import FIXTURES, shared_github_server
+
+_github = shared_github_server()
+
+from github_tools.bulk import analyze_users
+
+LOGINS = [fixture.login for fixture in FIXTURES.values()]
+TIMEOUT = {"data": None, "errors": [{"message": "Something went wrong while executing your query. This may be the result of a timeout."}]}
+
+def _analyze(usernames, **kwargs) -> dict:
+  _github.delay = 0.0
+  _github.requests.clear()
+  return {result["username"]: result for result in analyze_users(usernames, **kwargs)}
+
+def test_unknown_users_do_not_fail_the_batch():
+  results = _analyze(LOGINS + ["no-such-user"], batch_size=5, concurrency=1)
+  assert len([request for request in _github.requests if "u0:" in request["query"]]) == 1
+  assert "Could not resolve" in results["no-such-user"]["errors"]
+  assert all("profile" in results[login] for login in LOGINS)
+
+def test_failed_batch_query_is_split_and_retried():
+  _github.failures.clear()
+  _github.fail(200, body=TIMEOUT)
+  results = _analyze(LOGINS, batch_size=4, concurrency=1)
+  assert all("profile" in results[login] for login in LOGINS), results
+  batches = [request for request in _github.requests if "u0:" in request["query"]]
+  # The failed batch of 4, then its halves
+  assert [len(request["variables"]) for request in batches] == [4, 2, 2]
+
+def test_single_user_gets_the_github_error():
+  _github.failures.clear()
+  _github.fail(200, body=TIMEOUT, times=3)
+  results = _analyze(LOGINS[:2], batch_size=2, concurrency=1)
+  _github.failures.clear()
+  for login in LOGINS[:2]:
+    assert results[login]["errors"] == TIMEOUT["errors"][0]["message"]
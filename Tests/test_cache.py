@@ -0,0 +1,78 @@
+"""
+The response cache must expire entries after their TTL, keep entries without
+one, evict the least recently used documents past its size limit, stay in
+memory when `GITHUB_CACHE_URL` is empty, and never raise on database errors.
+"""
+import os, subprocess, sys, tempfile, time
+
+from github_tools.cache import ResponseCache
+
+def _cache(directory: str, **kwargs) -> ResponseCache:
+  # Without the in-process LRU every lookup reads the database
+  return ResponseCache(url=f"sqlite:///{os.path.join(directory, 'cache.db')}", **dict({"lru_size": 0}, **kwargs))
+
+def test_entries_expire_after_their_ttl():
+  with tempfile.TemporaryDirectory() as directory:
+    for cache in (ResponseCache(url=""), _cache(directory)):
+      cache.set("short", {"n": 1}, ttl=0.1)
+      cache.set("long", {"n": 2}, ttl=60)
+      assert cache.get("short") == {"n": 1}
+      time.sleep(0.15)
+      assert cache.get("short") is None
+      assert cache.get("long") == {"n": 2}
+
+def test_entries_without_ttl_are_kept():
+  with tempfile.TemporaryDirectory() as directory:
+    cache = _cache(directory)
+    cache.set("forever", [1, 2, 3])
+    cache.set("expired", "x", ttl=-1)
+    # Writes drop expired entries, never the ones without a TTL
+    cache.set("other", "y", ttl=60)
+    assert cache.stats()["entries"] == 2
+    # Another process sharing the file sees them too
+    assert _cache(directory).get("forever") == [1, 2, 3]
+
+def test_least_recently_used_documents_are_evicted_past_the_size_limit():
+  with tempfile.TemporaryDirectory() as directory:
+    document = "x" * 100
+    cache = _cache(directory, max_bytes=250)
+    cache.set("a", document)
+    time.sleep(0.01)
+    cache.set("b", document)
+    time.sleep(0.01)
+    assert cache.get("a") == document
+    time.sleep(0.01)
+    cache.set("c", document)
+    assert cache.get("b") is None
+    assert cache.get("a") == document and cache.get("c") == document
+    stats = cache.stats()
+    assert stats["evictions"] == 1 and stats["bytes"] <= 250
+
+def test_memory_lru_is_bounded():
+  cache = ResponseCache(url="", lru_size=2)
+  for key in "abc":
+    cache.set(key, key)
+  assert cache.get("a") is None
+  assert cache.get("b") == "b" and cache.get("c") == "c"
+  assert cache.stats()["memory_entries"] == 2
+
+def test_empty_cache_url_keeps_the_cache_in_memory():
+  with tempfile.TemporaryDirectory() as home:
+    script = "from github_tools.cache import get_cache; cache = get_cache(); cache.set('k', 1); print(cache.engine is None, cache.get('k'))"
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    environment = dict(os.environ, GITHUB_CACHE_URL="", HOME=home, PYTHONPATH=root)
+    output = subprocess.run([sys.executable, "-c", script], env=environment, capture_output=True, text=True, check=True).stdout
+    assert output.split() == ["True", "1"]
+    assert not os.path.exists(os.path.join(home, ".cache", "github-agent"))
+
+def test_database_errors_are_not_raised():
+  with tempfile.TemporaryDirectory() as directory:
+    cache = _cache(directory)
+    cache.set("k", 1)
+    cache.table.drop(cache.engine)
+    cache.set("k", 2)
+    assert cache.get("missing") is None
+    cache.delete("k")
+    cache.clear()
+    cache.stats()
+    cache.engine.dispose()
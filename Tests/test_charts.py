@@ -0,0 +1,84 @@
+"""
+The charts of the Streamlit app must be drawn from the stats the tools of a
+turn already loaded, and the agents must be told to leave them out of the
+answer.
+
+Runs against the stub GitHub server and the stub model.
+"""
+from stubs import FIXTURES, shared_github_server, shared_openai_server
+
+_github = shared_github_server()
+_openai = shared_openai_server()
+
+import github_agent
+from answer_cache import AnswerCache
+from charts import chart_spec, charted_users
+from github_tools.cache import get_cache
+from github_tools.github_tools import get_full_profile, get_repo_stats, get_user_stats, load_profile_stats
+from github_tools.render import PROFILE_TOP_LANGUAGES
+from github_tools.tracing import start_trace
+from instructions.team_instructions import charts_instruction
+
+LOGIN = FIXTURES["org-1000"].login
+
+def _reset():
+  _github.delay = 0.0
+  get_cache().clear()
+
+def test_specs_hold_the_stats():
+  _reset()
+  profile = load_profile_stats(LOGIN)
+  heatmap = chart_spec(LOGIN, "contributions")
+  days = heatmap["data"]["values"]
+  assert len(days) == len(profile.contributions.calendar)
+  assert sum(day["count"] for day in days) == sum(profile.contributions.calendar.counts)
+  assert days[0]["date"] == profile.contributions.calendar.start.isoformat()
+
+  languages = chart_spec(LOGIN, "languages")["data"]["values"]
+  assert len(languages) == PROFILE_TOP_LANGUAGES + 1 and languages[-1]["language"].startswith("Other")
+  largest = sorted(profile.languages.sizes.values(), reverse=True)[PROFILE_TOP_LANGUAGES - 1]
+  assert min(language["percent"] for language in languages[:-1]) == round(largest / sum(profile.languages.sizes.values()) * 100, 2)
+  everything = chart_spec(LOGIN, "languages", top_languages=None)["data"]["values"]
+  assert len(everything) == len(profile.languages.sizes)
+  assert abs(sum(language["percent"] for language in everything) - 100) < 0.1
+
+def test_charts_follow_the_tool_calls():
+  _reset()
+  with start_trace() as trace:
+    get_user_stats(LOGIN)
+    get_repo_stats(LOGIN.upper())
+    get_full_profile(LOGIN)
+  assert charted_users(trace.spans) == [(LOGIN, "languages"), (LOGIN, "contributions")]
+
+def test_charts_reuse_the_loaded_stats():
+  _reset()
+  get_full_profile(LOGIN)
+  with start_trace() as trace:
+    chart_spec(LOGIN, "contributions")
+    chart_spec(LOGIN, "languages")
+  assert not [stage for stage in trace.summary() if stage["stage"] == "github.graphql"]
+
+def test_charts_never_fetch():
+  _reset()
+  before = len(_github.requests)
+  assert chart_spec(LOGIN, "contributions") is None
+  assert chart_spec(LOGIN, "languages") is None
+  get_repo_stats(LOGIN)
+  assert chart_spec(LOGIN, "languages") is not None
+  after = len(_github.requests)
+  # The contribution data was not loaded by the tool, and is not fetched for the chart
+  chart_spec(LOGIN, "contributions")
+  assert len(_github.requests) == after > before
+
+def test_cached_answers_come_with_charts():
+  cache = AnswerCache(url="", version=lambda usernames: "v1")
+  assert cache.save(f"stats of {LOGIN}", "Busy year.", [LOGIN])
+  with start_trace() as trace:
+    assert cache.lookup(f"Stats of {LOGIN}?") == "Busy year."
+  assert charted_users(trace.spans) == [(LOGIN, "contributions"), (LOGIN, "languages")]
+
+def test_agents_narrate_the_charts():
+  agent = github_agent.build_main_agent(charts=True)
+  assert agent.instructions.endswith(charts_instruction)
+  assert agent.team[0].instructions.endswith(charts_instruction)
+  assert charts_instruction not in github_agent.build_main_agent().instructions
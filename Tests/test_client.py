@@ -0,0 +1,178 @@
+"""
+The GraphQL clients must ride out transient GitHub failures: 502/503 are
+retried with backoff, secondary rate limit 403s wait for their Retry-After,
+rate limited 200s and cut off bodies are retried, and queries wait for the
+reset once the reported budget runs low.
+
+Runs against a stub GitHub server of its own.
+"""
+import asyncio, time
+
+import httpx, requests
+from stubs import FIXTURES, StubGitHubServer
+
+from github_tools import client as client_module
+from github_tools.budget import RateLimitBudget
+from github_tools.client import GraphQLClient, AsyncGraphQLClient
+from github_tools.tracing import start_trace
+
+# Keep the jittered backoff of the retries short
+client_module.BACKOFF_BASE = 0.01
+
+QUERY = "query($login: String!) { user(login: $login) { name } }"
+VARIABLES = {"login": FIXTURES["small"].login}
+
+_github = StubGitHubServer().__enter__()
+
+def _reset():
+  _github.failures.clear()
+  _github.requests.clear()
+  _github.remaining = 4999
+  _github.reset_in = 3600
+
+RATE_LIMITED = {"data": None, "errors": [{"type": "RATE_LIMITED", "message": "API rate limit exceeded"}]}
+CUT_OFF = b'{"data": {"user": {"na'
+
+def _client(**kwargs) -> GraphQLClient:
+  budget = RateLimitBudget("", token="test-token", interactive_reserve=10, poll_interval=0.02)
+  return GraphQLClient(base_url=_github.url, budget=budget, **kwargs)
+
+def test_server_errors_are_retried():
+  _reset()
+  _github.fail(502)
+  _github.fail(503)
+  data = _client().execute(QUERY, VARIABLES)
+  assert data["data"]["user"]["name"] == FIXTURES["small"].login.title()
+  assert len(_github.requests) == 3
+
+def test_retries_give_up():
+  _reset()
+  _github.fail(503, times=3)
+  try:
+    _client(max_retries=2).execute(QUERY, VARIABLES)
+    assert False, "a failing query returned data"
+  except requests.exceptions.HTTPError as e:
+    assert e.response.status_code == 503
+  assert len(_github.requests) == 3
+
+def test_secondary_rate_limit_waits_for_retry_after():
+  _reset()
+  _github.fail(403, {"Retry-After": "1"})
+  start = time.perf_counter()
+  data = _client().execute(QUERY, VARIABLES)
+  assert "user" in data["data"]
+  assert time.perf_counter() - start >= 1
+  assert len(_github.requests) == 2
+
+def test_other_forbidden_responses_are_not_retried():
+  _reset()
+  _github.fail(403)
+  try:
+    _client().execute(QUERY, VARIABLES)
+    assert False, "a forbidden query returned data"
+  except requests.exceptions.HTTPError as e:
+    assert e.response.status_code == 403
+  assert len(_github.requests) == 1
+
+def test_rate_limited_responses_are_retried():
+  _reset()
+  _github.fail(200, body=RATE_LIMITED)
+  assert _client().execute(QUERY, VARIABLES)["data"]["user"]["name"] == FIXTURES["small"].login.title()
+  assert len(_github.requests) == 2
+
+  _reset()
+  _github.fail(200, body=RATE_LIMITED, times=3)
+  try:
+    _client(max_retries=2).execute(QUERY, VARIABLES)
+    assert False, "a rate limited query returned data"
+  except requests.exceptions.RequestException:
+    pass
+  assert len(_github.requests) == 3
+
+def test_invalid_json_is_retried():
+  _reset()
+  _github.fail(200, body=CUT_OFF)
+  assert "user" in _client().execute(QUERY, VARIABLES)["data"]
+  assert len(_github.requests) == 2
+
+  _reset()
+  _github.fail(200, body=CUT_OFF, times=2)
+  try:
+    _client(max_retries=1).execute(QUERY, VARIABLES)
+    assert False, "a cut off response returned data"
+  except requests.exceptions.RequestException:
+    pass
+
+def test_bad_reset_header_falls_back_to_backoff():
+  _reset()
+  _github.fail(403, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "soon"})
+  assert "user" in _client().execute(QUERY, VARIABLES)["data"]
+  assert len(_github.requests) == 2
+
+def test_low_budget_pauses_until_the_reset():
+  _reset()
+  client = _client()
+  # The reset header has whole seconds, so the window resets 1 to 2 seconds from now
+  _github.remaining = 5
+  _github.reset_in = 2
+  client.execute(QUERY, VARIABLES)
+  _github.remaining = 4999
+  with start_trace() as trace:
+    client.execute(QUERY, VARIABLES)
+  waited = sum(stage.get("budget_wait", 0) for stage in trace.summary())
+  assert waited >= 0.5, waited
+  assert len(_github.requests) == 2
+
+def test_async_client_retries():
+  _reset()
+  _github.fail(502)
+  _github.fail(403, {"Retry-After": "0"})
+
+  async def run():
+    client = AsyncGraphQLClient(base_url=_github.url, budget=RateLimitBudget("", token="test-token", interactive_reserve=10))
+    try:
+      return await client.execute(QUERY, VARIABLES)
+    finally:
+      await client.aclose()
+
+  assert "user" in asyncio.run(run())["data"]
+  assert len(_github.requests) == 3
+
+  _reset()
+  _github.fail(503, times=2)
+  async def give_up():
+    client = AsyncGraphQLClient(base_url=_github.url, max_retries=1, budget=RateLimitBudget("", token="test-token"))
+    try:
+      await client.execute(QUERY, VARIABLES)
+      assert False, "a failing query returned data"
+    except httpx.HTTPStatusError as e:
+      assert e.response.status_code == 503
+    finally:
+      await client.aclose()
+  asyncio.run(give_up())
+
+def test_async_client_retries_rate_limits_and_invalid_json():
+  _reset()
+  _github.fail(200, body=RATE_LIMITED)
+  _github.fail(200, body=CUT_OFF)
+  _github.fail(403, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "soon"})
+
+  async def run(max_retries=4):
+    client = AsyncGraphQLClient(base_url=_github.url, max_retries=max_retries, budget=RateLimitBudget("", token="test-token"))
+    try:
+      return await client.execute(QUERY, VARIABLES)
+    finally:
+      await client.aclose()
+
+  assert "user" in asyncio.run(run())["data"]
+  assert len(_github.requests) == 4
+
+  for body in (RATE_LIMITED, CUT_OFF):
+    _reset()
+    _github.fail(200, body=body, times=2)
+    try:
+      asyncio.run(run(max_retries=1))
+      assert False, "a failing query returned data"
+    except httpx.HTTPError:
+      pass
+    assert len(_github.requests) == 2
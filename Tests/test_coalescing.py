@@ -0,0 +1,133 @@
+"""
+Concurrent lookups of one username must share a single GitHub request.
+
+Runs against the stub GitHub server with a response delay, so the lookups
+really overlap.
+"""
+import asyncio, threading
+
+from stubs import shared_github_server
+
+# Concurrent callers per test, and how long the stub takes to answer
+CALLERS = 16
+DELAY = 0.3
+
+_github = shared_github_server()
+
+from github_tools.cache import get_cache
+from github_tools.fetch_data import fetch_user_data, fetch_repo_data, fetch_contribution_data, afetch_user_data, fetch_contribution_history
+from github_tools.client import post_query
+from github_tools.singleflight import SingleFlight
+
+def _requests_during(function) -> int:
+  get_cache().clear()
+  _github.delay = DELAY
+  before = len(_github.requests)
+  function()
+  return len(_github.requests) - before
+
+def _in_threads(target, count: int = CALLERS) -> list:
+  results = [None] * count
+  barrier = threading.Barrier(count)
+
+  def run(i):
+    barrier.wait()
+    results[i] = target(i)
+
+  threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+  return results
+
+def test_threads_share_one_profile_request():
+  fetches = [fetch_user_data, fetch_repo_data, fetch_contribution_data]
+  results = []
+  count = _requests_during(lambda: results.extend(_in_threads(lambda i: fetches[i % 3]("small-user"))))
+  assert count == 1
+  assert all(result["data"]["user"] for result in results)
+  assert results[0] == results[3]
+
+def test_event_loops_share_one_profile_request_and_threads_another():
+  # Half the callers are coroutines, each on its own event loop, the others plain threads
+  def lookup(i):
+    if i % 2:
+      return asyncio.run(afetch_user_data("hundred-repos"))
+    return fetch_user_data("hundred-repos")
+
+  results = []
+  count = _requests_during(lambda: results.extend(_in_threads(lookup)))
+  assert count == 2
+  assert all(result == results[0] for result in results)
+
+def test_sync_lookup_on_the_event_loop_does_not_wait_for_its_coroutines():
+  async def lookups():
+    leader = asyncio.ensure_future(afetch_user_data("small-user"))
+    while len(_github.requests) == before:
+      await asyncio.sleep(0.01)
+    # A blocking call on the loop of a lookup in flight must not wait for it
+    sync = fetch_user_data("small-user")
+    return sync, await leader
+
+  results = []
+  get_cache().clear()
+  _github.delay = DELAY
+  before = len(_github.requests)
+  thread = threading.Thread(target=lambda: results.extend(asyncio.run(lookups())), daemon=True)
+  thread.start()
+  thread.join(10 * DELAY)
+  assert not thread.is_alive(), "the sync lookup blocked the event loop"
+  assert results[0] == results[1]
+
+def test_tasks_share_one_request():
+  async def lookups():
+    return await asyncio.gather(*(afetch_user_data("veteran") for _ in range(CALLERS)))
+
+  results = []
+  count = _requests_during(lambda: results.extend(asyncio.run(lookups())))
+  assert count == 1
+  assert len(results) == CALLERS
+
+def test_identical_queries_share_one_request():
+  # Below the profile: yearly contribution windows of concurrent history lookups
+  results = []
+  count = _requests_during(lambda: results.extend(_in_threads(lambda i: fetch_contribution_history("veteran"), 4)))
+  assert count == 1 + 10
+  assert all(result == results[0] for result in results)
+
+def test_different_users_are_not_coalesced():
+  users = ["small-user", "hundred-repos", "veteran", "big-org"]
+  count = _requests_during(lambda: _in_threads(lambda i: post_query("query($login: String!) { user(login: $login) { name } }", {"login": users[i % 4]}), 8))
+  assert count == 4
+
+def test_errors_reach_every_waiter():
+  flight = SingleFlight("test")
+  started = threading.Event()
+  release = threading.Event()
+
+  def fail():
+    started.set()
+    release.wait()
+    raise ValueError("boom")
+
+  errors = []
+
+  def call(i):
+    if i:
+      started.wait()
+    try:
+      flight.do("key", fail)
+    except ValueError as e:
+      errors.append(e)
+
+  threads = [threading.Thread(target=call, args=(i,)) for i in range(4)]
+  for thread in threads:
+    thread.start()
+  while flight.in_flight() == 0:
+    pass
+  threading.Timer(DELAY, release.set).start()
+  for thread in threads:
+    thread.join()
+  assert len(errors) == 4
+  assert flight.in_flight() == 0
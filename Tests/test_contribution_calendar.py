@@ -0,0 +1,76 @@
+"""
+The compact contribution calendar must compute exactly what the per-day
+dict walk it replaced computed, on randomized calendars.
+
+`_reference_metrics` is the previous implementation of the calendar
+metrics in `process_contribution_data`, kept here as the oracle.
+"""
+import random
+from datetime import date, timedelta
+
+from github_tools.contribution_calendar import ContributionCalendar
+
+RUNS = 500
+
+def _reference_metrics(weeks: list, today: str) -> dict:
+  days = [day for week in weeks for day in week['contributionDays']]
+  try:
+    highest_day = max(days, key=lambda day: day['contributionCount'])
+    highest_contribution = highest_day['contributionCount']
+    highest_contribution_date = highest_day['date']
+  except (ValueError, KeyError):
+    highest_contribution = 0
+    highest_contribution_date = None
+
+  current_streak = 0
+  longest_streak = 0
+  for day in days:
+    if day.get('contributionCount', 0) > 0:
+      current_streak += 1
+      longest_streak = max(longest_streak, current_streak)
+    else:
+      current_streak = 0
+
+  contribution_days = [day["date"] for week in weeks for day in week["contributionDays"] if day["contributionCount"] > 0]
+  return {
+    "highest_contribution": highest_contribution,
+    "highest_contribution_date": highest_contribution_date,
+    "current_streak": current_streak,
+    "longest_streak": longest_streak,
+    "active_days": len(set(contribution_days)),
+    "today_count": sum(day["contributionCount"] for week in weeks for day in week["contributionDays"] if day["date"] == today),
+  }
+
+def _random_weeks(rng: random.Random) -> list:
+  """
+  Consecutive days like GitHub returns them: a partial first and last week, idle spells and bursts.
+  """
+  start = date(2015, 1, 1) + timedelta(days=rng.randrange(3000))
+  length = rng.choice([0, 1, 2, 7, rng.randrange(1, 60), rng.randrange(300, 380)])
+  idle = rng.random()
+  days = []
+  for offset in range(length):
+    count = 0 if rng.random() < idle else rng.choice([1, 2, 3, rng.randrange(1, 40), rng.randrange(1, 100000)])
+    days.append({"contributionCount": count, "date": (start + timedelta(days=offset)).isoformat()})
+  first = rng.randrange(7)
+  return [{"contributionDays": days[max(0, i):i + 7]} for i in range(-first, len(days), 7) if days[max(0, i):i + 7]]
+
+def test_metrics_match_the_previous_implementation():
+  rng = random.Random(6)
+  for run in range(RUNS):
+    weeks = _random_weeks(rng)
+    days = [day for week in weeks for day in week["contributionDays"]]
+    today = rng.choice(days)["date"] if days and rng.random() < 0.7 else "2099-01-01"
+
+    metrics = ContributionCalendar.from_weeks(weeks).metrics(date.fromisoformat(today))
+    if metrics["highest_contribution_date"] is not None:
+      metrics["highest_contribution_date"] = metrics["highest_contribution_date"].isoformat()
+    assert metrics == _reference_metrics(weeks, today), (run, weeks)
+
+def test_days_round_trip():
+  rng = random.Random(7)
+  for _ in range(50):
+    weeks = _random_weeks(rng)
+    days = [day for week in weeks for day in week["contributionDays"]]
+    if days:
+      assert ContributionCalendar.from_weeks(weeks).to_days() == days
@@ -0,0 +1,52 @@
+"""
+Plain stats requests are answered by the fast path without the model, and
+follow-ups must still reach the agent with that answer in the chat history.
+
+Runs the agent team against the stub model and the stub GitHub server.
+"""
+from stubs import FIXTURES, shared_github_server, shared_openai_server
+
+_github = shared_github_server()
+_openai = shared_openai_server()
+
+import github_agent
+from fast_path import match_stats_request, try_fast_path
+from serving import AgentServer
+
+LOGIN = FIXTURES["small"].login
+
+def _server() -> AgentServer:
+  def build():
+    agent = github_agent.build_main_agent()
+    for member in [agent, *agent.team]:
+      member.debug_mode = False
+    return agent
+  return AgentServer(build, max_concurrency=2)
+
+def test_plain_stats_request_skips_the_model():
+  before = len(_openai.requests)
+  answer = try_fast_path(f"Show me the stats of @{LOGIN}")
+  assert answer is not None and LOGIN in answer
+  assert len(_openai.requests) == before
+  assert try_fast_path(f"Is {LOGIN} burning out?") is None
+
+def test_only_marked_usernames_take_the_fast_path():
+  assert match_stats_request("stats for @octocat") == "octocat"
+  assert match_stats_request("Show me the GitHub stats of user octo-cat please") == "octo-cat"
+  assert match_stats_request("@octocat's profile?") == "octocat"
+  assert match_stats_request("profile of github user octocat") == "octocat"
+  for prompt in ("stats for python", "overview of this", "show me the profile of me", "Show me the stats of octocat", "octocat's summary", "stats for user"):
+    assert match_stats_request(prompt) is None, prompt
+
+def test_follow_up_sees_the_fast_path_answer():
+  _github.delay = 0.0
+  _openai.username = LOGIN
+  server = _server()
+  prompt = f"stats for user {LOGIN}"
+  answer = try_fast_path(prompt)
+  server.remember("session", prompt, answer)
+  list(server.submit("session", "And what about their longest streak?"))
+  leader = next(request for request in _openai.requests[::-1] if any(message.get("role") == "user" and "longest streak" in str(message.get("content")) for message in request["messages"]))
+  history = [(message.get("role"), message.get("content")) for message in leader["messages"]]
+  assert ("user", prompt) in history
+  assert ("assistant", answer) in history
@@ -0,0 +1,116 @@
+"""
+The stats models must survive every encoding unchanged, render to the
+tool outputs, and be computed once per fetched response.
+
+Runs against the stub GitHub server.
+"""
+import asyncio, json
+from dataclasses import replace
+
+from stubs import FIXTURES, shared_github_server
+
+_github = shared_github_server()
+
+from github_tools import models
+from github_tools.cache import get_cache
+from github_tools.github_tools import (
+  get_user_stats, get_repo_stats, get_contribution_stats, get_full_profile, gather_profile, gather_stats,
+  load_profile_stats, aload_profile_stats, process_user_data, fetch_user_data,
+)
+from github_tools.models import UserStats, RepoLanguageStats, ProfileStats, encode, decode, dumps, loads
+from github_tools.render import render, renderer, top_languages_of
+from github_tools.tracing import start_trace
+
+LOGIN = FIXTURES["org-1000"].login
+
+def _profile() -> ProfileStats:
+  _github.delay = 0.0
+  get_cache().clear()
+  return load_profile_stats(LOGIN)
+
+def test_models_are_slotted():
+  profile = _profile()
+  for stats in (profile, profile.user, profile.languages, profile.contributions):
+    assert not hasattr(stats, "__dict__"), type(stats).__name__
+
+def test_encodings_round_trip():
+  profile = _profile()
+  assert decode(json.loads(json.dumps(encode(profile)))) == profile
+  assert ProfileStats.from_dict(json.loads(json.dumps(profile.to_dict()))) == profile
+  assert loads(dumps(profile, "json")) == profile
+  if models.msgpack is not None:
+    assert loads(dumps(profile, "msgpack")) == profile
+  # The cached form is far smaller than the responses it was computed from
+  assert len(dumps(profile, "json")) < 4096
+
+def test_decoded_stats_render_like_the_tools():
+  profile = _profile()
+  decoded = loads(dumps(profile, "json"))
+  assert render(decoded) == get_full_profile(LOGIN)
+  assert render(decoded.user) == get_user_stats(LOGIN) == process_user_data(fetch_user_data(LOGIN))
+  assert render(decoded, "markdown", username=LOGIN) == render(profile, "markdown", username=LOGIN)
+
+def test_stats_are_computed_once():
+  _profile()
+  with start_trace() as trace:
+    get_user_stats(LOGIN)
+    get_full_profile(LOGIN)
+  assert not [stage for stage in trace.summary() if stage["stage"] in ("process", "github.graphql")]
+
+def test_profile_sections_load_concurrently():
+  _github.delay = 0.05
+  get_cache().clear()
+  with start_trace() as trace:
+    profile = load_profile_stats(LOGIN)
+  _github.delay = 0.0
+  # The language pages were fetched on worker threads and still reached the trace
+  queries = [current for current in trace.spans if current.name == "github.graphql"]
+  assert len(queries) > 1
+  # The language totals started loading before the profile query came back
+  fetches = sorted((current for current in trace.spans if current.name == "fetch"), key=lambda current: current.start)
+  profile_query = next(current for current in fetches if current.attributes["operation"] == "profile")
+  languages = next(current for current in fetches if current.attributes["operation"] == "repo_languages")
+  assert languages.start < profile_query.start + profile_query.duration
+  get_cache().clear()
+  assert asyncio.run(aload_profile_stats(LOGIN)) == profile
+
+def test_gathering_works_inside_an_event_loop():
+  profile = _profile()
+  stats = (get_user_stats(LOGIN), get_repo_stats(LOGIN), get_contribution_stats(LOGIN))
+
+  async def handler():
+    return gather_profile(LOGIN), gather_stats(LOGIN)
+
+  assert asyncio.run(handler()) == (profile, stats)
+
+def test_top_languages_are_the_largest():
+  # In first seen order, the largest language comes from the last repository
+  sizes = {f"Lang{i}": i + 1 for i in range(12)}
+  sizes["Big"] = 1000
+  languages = RepoLanguageStats(sizes)
+  assert [language for language, _ in top_languages_of(languages, 3)] == ["Big", "Lang11", "Lang10", "Other (10 languages)"]
+  text = render(replace(_profile(), languages=languages))
+  assert "Big: " in text and "Lang3: " in text and "Lang2: " not in text
+  assert "Other (3 languages): " in text
+
+def test_renderers_are_pluggable():
+  @renderer("csv", UserStats)
+  def user_csv(stats, **options):
+    return f"{stats.name},{stats.followers}"
+
+  user = _profile().user
+  assert render(user, "csv") == f"{user.name},{user.followers}"
+  try:
+    render(user, "yaml")
+    assert False, "rendered an unknown style"
+  except ValueError:
+    pass
+
+def test_unknown_user_is_an_error():
+  get_cache().clear()
+  assert "errors" in get_user_stats("no-such-user")
+  try:
+    UserStats.from_response({"data": {"user": None}})
+    assert False, "built stats without a user"
+  except LookupError:
+    pass
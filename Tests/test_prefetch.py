@@ -0,0 +1,132 @@
+"""
+Watched users must be answered from prefetched stats, refreshed more often
+the more active they are.
+
+Runs against the stub GitHub server.
+"""
+import threading, time
+from datetime import date, timedelta
+
+from stubs import shared_github_server
+
+_github = shared_github_server()
+
+from github_tools import prefetch
+from github_tools.cache import get_cache
+from github_tools.contribution_calendar import ContributionCalendar
+from github_tools.models import UserStats, ContributionStats, ProfileStats
+from github_tools.github_tools import get_user_stats, get_repo_stats, get_contribution_stats, gather_stats
+from github_tools.prefetch import PrefetchScheduler, refresh_interval
+
+def _wait_for(condition, timeout: float = 10.0):
+  deadline = time.monotonic() + timeout
+  while not condition():
+    assert time.monotonic() < deadline, "timed out"
+    time.sleep(0.01)
+
+def _profile(name: str, days_idle=None) -> ProfileStats:
+  """
+  Stats of a user who last contributed `days_idle` days ago, never for None.
+  """
+  calendar = ContributionCalendar(date.today() - timedelta(days=days_idle or 0), [0 if days_idle is None else 1])
+  return ProfileStats(UserStats(name=name, created_at="2020-01-01T00:00:00Z"), contributions=ContributionStats.from_calendar(calendar))
+
+def _serving(scheduler: PrefetchScheduler):
+  """
+  Make `scheduler` the process wide one for the duration of a test.
+  """
+  class Serving:
+    def __enter__(self):
+      prefetch._scheduler = scheduler.start()
+      return scheduler
+
+    def __exit__(self, *exc):
+      prefetch._scheduler = None
+      scheduler.stop()
+
+  return Serving()
+
+def test_interval_follows_activity():
+  assert refresh_interval(0, 60, 3600) == 60
+  assert refresh_interval(3, 60, 3600) == 240
+  assert refresh_interval(400, 60, 3600) == 3600
+  assert refresh_interval(None, 60, 3600) == 3600
+
+def test_watched_users_are_served_from_memory():
+  _github.delay = 0.0
+  get_cache().clear()
+  expected = (get_user_stats("veteran"), get_repo_stats("veteran"), get_contribution_stats("veteran"))
+
+  with _serving(PrefetchScheduler(["veteran"])) as scheduler:
+    _wait_for(lambda: scheduler.get("veteran") is not None)
+    before = len(_github.requests)
+    start = time.perf_counter()
+    served = (get_user_stats("Veteran"), get_repo_stats("veteran"), get_contribution_stats("veteran"))
+    elapsed = time.perf_counter() - start
+    assert gather_stats("veteran") == served
+    assert len(_github.requests) == before
+  assert served == expected
+  assert elapsed < 0.05, elapsed
+
+def test_active_users_are_refreshed_more_often():
+  calls = {"active": 0, "dormant": 0}
+  lock = threading.Lock()
+
+  def compute(username):
+    with lock:
+      calls[username] += 1
+    return _profile(username, 0 if username == "active" else None)
+
+  with _serving(PrefetchScheduler(["active", "dormant"], min_interval=0.05, max_interval=5, compute=compute)) as scheduler:
+    time.sleep(0.6)
+    stats = scheduler.stats()
+  assert calls["dormant"] == 1
+  assert calls["active"] >= 5, calls
+  assert stats["watched"] == 2 and stats["warm"] == 2
+
+def test_busy_workers_do_not_spin_the_scheduler():
+  release = threading.Event()
+  def compute(username):
+    release.wait(5)
+    return _profile(username, 0)
+
+  # More watched users than workers: the rest stay due while the workers are busy
+  scheduler = PrefetchScheduler([f"user-{i}" for i in range(10)], min_interval=60, workers=2, compute=compute).start()
+  try:
+    _wait_for(lambda: scheduler.stats()["running"] == 2)
+    cpu = time.process_time()
+    time.sleep(1.0)
+    assert time.process_time() - cpu < 0.2
+    release.set()
+    # Finished refreshes wake the scheduler for the users still due
+    _wait_for(lambda: scheduler.stats()["warm"] == 10)
+  finally:
+    release.set()
+    scheduler.stop()
+
+def test_failed_refresh_keeps_the_previous_stats():
+  results = [_profile("first", 0)]
+
+  def compute(username):
+    if results:
+      return results.pop()
+    raise LookupError("GitHub is down")
+
+  scheduler = PrefetchScheduler(["someone"], min_interval=60, compute=compute)
+  assert scheduler.refresh("someone")
+  assert not scheduler.refresh("someone")
+  assert scheduler.get("someone")["profile"].user.name == "first"
+
+def test_stale_stats_are_not_served():
+  scheduler = PrefetchScheduler(["someone"], min_interval=0.05, max_interval=0.05, compute=lambda username: _profile(username, 0))
+  scheduler.refresh("someone")
+  assert scheduler.get("someone") is not None
+  time.sleep(0.15)
+  assert scheduler.get("someone") is None
+
+def test_unwatched_users_are_fetched():
+  scheduler = PrefetchScheduler([], compute=lambda username: _profile("prefetched", 0))
+  with _serving(scheduler):
+    scheduler.refresh("small-user")
+    assert prefetch.prefetched("small-user") is None
+    assert "prefetched" not in get_user_stats("small-user")
@@ -0,0 +1,96 @@
+"""
+The stored language totals must match a full rebuild after every refresh,
+while a refresh only downloads the languages of pushed repositories.
+
+Runs against the stub GitHub server.
+"""
+import asyncio
+
+from stubs import Fixture, shared_github_server
+
+# Hundreds of repositories, two of them with more than 100 languages
+FIXTURE = Fixture("dormant-org", repositories=450, languages_per_repo=4, wide_repositories=2, years=2, seed=5)
+
+_github = shared_github_server(FIXTURE)
+
+from github_tools.cache import get_cache
+from github_tools.fetch_data import iter_repositories
+from github_tools.github_tools import process_repo_data, get_repo_stats
+from github_tools.repo_languages import repo_language_totals, arepo_language_totals
+from github_tools.tracing import start_trace
+
+def _reset():
+  get_cache().clear()
+  _github.delay = 0.0
+  FIXTURE.pushes.clear()
+  FIXTURE.repositories = 450
+
+def _refresh(function=repo_language_totals) -> tuple:
+  """
+  Refreshed totals, GitHub requests sent and response bytes received.
+  """
+  before = len(_github.requests)
+  with start_trace() as trace:
+    totals = function(FIXTURE.login, max_age=0)
+  received = sum(stage.get("bytes", 0) for stage in trace.summary() if stage["stage"] == "github.graphql")
+  return totals, len(_github.requests) - before, received
+
+def _sorted(totals: dict) -> dict:
+  return dict(sorted(totals.items()))
+
+def _walked_totals() -> dict:
+  # Totals of a full walk, without the cached first page of the profile query
+  get_cache().clear()
+  totals = {}
+  for repo in iter_repositories(FIXTURE.login):
+    for edge in repo["languages"]["edges"]:
+      totals[edge["node"]["name"]] = totals.get(edge["node"]["name"], 0) + edge["size"]
+  return totals
+
+def test_cold_call_matches_full_walk():
+  _reset()
+  stats = get_repo_stats(FIXTURE.login)
+  # What get_repo_stats computed before the totals were stored
+  get_cache().clear()
+  assert stats == process_repo_data(iter_repositories(FIXTURE.login))
+
+def test_fresh_totals_send_no_request():
+  _reset()
+  repo_language_totals(FIXTURE.login)
+  before = len(_github.requests)
+  repo_language_totals(FIXTURE.login)
+  assert len(_github.requests) == before
+
+def test_warm_refresh_lists_repositories_only():
+  _reset()
+  _, _, cold_bytes = _refresh()
+  totals, requests, received = _refresh()
+  assert requests == 5
+  assert received < cold_bytes / 4, (received, cold_bytes)
+  assert _sorted(totals) == _sorted(_walked_totals())
+
+def test_pushed_repositories_are_folded_in():
+  _reset()
+  _refresh()
+  for index in (0, 3, 200, 449):
+    FIXTURE.push(index)
+  totals, requests, _ = _refresh()
+  # 5 listing pages, 1 batch of 4 repositories and the second language page of the wide repo-0
+  assert requests == 5 + 1 + 1
+  assert _sorted(totals) == _sorted(_walked_totals())
+
+def test_deleted_repositories_are_subtracted():
+  _reset()
+  _refresh()
+  FIXTURE.repositories = 300
+  totals, _, _ = _refresh()
+  assert _sorted(totals) == _sorted(_walked_totals())
+
+def test_async_refresh_matches_sync():
+  _reset()
+  asyncio.run(arepo_language_totals(FIXTURE.login))
+  FIXTURE.push(7)
+  FIXTURE.push(1)
+  totals, requests, _ = _refresh(lambda login, max_age: asyncio.run(arepo_language_totals(login, max_age)))
+  assert requests == 5 + 1 + 1
+  assert _sorted(totals) == _sorted(_walked_totals())
@@ -0,0 +1,49 @@
+"""
+The session pool must stay within `max_sessions` agents: a new session waits
+while every pooled agent is running a turn, then takes over an idle one.
+"""
+import threading, time
+from types import SimpleNamespace
+
+from serving import SessionPool
+
+class _Memory:
+  def clear(self):
+    pass
+
+def _pool(max_sessions: int):
+  built = []
+
+  def factory():
+    agent = SimpleNamespace(team=[], memory=_Memory(), session_id=None)
+    built.append(agent)
+    return agent
+
+  return SessionPool(factory, max_sessions), built
+
+def test_busy_pool_does_not_grow():
+  pool, built = _pool(2)
+  first, second = pool.acquire("first"), pool.acquire("second")
+  acquired = []
+  waiter = threading.Thread(target=lambda: acquired.append(pool.acquire("third")))
+  waiter.start()
+  time.sleep(0.2)
+  # Both agents run a turn, so the third session waits instead of building one more
+  assert waiter.is_alive() and not acquired
+  assert len(built) == 2 and len(pool) == 2
+
+  pool.release("first")
+  waiter.join(5)
+  assert acquired == [first]
+  assert len(built) == 2 and len(pool) == 2
+  pool.release("second")
+  pool.release("third")
+  # The first session lost its agent and gets the idle one of the second
+  assert pool.acquire("first") is second
+
+def test_idle_agents_are_recycled_without_waiting():
+  pool, built = _pool(2)
+  for session_id in ("a", "b", "c", "d"):
+    pool.acquire(session_id)
+    pool.release(session_id)
+  assert len(built) == 2 and len(pool) == 2
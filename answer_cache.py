@@ -0,0 +1,213 @@
+"""
+Cache of agent answers, in front of the agent team.
+
+Many questions repeat verbatim or nearly so ("what languages does octocat
+use", "octocat's longest streak"). An answer is stored under the normalized
+prompt together with the usernames the stats tools were called for and a
+version hash of those users' GitHub data. A repeated question is answered
+from the cache as long as the data hashes the same. Once the data changes
+(new contributions, pushed repositories, profile edits) the agent runs
+again.
+
+Only self-contained turns are stored: every tool call went to the stats
+tools, every user they were called for is named in the prompt, and the
+leader called no other tools. Follow-ups like "and their languages?" depend
+on the chat history and always reach the agent.
+
+Entries live in a `ResponseCache` of their own: an in-process LRU in front
+of a SQLite file (`ANSWER_CACHE_URL`), with a time to live and a size limit.
+Lookups are exported as `github_agent_answer_cache_lookups_total{result=...}`
+and the `github_agent_answer_cache_hit_ratio` gauge.
+"""
+import hashlib, json, os, re, threading, unicodedata
+from github_tools.cache import ResponseCache, fingerprint
+from github_tools.tracing import metrics, span, start_trace
+
+# SQLAlchemy URL of the stored answers, empty to keep them in memory only
+ANSWER_CACHE_URL = os.getenv("ANSWER_CACHE_URL", "sqlite:///" + os.path.join(os.path.expanduser("~"), ".cache", "github-agent", "answers.db"))
+# Seconds an answer is kept at most, 0 disables the cache
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", str(24 * 60 * 60)))
+ANSWER_CACHE_MAX_BYTES = int(os.getenv("ANSWER_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+ANSWER_CACHE_LRU_SIZE = int(os.getenv("ANSWER_CACHE_LRU_SIZE", "256"))
+
+# Words that do not change what is asked
+FILLER_WORDS = {"please", "pls", "thanks", "thank", "hey", "hi", "hello", "can", "could", "would", "you", "me", "the", "a", "an"}
+# Words of a prompt: usernames keep their single hyphens
+WORD = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Lowercase words of a prompt without punctuation, possessives and filler words.
+
+    "Hey, what's @Octocat's longest streak?" becomes "what octocat longest streak".
+    """
+    text = unicodedata.normalize("NFKC", prompt).lower().replace("’", "'")
+    text = re.sub(r"'s\b", "", text)
+    return " ".join(word for word in WORD.findall(text) if word not in FILLER_WORDS)
+
+def data_version(usernames) -> str:
+    """
+    Hash of the profile, language and contribution stats of the users.
+
+    The stats come from the same caches and prefetched data the tools use,
+    so the hash changes exactly when the tools would return something new.
+
+    Raises:
+        LookupError: If a user cannot be fetched.
+    """
+    from github_tools.github_tools import gather_profile
+    from github_tools.models import encode
+
+    digest = hashlib.sha1()
+    for username in sorted({username.lower() for username in usernames}):
+        digest.update(username.encode("UTF-8"))
+        digest.update(json.dumps(encode(gather_profile(username)), sort_keys=True, separators=(",", ":")).encode("UTF-8"))
+    return digest.hexdigest()[:16]
+
+class AnswerCache:
+    """
+    Answers of self-contained questions, reused while the GitHub data they were built from is unchanged.
+
+    Args:
+        url (str): SQLAlchemy URL of the stored answers, empty for memory only.
+        ttl (float): Seconds an answer is kept at most.
+        max_bytes (int): Size limit of the stored answers.
+        lru_size (int): Answers kept in process memory.
+        version (callable): Version hash of the data of some usernames, `data_version` by default.
+    """
+
+    def __init__(self, url: str = ANSWER_CACHE_URL, ttl: float = ANSWER_CACHE_TTL, max_bytes: int = ANSWER_CACHE_MAX_BYTES,
+                 lru_size: int = ANSWER_CACHE_LRU_SIZE, version=data_version):
+        self.ttl = ttl
+        self.version = version
+        self.store = ResponseCache(url, max_bytes, lru_size)
+        self._lock = threading.Lock()
+        self._lookups = {"hit": 0, "miss": 0, "stale": 0}
+
+    def lookup(self, prompt: str):
+        """
+        The cached answer to `prompt`, None if there is none or the data it was built from changed.
+        """
+        with span("answer_cache") as current:
+            entry = self.store.get(_key(prompt))
+            result = "miss"
+            if entry is not None:
+                result = "hit" if self._current_version(entry["usernames"]) == entry["version"] else "stale"
+            current.set(hits=int(result == "hit"))
+            if result == "hit":
+                # The users the answer is about, e.g. for the charts of the app
+                current.set(usernames=entry["usernames"])
+        self._count(result)
+        return entry["answer"] if result == "hit" else None
+
+    def save(self, prompt: str, answer: str, usernames) -> bool:
+        """
+        Store the answer to `prompt`, built from the data of `usernames`.
+
+        Returns:
+            bool: False if the turn is not self-contained or the data version is unknown.
+        """
+        usernames = sorted({username.lower() for username in usernames})
+        words = set(normalize_prompt(prompt).split())
+        if not answer or not usernames or not words.issuperset(usernames):
+            return False
+        version = self._current_version(usernames)
+        if version is None:
+            return False
+        self.store.set(_key(prompt), {"usernames": usernames, "version": version, "answer": answer}, self.ttl)
+        return True
+
+    def run(self, agent, prompt: str, **run_kwargs):
+        """
+        Stream the answer of `agent` to `prompt`, from the cache when possible.
+
+        A cached answer is yielded as a single `RunResponse` and added to the
+        agent's memory, so follow-up questions still see it. Otherwise the
+        agent runs as usual and its answer is stored if the turn was
+        self-contained.
+
+        Args:
+            agent: The agent team of the session.
+            prompt (str): The user's message.
+            **run_kwargs: Passed to `agent.run`.
+
+        Yields:
+            RunResponse: The streamed run response chunks.
+        """
+        from agno.run.response import RunEvent, RunResponse
+        from memory_policy import remember_turn
+
+        answer = self.lookup(prompt)
+        if answer is not None:
+            remember_turn(agent, prompt, answer)
+            yield RunResponse(content=answer, event=RunEvent.run_response.value)
+            return
+
+        parts = []
+        with start_trace() as trace:
+            for chunk in agent.run(prompt, stream=True, **run_kwargs):
+                if chunk.event == RunEvent.run_response and isinstance(chunk.content, str):
+                    parts.append(chunk.content)
+                yield chunk
+        usernames = _tool_usernames(agent, trace)
+        if usernames is not None:
+            self.save(prompt, "".join(parts), usernames)
+
+    def stats(self) -> dict:
+        """
+        Lookups per result (hit, miss, stale), hit_rate and the stored answers.
+        """
+        store = self.store.stats()
+        with self._lock:
+            lookups = sum(self._lookups.values())
+            return dict(
+                self._lookups,
+                hit_rate=round(self._lookups["hit"] / lookups, 4) if lookups else 0.0,
+                entries=store["entries"] or store["memory_entries"],
+                bytes=store["bytes"],
+            )
+
+    def _current_version(self, usernames):
+        try:
+            return self.version(usernames)
+        except Exception as e:
+            print(f"Answer cache could not version {usernames}: {str(e)}")
+            return None
+
+    def _count(self, result: str):
+        with self._lock:
+            self._lookups[result] += 1
+            lookups = sum(self._lookups.values())
+            ratio = self._lookups["hit"] / lookups
+        metrics.inc("github_agent_answer_cache_lookups_total", help="Answer cache lookups", result=result)
+        metrics.gauge("github_agent_answer_cache_hit_ratio", ratio, help="Share of answer cache lookups that were hits")
+
+def _key(prompt: str) -> str:
+    return "answer:" + fingerprint(normalize_prompt(prompt))
+
+def _tool_usernames(agent, trace):
+    """
+    Usernames the stats tools were called for in a turn, None if the turn is not self-contained.
+    """
+    # The leader may only have delegated, its other tools read data the version does not cover
+    leader_tools = [call.get("tool_name") or "" for call in (agent.run_response.tools or [])] if agent.run_response else []
+    if any(not name.startswith("transfer_task_to_") for name in leader_tools):
+        return None
+    calls = [current.attributes for current in trace.spans if current.name == "tool"]
+    if not calls or any("username" not in call for call in calls):
+        return None
+    return {call["username"] for call in calls}
+
+_answer_cache = None
+_answer_cache_lock = threading.Lock()
+
+def get_answer_cache():
+    """
+    The process wide answer cache, None when `ANSWER_CACHE_TTL` is 0.
+    """
+    global _answer_cache
+    if _answer_cache is None and ANSWER_CACHE_TTL > 0:
+        with _answer_cache_lock:
+            if _answer_cache is None:
+                _answer_cache = AnswerCache()
+    return _answer_cache
@@ -1,5 +1,106 @@
+import os
+from uuid import uuid4
+import requests
 import streamlit as st
-from github_agent import github_main_agent
+from fast_path import try_fast_path
+from github_tools.tracing import start_trace
+from serving import ServerBusy
+
+@st.cache_resource
+def load_server():
+  """Start the agent server once per process; every browser session gets its own agent team from it."""
+  from serving import get_server
+  # The app draws the stats charts itself, the agents only narrate them
+  return get_server(charts=True)
+
+@st.cache_resource
+def load_prefetch():
+  """Start refreshing the watchlist in the background once per process, None without a watchlist."""
+  from github_tools.prefetch import start_prefetch
+  return start_prefetch()
+
+@st.fragment
+def show_chart(username, chart):
+  """
+  Contribution heatmap or language chart of a user, a fragment so its controls only re-render the chart, not the answer.
+  """
+  from charts import CHART_TITLES, chart_spec
+  from github_tools.github_tools import STATS_ERRORS
+  from github_tools.render import PROFILE_TOP_LANGUAGES
+  options = {}
+  if chart == "languages":
+    options["top_languages"] = None if st.toggle("All languages", key=f"all-languages-{username}") else PROFILE_TOP_LANGUAGES
+  try:
+    spec = chart_spec(username, chart, **options)
+  except (*STATS_ERRORS, requests.exceptions.RequestException):
+    # Unreadable or unavailable data, the answer explains it
+    return
+  if spec is not None:
+    st.markdown(f"**{CHART_TITLES[chart]} of {username}**")
+    st.vega_lite_chart(spec, use_container_width=True)
+
+def show_charts(trace, charts, drawn):
+  """
+  Draw the charts of the stats tools that returned since the last call into the `charts` container.
+  """
+  from charts import charted_users
+  for username, chart in charted_users(list(trace.spans)):
+    if (username, chart) not in drawn:
+      drawn.add((username, chart))
+      with charts:
+        show_chart(username, chart)
+
+def stream_answer(turn, status, trace, charts):
+  """
+  Yield the leader's answer token by token, reporting tool calls on the status widget
+  and drawing the charts of the looked up stats as soon as their tools return.
+  """
+  from agno.run.response import RunEvent
+  started = False
+  drawn = set()
+  for chunk in turn:
+    if not started:
+      # The turn left the queue
+      status.update(label="🤔 Thinking...")
+      started = True
+    if chunk.event == RunEvent.tool_call_started:
+      status.update(label=f"🔧 Running {chunk.content}")
+      status.write(f"🔧 {chunk.content}")
+    elif chunk.event == RunEvent.tool_call_completed:
+      status.update(label="🤔 Thinking...")
+    elif chunk.event == RunEvent.run_response and isinstance(chunk.content, str):
+      yield chunk.content
+    show_charts(trace, charts, drawn)
+  show_charts(trace, charts, drawn)
+  status.update(label="✅ Done", state="complete", expanded=False)
+
+def show_timing(trace):
+  """
+  Per-stage breakdown of the last turn: GitHub fetches, processing, tools and model calls.
+  """
+  st.subheader("⏱️ Timing")
+  st.caption(f"Last turn took {trace['elapsed'] * 1000:.0f} ms")
+  stats = load_server().stats()
+  st.caption(f"Agent server: {stats['in_flight']}/{stats['max_concurrency']} running, {stats['queued']} waiting, {stats['sessions']} sessions")
+  answers = load_server().answer_cache
+  if answers is not None:
+    stats = answers.stats()
+    st.caption(f"Answer cache: {stats['hit']} hits, {stats['miss'] + stats['stale']} misses ({stats['hit_rate']:.0%}), {stats['entries']} answers stored")
+  prefetch = load_prefetch()
+  if prefetch is not None:
+    stats = prefetch.stats()
+    st.caption(f"Prefetch: {stats['warm']}/{stats['watched']} watched users warm, oldest {stats['max_staleness'] / 60:.0f} min, {stats['overdue']} overdue")
+  st.dataframe([
+    {
+      "stage": stage["stage"],
+      "calls": stage["count"],
+      "ms": round(stage["seconds"] * 1000),
+      "bytes": stage.get("bytes", 0),
+      "GraphQL cost": stage.get("graphql_cost", 0),
+      "tokens": stage.get("prompt_tokens", 0) + stage.get("completion_tokens", 0),
+    }
+    for stage in trace["stages"]
+  ], hide_index=True)
 
 def promo():
   with open("./static/sidebar.html", "r", encoding="UTF-8") as sidebar_file:
@@ -14,6 +115,7 @@ def main():
     page_icon="👽",
     layout="centered"
   )
+  load_prefetch()
 
   with st.sidebar:
     st.title("🚀Agno GitHub Agent\n**GitHub AI Agent** is an intelligent assistant designed to help you analyze and interpret GitHub data effortlessly.  ")
@@ -43,18 +145,41 @@ def main():
 
   Let's dive into your GitHub stats! 🚀
   """)
+    show_timings = st.checkbox("⏱️ Show timing", value=os.getenv("GITHUB_AGENT_TIMING", "") == "1")
+    timing_panel = st.empty()
     promo()
 
+  # Each browser session chats with its own agent team
+  st.session_state.setdefault("session_id", uuid4().hex)
   prompt = st.chat_input("Type something...")
 
   if prompt:
     with st.chat_message('user'):
       st.write(prompt)
 
-    response = github_main_agent.run(prompt) #Agent Response
+    with st.chat_message('ai'), start_trace() as trace:
+      # Plain stats requests are answered straight from the GitHub tools
+      answer = try_fast_path(prompt)
+      if answer is not None:
+        st.write(answer)
+        # Follow-ups go to the agents, they need to know what was shown
+        load_server().remember(st.session_state.session_id, prompt, answer)
+      else:
+        server = load_server()
+        try:
+          turn = server.submit(st.session_state.session_id, prompt, stream_intermediate_steps=True)
+        except ServerBusy:
+          st.warning("⏳ Too many chats are running right now, please try again in a moment.")
+        else:
+          waiting = server.stats()["in_flight"] >= server.max_concurrency
+          status = st.status("⏳ Waiting for a free slot..." if waiting else "🤔 Thinking...", expanded=False)
+          charts = st.container()
+          st.write_stream(stream_answer(turn, status, trace, charts)) #Agent Response
+    st.session_state.last_trace = {"elapsed": trace.elapsed, "stages": trace.summary()}
 
-    with st.chat_message('ai'):
-      st.write(response.content)
+  if show_timings and "last_trace" in st.session_state:
+    with timing_panel.container():
+      show_timing(st.session_state.last_trace)
 
 if __name__ == "__main__":
   main()
\ No newline at end of file
@@ -0,0 +1,90 @@
+"""
+Charts of the stats an agent turn looked up, drawn by the Streamlit app next to the answer.
+
+Every stats tool records the user it was called for on its "tool" span (see
+`github_tools.tracing.traced_tool`). While a turn streams, `charted_users`
+reads those spans from the turn's trace. The app then draws the contribution
+heatmap and the language chart of each user from the stats models, rendered
+in the "vega_lite" style, as soon as the tool has returned. Charts are only
+built from stats the tools already loaded, never fetched, so drawing them
+does not hold up the streamed answer. The model only writes a short
+narrative around them, see `instructions.team_instructions.charts_instruction`.
+"""
+from github_tools.github_tools import cached_contribution_stats, cached_language_stats
+from github_tools.prefetch import prefetched
+from github_tools.render import render
+
+# Charts worth drawing once a stats tool has returned, in the order they are shown
+CHART_TOOLS = {
+    "get_full_profile": ("contributions", "languages"),
+    "get_contribution_stats": ("contributions",),
+    "get_contribution_trends": ("contributions",),
+    "get_weekday_distribution": ("contributions",),
+    "get_burnout_signals": ("contributions",),
+    "get_activity_forecast": ("contributions",),
+    "get_repo_stats": ("languages",),
+}
+CHART_TITLES = {
+    "contributions": "📈 Contributions, last 12 months",
+    "languages": "💻 Languages",
+}
+_CACHED = {
+    "contributions": cached_contribution_stats,
+    "languages": cached_language_stats,
+}
+
+def charted_users(spans) -> list:
+    """
+    (username, chart) pairs to draw for the tool calls among `spans`, in call order and without repeats.
+
+    Answers served from the answer cache come with both charts of the users they are about.
+
+    Args:
+        spans (iterable): `Span`s of a turn, e.g. `trace.spans`.
+
+    Returns:
+        list: Pairs of a lowercase username and "contributions" or "languages".
+    """
+    pairs = []
+    for current in spans:
+        if current.name == "tool":
+            usernames = [current.attributes.get("username")]
+            charts = CHART_TOOLS.get(current.attributes.get("tool"), ())
+        elif current.name == "answer_cache":
+            usernames = current.attributes.get("usernames", ())
+            charts = tuple(CHART_TITLES)
+        else:
+            continue
+        for username in usernames:
+            if not isinstance(username, str):
+                continue
+            for chart in charts:
+                if (username.lower(), chart) not in pairs:
+                    pairs.append((username.lower(), chart))
+    return pairs
+
+def chart_spec(username: str, chart: str, **options):
+    """
+    Vega-Lite spec of one chart of a GitHub user, from the prefetched or cached stats the tools just used.
+
+    Never sends a request: a chart whose data is not loaded is left out.
+
+    Args:
+        username (str): GitHub username.
+        chart (str): "contributions" for the heatmap, "languages" for the language chart.
+        **options: Passed to the renderer, e.g. `top_languages`.
+
+    Returns:
+        dict: The spec, None if the data of the chart is not loaded or empty.
+
+    Raises:
+        KeyError: If the cached data misses expected keys.
+        TypeError: If the cached data is not of the expected type.
+    """
+    warm = prefetched(username)
+    stats = getattr(warm, chart, None) if warm is not None else None
+    if stats is None:
+        stats = _CACHED[chart](username)
+    if stats is None or (chart == "languages" and not stats.sizes):
+        return None
+    return render(stats, "vega_lite", **options)
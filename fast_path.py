@@ -0,0 +1,48 @@
+import re
+from github_tools.github_tools import gather_profile, STATS_ERRORS
+from github_tools.render import render
+
+# GitHub usernames: alphanumerics and single hyphens, at most 39 characters
+NAME = r"(?P<username>[A-Za-z0-9](?:[A-Za-z0-9]|-(?=[A-Za-z0-9])){0,38})"
+# Only names marked as usernames, "@octocat" or "user octocat": a bare word
+# ("stats for python", "profile of me") is left to the agent
+USERNAME = rf"(?:@|(?:github\s+)?user(?:name)?\s+){NAME}"
+STATS = r"(?:github\s+)?(?:stats|statistics|profile|profile\s+stats|summary|overview)"
+
+# Prompts that only ask for the standard stats of one user
+STATS_PATTERNS = [
+    re.compile(rf"^(?:please\s+)?(?:(?:show|get|give|fetch|display)\s+(?:me\s+)?)?(?:the\s+)?{STATS}\s+(?:for|of|on)\s+{USERNAME}(?:\s+please)?$", re.IGNORECASE),
+    re.compile(rf"^(?:please\s+)?(?:(?:show|get|give|fetch|display)\s+(?:me\s+)?)?{USERNAME}(?:'s|’s)?\s+{STATS}(?:\s+please)?$", re.IGNORECASE),
+]
+
+def match_stats_request(prompt: str):
+    """
+    Return the username if the prompt is a plain stats request like "stats for @octocat", else None.
+    """
+    text = prompt.strip().rstrip("?!. ")
+    for pattern in STATS_PATTERNS:
+        match = pattern.match(text)
+        if match:
+            return match.group("username")
+    return None
+
+def try_fast_path(prompt: str):
+    """
+    Answer plain stats requests directly from the GitHub tools, without any LLM call.
+
+    Args:
+        prompt (str): The user's message.
+
+    Returns:
+        str: Markdown answer, or None if the prompt needs the agent.
+    """
+    username = match_stats_request(prompt)
+    if username is None:
+        return None
+
+    try:
+        profile = gather_profile(username)
+    except STATS_ERRORS:
+        # Unknown user or API failure, let the agent explain it
+        return None
+    return render(profile, "markdown", username=username)
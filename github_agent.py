@@ -1,68 +1,189 @@
-from agno.agent import Agent
-from agno.tools.github import GithubTools
-from agno.models.openai import OpenAIChat
-from agno.playground import Playground, serve_playground_app
-from instructions.main_agent_instructions import main_agent, stat_agent
-from instructions.team_instructions import process_instruction
-from github_tools.github_tools import get_contribution_stats, get_repo_stats, get_user_stats
 import os
-from dotenv import load_dotenv
-load_dotenv()
+from functools import lru_cache
+from instructions.main_agent_instructions import main_agent, stat_agent
+from instructions.team_instructions import process_instruction, charts_instruction
+
+# Agents, tools and the Playground app are built on first use by the factories
+# below, so importing this module stays cheap for app.py and batch jobs.
+
+# Tokens of chat history each agent gets back per turn, see memory_policy.py
+MAIN_AGENT_HISTORY_TOKENS = int(os.getenv("MAIN_AGENT_HISTORY_TOKENS", "2000"))
+STATS_AGENT_HISTORY_TOKENS = int(os.getenv("STATS_AGENT_HISTORY_TOKENS", "1000"))
+
+@lru_cache(maxsize=None)
+def _load_env():
+  from dotenv import load_dotenv
+  load_dotenv()
+
+@lru_cache(maxsize=None)
+def _traced_chat_class():
+  # OpenAIChat recording every model call as an "llm" span with its token usage
+  from agno.models.openai import OpenAIChat
+  from github_tools.tracing import span
+
+  def record_usage(current, usage):
+    if usage is not None:
+      current.set(prompt_tokens=usage.prompt_tokens, completion_tokens=usage.completion_tokens)
+
+  class TracedOpenAIChat(OpenAIChat):
+
+    def invoke(self, messages):
+      with span("llm", model=self.id) as current:
+        response = super().invoke(messages)
+        record_usage(current, response.usage)
+        return response
+
+    async def ainvoke(self, messages):
+      with span("llm", model=self.id) as current:
+        response = await super().ainvoke(messages)
+        record_usage(current, response.usage)
+        return response
+
+    def invoke_stream(self, messages):
+      with span("llm", model=self.id) as current:
+        for chunk in super().invoke_stream(messages):
+          record_usage(current, chunk.usage)
+          yield chunk
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-GITHUB_ACCESS_TOKEN = os.getenv("GITHUB_ACCESS_TOKEN")
+    async def ainvoke_stream(self, messages):
+      with span("llm", model=self.id) as current:
+        async for chunk in super().ainvoke_stream(messages):
+          record_usage(current, chunk.usage)
+          yield chunk
 
-model = OpenAIChat(
-  id="gpt-4o-mini",
-  api_key=OPENAI_API_KEY
-)
+  return TracedOpenAIChat
+
+@lru_cache(maxsize=None)
+def _openai_client():
+  # One connection pool shared by every model instance
+  from openai import OpenAI
+  _load_env()
+  return OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+def build_model():
+  """New model instance. agno keeps the tools of the running agent on its model, so agents that may run at the same time need their own."""
+  _load_env()
+  return _traced_chat_class()(
+    id="gpt-4o-mini",
+    api_key=os.getenv("OPENAI_API_KEY"),
+    client=_openai_client()
+  )
+
+@lru_cache(maxsize=None)
+def get_model():
+  return build_model()
 
 # Agno GitHub Tools
-github_tools = GithubTools(
-  access_token=GITHUB_ACCESS_TOKEN,
-  create_issue=False,
-  create_repository=False
-)
+@lru_cache(maxsize=None)
+def get_github_tools():
+  from agno.tools.github import GithubTools
+  _load_env()
+  return GithubTools(
+    access_token=os.getenv("GITHUB_ACCESS_TOKEN"),
+    create_issue=False,
+    create_repository=False
+  )
 
 # GitHub Stats Agent
-github_stats_agent = Agent(
-  name="GitHub Stats Agent",
-  model=model,
-  instructions= process_instruction,
-  tools=[get_contribution_stats, get_repo_stats, get_user_stats],
-  show_tool_calls=True,
-  read_chat_history=True,
-  markdown=True,
-  debug_mode=True
-)
+def build_stats_agent(charts=False):
+  """
+  New GitHub Stats Agent.
 
+  Args:
+    charts: The UI draws the contribution and language charts, ask for a short narrative instead of tables.
+  """
+  from agno.agent import Agent
+  from memory_policy import BoundedMemory
+  from github_tools.github_tools import (
+    get_full_profile, get_contribution_stats, get_contribution_history, get_repo_stats, get_user_stats,
+    get_contribution_trends, get_weekday_distribution, get_burnout_signals, get_activity_forecast,
+  )
+  return Agent(
+    name="GitHub Stats Agent",
+    model=build_model(),
+    instructions= process_instruction + charts_instruction if charts else process_instruction,
+    tools=[
+      get_full_profile, get_contribution_stats, get_contribution_history, get_repo_stats, get_user_stats,
+      get_contribution_trends, get_weekday_distribution, get_burnout_signals, get_activity_forecast,
+    ],
+    show_tool_calls=True,
+    read_chat_history=True,
+    memory=BoundedMemory(token_budget=STATS_AGENT_HISTORY_TOKENS),
+    markdown=True,
+    debug_mode=True
+  )
+
+@lru_cache(maxsize=None)
+def get_stats_agent():
+  return build_stats_agent()
 
 # Main GitHub Agent
-github_main_agent = Agent(
-  name="GitHub Agent",
-  model=model,
-  # instructions=main_agent, # for main agent
-  instructions=stat_agent, # for getting stats
-  tools= [github_tools], # Use tools when using main_agent instruction
-  team= [github_stats_agent], # Use Team when using own github functions and stat_agent instruction
-  show_tool_calls=True,
-  read_chat_history=True,
-  add_history_to_messages=True,
-  markdown=True,
-  debug_mode=True
-)
-
-# # CLI 
+def build_main_agent(stats_agent=None, charts=False):
+  """
+  New agent team with its own chat history, e.g. one per chat session.
+
+  Args:
+    stats_agent: Team member to use, a new GitHub Stats Agent by default.
+    charts: The UI draws the contribution and language charts, see `build_stats_agent`.
+  """
+  from agno.agent import Agent
+  from memory_policy import BoundedMemory
+  return Agent(
+    name="GitHub Agent",
+    model=build_model(),
+    # instructions=main_agent, # for main agent
+    instructions=stat_agent + charts_instruction if charts else stat_agent, # for getting stats
+    tools= [get_github_tools()], # Use tools when using main_agent instruction
+    team= [stats_agent or build_stats_agent(charts)], # Use Team when using own github functions and stat_agent instruction
+    show_tool_calls=True,
+    read_chat_history=True,
+    add_history_to_messages=True,
+    memory=BoundedMemory(token_budget=MAIN_AGENT_HISTORY_TOKENS),
+    markdown=True,
+    debug_mode=True
+  )
+
+@lru_cache(maxsize=None)
+def get_main_agent():
+  return build_main_agent(get_stats_agent())
+
+#Agno Playground, only built when served
+@lru_cache(maxsize=None)
+def get_playground_app():
+  from agno.playground import Playground
+  from fastapi.responses import PlainTextResponse
+  from github_tools.tracing import render_metrics
+  from github_tools.prefetch import start_prefetch
+  app = Playground(agents=[get_main_agent()]).get_app()
+  # Keeps the watchlist's stats warm, see GITHUB_WATCHLIST
+  start_prefetch()
+  # Prometheus scrape endpoint: stage latencies, GraphQL cost, bytes and tokens
+  app.add_api_route("/metrics", lambda: PlainTextResponse(render_metrics()), methods=["GET"])
+  return app
+
+_LAZY_ATTRIBUTES = {
+  "model": get_model,
+  "github_tools": get_github_tools,
+  "github_stats_agent": get_stats_agent,
+  "github_main_agent": get_main_agent,
+  "app": get_playground_app,
+}
+
+def __getattr__(name):
+  # Keeps `from github_agent import github_main_agent` and "github_agent:app" working
+  if name in _LAZY_ATTRIBUTES:
+    return _LAZY_ATTRIBUTES[name]()
+  raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# # CLI
 # while True:
 #   prompt = input("You: ")
 #   if prompt.lower().strip() == 'exit':
 #     break
 
-#   response = github_stat_agent.run(prompt)
+#   response = get_stats_agent().run(prompt)
 #   print(response.content)
 
-#Agno Playground
-app = Playground(agents=[github_main_agent]).get_app()
-
 if __name__ == "__main__":
-  serve_playground_app("github_agent:app", reload=True) # Agno Playground
\ No newline at end of file
+  from agno.playground import serve_playground_app
+  serve_playground_app("github_agent:app", reload=True) # Agno Playground
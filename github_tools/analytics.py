@@ -0,0 +1,233 @@
+import os
+from array import array
+from datetime import timedelta
+from itertools import accumulate
+from statistics import median
+from github_tools.contribution_calendar import ContributionCalendar
+from github_tools.encoding import monthly_totals
+
+# Windows of the rolling averages, in days
+ROLLING_WINDOWS = (7, 30, 90)
+
+# Days without contributions that count as an inactivity gap
+INACTIVITY_GAP_DAYS = int(os.getenv("CONTRIBUTION_GAP_DAYS", "14"))
+
+# Weeks of history the forecast trend is fitted on
+FORECAST_WEEKS = 12
+
+WEEKDAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+
+def prefix_sums(calendar: ContributionCalendar) -> array:
+    """
+    Cumulative counts with a leading 0, so the total of days `i` to `j - 1` is `sums[j] - sums[i]`.
+
+    Every window and chunk total below is one subtraction on this vector
+    instead of a pass over the days.
+    """
+    return array("Q", accumulate(calendar.counts, initial=0))
+
+def window_total(sums: array, start: int, end: int) -> int:
+    """
+    Total of the days `start` to `end - 1`, clamped to the calendar.
+    """
+    days = len(sums) - 1
+    start, end = max(0, min(start, days)), max(0, min(end, days))
+    return sums[end] - sums[start]
+
+def trailing_weeks(calendar: ContributionCalendar, sums: array = None) -> list:
+    """
+    Totals of the complete 7 day chunks ending on the last day of the calendar, oldest first.
+    """
+    sums = sums or prefix_sums(calendar)
+    days = len(calendar)
+    return [sums[end] - sums[end - 7] for end in range(days - (days // 7 - 1) * 7, days + 1, 7)]
+
+def rolling_averages(calendar: ContributionCalendar, windows=ROLLING_WINDOWS) -> dict:
+    """
+    Average daily contributions over the last N days, and over the N days before.
+
+    Args:
+        calendar (ContributionCalendar): The contribution calendar.
+        windows (tuple): Window lengths in days.
+
+    Returns:
+        dict: Window -> {"average", "previous", "change"} where change is the
+        relative difference in percent, None when the previous window is empty.
+    """
+    sums = prefix_sums(calendar)
+    days = len(calendar)
+    averages = {}
+    for window in windows:
+        current = window_total(sums, days - window, days) / window
+        previous = window_total(sums, days - 2 * window, days - window) / window
+        averages[window] = {
+            "average": round(current, 2),
+            "previous": round(previous, 2),
+            "change": round((current - previous) / previous * 100) if previous else None,
+        }
+    return averages
+
+def weekday_distribution(calendar: ContributionCalendar) -> list:
+    """
+    Contributions per weekday.
+
+    Returns:
+        list: One dict per weekday, Monday first, with `weekday`, `total`,
+        `share` (percent of all contributions) and `active_rate` (percent of those weekdays with activity).
+    """
+    totals = [0] * 7
+    active = [0] * 7
+    occurrences = [0] * 7
+    first = calendar.start.weekday()
+    for i, count in enumerate(calendar.counts):
+        weekday = (first + i) % 7
+        totals[weekday] += count
+        occurrences[weekday] += 1
+        if count:
+            active[weekday] += 1
+
+    total = sum(totals)
+    return [
+        {
+            "weekday": WEEKDAYS[weekday],
+            "total": totals[weekday],
+            "share": round(totals[weekday] / total * 100, 1) if total else 0.0,
+            "active_rate": round(active[weekday] / occurrences[weekday] * 100, 1) if occurrences[weekday] else 0.0,
+        }
+        for weekday in range(7)
+    ]
+
+def inactivity_gaps(calendar: ContributionCalendar, min_days: int = INACTIVITY_GAP_DAYS) -> list:
+    """
+    Runs of at least `min_days` days without contributions.
+
+    Returns:
+        list: (first day, days) of every gap, oldest first. A gap running up to
+        the end of the calendar is included.
+    """
+    gaps = []
+    start = None
+    for i, count in enumerate(calendar.counts):
+        if count == 0:
+            if start is None:
+                start = i
+        else:
+            if start is not None and i - start >= min_days:
+                gaps.append((calendar.date_at(start), i - start))
+            start = None
+    if start is not None and len(calendar) - start >= min_days:
+        gaps.append((calendar.date_at(start), len(calendar) - start))
+    return gaps
+
+def burnout_signals(calendar: ContributionCalendar, min_gap: int = INACTIVITY_GAP_DAYS) -> dict:
+    """
+    Signals of burnout: recent activity against the usual level, and bursts followed by long breaks.
+
+    The recent level is the last 4 weeks against the 12 weeks before them. A
+    burst is a week with at least twice the median active week, counted as
+    followed by a break when an inactivity gap starts within the next week.
+
+    Returns:
+        dict: Signals including:
+        - recent_average / usual_average: Daily averages of the last 28 days and the 84 days before.
+        - recent_change: Relative difference in percent, None without usual activity.
+        - days_since_last_contribution: None for a calendar without contributions.
+        - gaps: Inactivity gaps, see `inactivity_gaps`.
+        - longest_gap: Days of the longest gap, 0 if there is none.
+        - bursts_before_breaks: First days of the bursts that were followed by a gap.
+        - risk: "high", "moderate" or "low".
+    """
+    sums = prefix_sums(calendar)
+    days = len(calendar)
+    recent = window_total(sums, days - 28, days) / 28
+    usual = window_total(sums, days - 112, days - 28) / 84
+    change = round((recent - usual) / usual * 100) if usual else None
+
+    last_active = next((i for i in range(days - 1, -1, -1) if calendar.counts[i]), None)
+    idle = None if last_active is None else days - 1 - last_active
+
+    gaps = inactivity_gaps(calendar, min_gap)
+    gap_starts = {(start - calendar.start).days for start, _ in gaps}
+
+    weeks = [(start, sums[start + 7] - sums[start]) for start in range(0, days - 6, 7)]
+    active_weeks = [total for _, total in weeks if total]
+    threshold = 2 * median(active_weeks) if active_weeks else 0
+    bursts = [
+        calendar.date_at(start)
+        for start, total in weeks
+        if threshold and total >= threshold and any(start + 7 <= gap <= start + 14 for gap in gap_starts)
+    ]
+
+    if ((idle or 0) >= min_gap and usual > 0) or (change is not None and change <= -50):
+        risk = "high"
+    elif (change is not None and change <= -25) or bursts:
+        risk = "moderate"
+    else:
+        risk = "low"
+
+    return {
+        "recent_average": round(recent, 2),
+        "usual_average": round(usual, 2),
+        "recent_change": change,
+        "days_since_last_contribution": idle,
+        "gaps": gaps,
+        "longest_gap": max((length for _, length in gaps), default=0),
+        "bursts_before_breaks": bursts,
+        "risk": risk,
+    }
+
+def forecast(calendar: ContributionCalendar, weeks: int = 4, history_weeks: int = FORECAST_WEEKS) -> dict:
+    """
+    Forecast the next weeks with a least squares trend over the recent weekly totals.
+
+    Args:
+        calendar (ContributionCalendar): The contribution calendar.
+        weeks (int): Number of weeks to forecast.
+        history_weeks (int): Number of complete past weeks the trend is fitted on.
+
+    Returns:
+        dict: Forecast including:
+        - weekly: Expected total of each coming week, never negative.
+        - total: Sum of `weekly`.
+        - trend: Change of the weekly total per week.
+        - start: First day of the forecast.
+        - expected_active_days: Days with activity at the recent active rate.
+    """
+    history = trailing_weeks(calendar)[-history_weeks:]
+    n = len(history)
+    if n == 0:
+        return {"weekly": [0] * weeks, "total": 0, "trend": 0.0, "start": calendar.end + timedelta(days=1), "expected_active_days": 0}
+
+    mean_x = (n - 1) / 2
+    mean_y = sum(history) / n
+    variance = sum((x - mean_x) ** 2 for x in range(n))
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in enumerate(history)) / variance if variance else 0.0
+    weekly = [max(0, round(mean_y + slope * (n + i - mean_x))) for i in range(weeks)]
+
+    recent_days = calendar.counts[-n * 7:]
+    active_rate = sum(1 for count in recent_days if count) / len(recent_days)
+    return {
+        "weekly": weekly,
+        "total": sum(weekly),
+        "trend": round(slope, 2),
+        "start": calendar.end + timedelta(days=1),
+        # Every active day has at least one contribution
+        "expected_active_days": min(round(active_rate * weeks * 7), sum(weekly)),
+    }
+
+def contribution_trends(calendar: ContributionCalendar) -> dict:
+    """
+    Rolling averages plus weekly and monthly aggregates.
+
+    Returns:
+        dict: `rolling` (see `rolling_averages`), `monthly` ((YYYY-MM, total) pairs),
+        `weekly` (totals of the complete trailing weeks), and the best and worst month.
+    """
+    monthly = monthly_totals(calendar)
+    return {
+        "rolling": rolling_averages(calendar),
+        "monthly": monthly,
+        "weekly": trailing_weeks(calendar),
+        "best_month": max(monthly, key=lambda month: month[1], default=None),
+        "worst_month": min(monthly, key=lambda month: month[1], default=None),
+    }
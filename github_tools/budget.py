@@ -0,0 +1,331 @@
+"""
+GraphQL rate limit budget shared by every process using the same token.
+
+Streamlit and Playground workers, bulk runs and background jobs all spend the
+one 5,000 point budget of a `GITHUB_ACCESS_TOKEN`. Before a query is sent its
+cost is reserved in a small SQLite file next to the response cache; after the
+response arrives the reservation is replaced by the `rateLimit { remaining
+resetAt }` GitHub reported. A query only goes out while the remaining points
+minus everything reserved by other processes stay above the floor of its
+priority:
+
+- interactive queries (the default) may spend down to `GITHUB_RATE_LIMIT_RESERVE`,
+- batch queries stop at `GITHUB_BUDGET_BATCH_RESERVE` and yield to any
+  interactive query waiting in any process.
+
+Queries that do not fit wait for budget, until the window resets if they
+have to, instead of running into 403s. Mark background work with
+
+    with priority(BATCH):
+        ...
+"""
+import asyncio, hashlib, os, sqlite3, threading, time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from uuid import uuid4
+from github_tools.tracing import metrics
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+PRIORITIES = (INTERACTIVE, BATCH)
+
+# SQLite file shared by the processes, empty to keep the budget in this process only
+BUDGET_PATH = os.getenv("GITHUB_BUDGET_PATH", os.path.join(os.path.expanduser("~"), ".cache", "github-agent", "budget.db"))
+# Points below which interactive and batch queries wait
+INTERACTIVE_RESERVE = int(os.getenv("GITHUB_RATE_LIMIT_RESERVE", "50"))
+BATCH_RESERVE = int(os.getenv("GITHUB_BUDGET_BATCH_RESERVE", "1000"))
+# Seconds between two checks of a waiting query
+POLL_INTERVAL = float(os.getenv("GITHUB_BUDGET_POLL_INTERVAL", "0.5"))
+# Longest wait of an interactive query, it is sent anyway after that
+MAX_INTERACTIVE_WAIT = float(os.getenv("GITHUB_MAX_RATE_LIMIT_PAUSE", "900"))
+
+# Reservations and waiters of a process that died are dropped after these many seconds
+GRANT_TTL = 120
+WAITER_TTL = 10
+
+_priority = ContextVar("github_budget_priority", default=INTERACTIVE)
+
+@contextmanager
+def priority(level: str):
+    """
+    Send the GraphQL queries made inside the `with` block (and threads started
+    from it with a copied context) with the given priority.
+
+    Args:
+        level (str): `INTERACTIVE` or `BATCH`.
+    """
+    if level not in PRIORITIES:
+        raise ValueError(f"Unknown priority {level!r}, expected one of {PRIORITIES}")
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+def current_priority() -> str:
+    return _priority.get()
+
+class Grant:
+    """
+    Points reserved for one query, see `RateLimitBudget.acquire`.
+
+    Attributes:
+        id (int): Reservation row, None when the query was sent without one.
+        operation (str): Name of the query, its last cost is the estimate of the next one.
+        priority (str): `INTERACTIVE` or `BATCH`.
+        cost (int): Reserved points.
+        waited (float): Seconds the query waited for budget.
+    """
+
+    def __init__(self, id, operation: str, priority: str, cost: int, waited: float):
+        self.id = id
+        self.operation = operation
+        self.priority = priority
+        self.cost = cost
+        self.waited = waited
+
+class RateLimitBudget:
+    """
+    Rate limit points of one token, reserved and accounted across processes.
+
+    All bookkeeping happens in `BEGIN IMMEDIATE` transactions on a SQLite file,
+    so processes see each other's reservations and waiting interactive queries.
+
+    Args:
+        path (str): SQLite file, empty for a budget private to this process.
+        token (str): GitHub access token, only a hash of it is stored.
+        interactive_reserve (int): Points interactive queries leave untouched.
+        batch_reserve (int): Points batch queries leave untouched.
+        poll_interval (float): Seconds between two checks of a waiting query.
+    """
+
+    def __init__(self, path: str = BUDGET_PATH, token: str = None, interactive_reserve: int = INTERACTIVE_RESERVE,
+                 batch_reserve: int = BATCH_RESERVE, poll_interval: float = POLL_INTERVAL):
+        self.floors = {INTERACTIVE: interactive_reserve, BATCH: max(batch_reserve, interactive_reserve)}
+        self.poll_interval = poll_interval
+        self.token = hashlib.sha1((token or "").encode("UTF-8")).hexdigest()[:16]
+        self._costs = {}
+        self._lock = threading.Lock()
+        self._connection = _connect(path)
+
+    def acquire(self, operation: str, priority: str = None, max_wait: float = None) -> Grant:
+        """
+        Wait until the estimated cost of a query fits the budget and reserve it.
+
+        Args:
+            operation (str): Name of the query.
+            priority (str): `INTERACTIVE` or `BATCH`, the priority of the current context by default.
+            max_wait (float): Seconds to wait at most before sending anyway. Interactive
+                queries wait up to `MAX_INTERACTIVE_WAIT` by default, batch queries as long as it takes.
+
+        Returns:
+            Grant: Pass it to `release` with the response.
+        """
+        priority, cost, deadline = self._request(operation, priority, max_wait)
+        waiter = uuid4().hex
+        start = time.monotonic()
+        while True:
+            granted, pause = self._try(waiter, priority, cost)
+            if granted is not None or self._expired(deadline, pause):
+                return self._granted(granted, operation, priority, cost, start, waiter)
+            # Wake up before the waiter row goes stale, so batch queries keep yielding
+            time.sleep(min(pause, WAITER_TTL / 2))
+
+    async def aacquire(self, operation: str, priority: str = None, max_wait: float = None) -> Grant:
+        """
+        Async version of `acquire`, the SQLite calls run on a worker thread.
+        """
+        priority, cost, deadline = self._request(operation, priority, max_wait)
+        waiter = uuid4().hex
+        start = time.monotonic()
+        while True:
+            granted, pause = await asyncio.to_thread(self._try, waiter, priority, cost)
+            if granted is not None or self._expired(deadline, pause):
+                return await asyncio.to_thread(self._granted, granted, operation, priority, cost, start, waiter)
+            await asyncio.sleep(min(pause, WAITER_TTL / 2))
+
+    def release(self, grant: Grant, data: dict = None, headers=None):
+        """
+        Drop the reservation of a finished query and store the budget its response reported.
+
+        Args:
+            grant (Grant): Returned by `acquire`.
+            data (dict): Decoded response, its `rateLimit` field is read if selected.
+            headers: Response headers, `X-RateLimit-Remaining` / `-Reset` are used without a `rateLimit` field.
+        """
+        remaining, reset_at, cost = _reported(data, headers)
+        if cost:
+            self._costs[grant.operation] = cost
+        with self._transaction() as connection:
+            if grant.id is not None:
+                connection.execute("DELETE FROM grants WHERE id = ?", (grant.id,))
+            if remaining is None:
+                return
+            row = connection.execute("SELECT remaining, reset_at FROM budget WHERE token = ?", (self.token,)).fetchone()
+            if row is not None and row[1] is not None and reset_at is not None and abs(row[1] - reset_at) < 1:
+                # Same window, responses can arrive out of order: the lowest count is the latest
+                remaining = min(remaining, row[0])
+            elif row is not None and row[1] is not None and reset_at is not None and reset_at < row[1]:
+                return
+            connection.execute(
+                "INSERT OR REPLACE INTO budget (token, remaining, reset_at, updated_at) VALUES (?, ?, ?, ?)",
+                (self.token, remaining, reset_at, time.time()),
+            )
+        metrics.gauge("github_agent_budget_remaining", remaining, help="GraphQL rate limit points left, as last reported")
+
+    async def arelease(self, grant: Grant, data: dict = None, headers=None):
+        """
+        Async version of `release`.
+        """
+        await asyncio.to_thread(self.release, grant, data, headers)
+
+    def snapshot(self) -> dict:
+        """
+        Remaining points and reset time as last reported, points reserved by
+        queries in flight, and the queries waiting per priority.
+        """
+        now = time.time()
+        with self._transaction() as connection:
+            row = connection.execute("SELECT remaining, reset_at FROM budget WHERE token = ?", (self.token,)).fetchone()
+            reserved = connection.execute("SELECT COALESCE(SUM(cost), 0) FROM grants WHERE token = ? AND expires_at > ?", (self.token, now)).fetchone()[0]
+            waiting = dict(connection.execute(
+                "SELECT priority, COUNT(*) FROM waiters WHERE token = ? AND seen_at > ? GROUP BY priority", (self.token, now - WAITER_TTL)
+            ).fetchall())
+        return {
+            "remaining": row[0] if row else None,
+            "reset_at": row[1] if row else None,
+            "reserved": reserved,
+            "waiting": {level: waiting.get(level, 0) for level in PRIORITIES},
+        }
+
+    def _request(self, operation: str, priority: str, max_wait: float):
+        priority = priority or _priority.get()
+        if max_wait is None and priority == INTERACTIVE:
+            max_wait = MAX_INTERACTIVE_WAIT
+        deadline = None if max_wait is None else time.monotonic() + max_wait
+        return priority, self._costs.get(operation, 1), deadline
+
+    @staticmethod
+    def _expired(deadline, pause: float) -> bool:
+        return deadline is not None and time.monotonic() + pause > deadline
+
+    def _try(self, waiter: str, priority: str, cost: int):
+        """
+        Reserve `cost` points if they fit the budget of `priority`.
+
+        Returns:
+            tuple: (reservation id, 0) when granted, else (None, seconds to wait before trying again).
+        """
+        now = time.time()
+        with self._transaction() as connection:
+            connection.execute("DELETE FROM grants WHERE expires_at <= ?", (now,))
+            connection.execute("DELETE FROM waiters WHERE seen_at <= ?", (now - WAITER_TTL,))
+            row = connection.execute("SELECT remaining, reset_at FROM budget WHERE token = ?", (self.token,)).fetchone()
+            remaining, reset_at = row if row else (None, None)
+            if reset_at is not None and reset_at <= now:
+                # The window rolled over, the next response reports the new budget
+                remaining = None
+
+            fits = True
+            if remaining is not None:
+                reserved = connection.execute("SELECT COALESCE(SUM(cost), 0) FROM grants WHERE token = ?", (self.token,)).fetchone()[0]
+                fits = remaining - reserved - cost >= self.floors[priority]
+            if fits and priority == BATCH:
+                fits = not connection.execute(
+                    "SELECT 1 FROM waiters WHERE token = ? AND priority = ? LIMIT 1", (self.token, INTERACTIVE)
+                ).fetchone()
+
+            if fits:
+                connection.execute("DELETE FROM waiters WHERE id = ?", (waiter,))
+                cursor = connection.execute(
+                    "INSERT INTO grants (token, priority, cost, expires_at) VALUES (?, ?, ?, ?)",
+                    (self.token, priority, cost, now + GRANT_TTL),
+                )
+                return cursor.lastrowid, 0
+
+            connection.execute(
+                "INSERT OR REPLACE INTO waiters (id, token, priority, seen_at) VALUES (?, ?, ?, ?)",
+                (waiter, self.token, priority, now),
+            )
+        if remaining is not None and reset_at is not None and remaining - cost < self.floors[priority]:
+            # Only the reset frees points, no need to poll until then
+            return None, max(self.poll_interval, reset_at - now)
+        return None, self.poll_interval
+
+    def _granted(self, granted, operation: str, priority: str, cost: int, start: float, waiter: str) -> Grant:
+        waited = time.monotonic() - start
+        if granted is None:
+            with self._transaction() as connection:
+                connection.execute("DELETE FROM waiters WHERE id = ?", (waiter,))
+        if waited > self.poll_interval / 2:
+            metrics.inc("github_agent_budget_deferred_total", help="Queries that waited for rate limit budget", priority=priority)
+        metrics.observe("github_agent_budget_wait_seconds", waited, help="Time queries waited for rate limit budget", priority=priority)
+        return Grant(granted, operation, priority, cost, waited)
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            connection = self._connection
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+
+def _connect(path: str) -> sqlite3.Connection:
+    if path:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    # Autocommit mode, transactions are opened explicitly with BEGIN IMMEDIATE
+    connection = sqlite3.connect(path or ":memory:", timeout=30, isolation_level=None, check_same_thread=False)
+    if path:
+        # The budget is rebuilt from the next response anyway, no need to sync every commit
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+    connection.executescript("""
+        CREATE TABLE IF NOT EXISTS budget (token TEXT PRIMARY KEY, remaining INTEGER, reset_at REAL, updated_at REAL);
+        CREATE TABLE IF NOT EXISTS grants (id INTEGER PRIMARY KEY AUTOINCREMENT, token TEXT, priority TEXT, cost INTEGER, expires_at REAL);
+        CREATE TABLE IF NOT EXISTS waiters (id TEXT PRIMARY KEY, token TEXT, priority TEXT, seen_at REAL);
+    """)
+    return connection
+
+def _reported(data: dict, headers) -> tuple:
+    """
+    (remaining, reset time in epoch seconds, cost) reported by a response, None where unknown.
+    """
+    rate_limit = (data.get("data") or {}).get("rateLimit") if isinstance(data, dict) else None
+    if rate_limit and rate_limit.get("remaining") is not None:
+        reset_at = rate_limit.get("resetAt")
+        if reset_at:
+            reset_at = datetime.fromisoformat(reset_at.replace("Z", "+00:00")).timestamp()
+        return rate_limit["remaining"], reset_at, rate_limit.get("cost")
+    remaining = headers.get("X-RateLimit-Remaining") if headers is not None else None
+    if remaining is None:
+        return None, None, None
+    try:
+        reset = headers.get("X-RateLimit-Reset")
+        return int(remaining), float(reset) if reset else None, None
+    except ValueError:
+        return None, None, None
+
+_budget = None
+_budget_lock = threading.Lock()
+
+def get_budget() -> RateLimitBudget:
+    """
+    Return the process wide budget of `GITHUB_ACCESS_TOKEN`, creating it on first use.
+
+    Falls back to a budget private to this process if the shared file cannot be opened.
+    """
+    global _budget
+    if _budget is None:
+        with _budget_lock:
+            if _budget is None:
+                try:
+                    _budget = RateLimitBudget(token=os.getenv("GITHUB_ACCESS_TOKEN"))
+                except (sqlite3.Error, OSError) as e:
+                    print(f"Shared rate limit budget disabled: {str(e)}")
+                    _budget = RateLimitBudget(path="", token=os.getenv("GITHUB_ACCESS_TOKEN"))
+    return _budget
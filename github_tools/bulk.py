@@ -0,0 +1,237 @@
+"""
+Bulk analysis of many GitHub users.
+
+Usernames are packed into aliased GraphQL queries (`u0: user(login: $l0)`, ...),
+batches run with bounded concurrency and results are yielded as soon as each
+batch finishes, as the same `ProfileStats` the interactive tools render.
+
+The queries run with batch priority, so they only spend the rate limit
+budget interactive lookups leave over (see `github_tools.budget`).
+
+Usage from the command line:
+
+    python -m github_tools.bulk octocat torvalds -f team.txt > stats.ndjson
+    python -m github_tools.bulk -f team.txt --render markdown > stats.ndjson
+"""
+import argparse, json, os, sys, threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import requests
+from github_tools.client import post_query
+from github_tools.budget import priority, BATCH
+from github_tools.fetch_data import FRAGMENTS, iter_repositories
+from github_tools.github_tools import repo_language_stats, STATS_ERRORS
+from github_tools.models import UserStats, ContributionStats, ProfileStats
+from github_tools.render import render
+
+DEFAULT_BATCH_SIZE = int(os.getenv("GITHUB_BULK_BATCH_SIZE", "10"))
+MAX_BATCH_SIZE = 25
+DEFAULT_CONCURRENCY = int(os.getenv("GITHUB_BULK_CONCURRENCY", "4"))
+# Rate limit points one batch query should cost at most.
+TARGET_QUERY_COST = int(os.getenv("GITHUB_BULK_TARGET_COST", "50"))
+
+def build_bulk_query(count: int) -> str:
+    """
+    Build one GraphQL query for `count` users, aliased `u0` to `u{count-1}`.
+
+    Args:
+        count (int): Number of users in the batch.
+
+    Returns:
+        str: The query text, taking the usernames as `$l0`, `$l1`, ... variables.
+    """
+    spreads = " ".join(f"...{name}" for name, _, _ in FRAGMENTS.values())
+    params = ", ".join(f"$l{i}: String!" for i in range(count))
+    users = "\n    ".join(f"u{i}: user(login: $l{i}) {{ {spreads} }}" for i in range(count))
+    definitions = "".join(fragment for _, fragment, _ in FRAGMENTS.values())
+    return f"""
+query({params}) {{
+    {users}
+    rateLimit {{
+        cost
+        remaining
+        resetAt
+    }}
+}}
+{definitions}"""
+
+def fetch_users_batch(usernames: list) -> dict:
+    """
+    Fetch profile, repository and contribution data for several users in one request.
+
+    Args:
+        usernames (list): GitHub usernames.
+
+    Returns:
+        dict: JSON response from GitHub API with one `u{i}` entry per username.
+
+    Raises:
+        requests.exceptions.RequestException: If the request fails.
+    """
+    variables = {f"l{i}": username for i, username in enumerate(usernames)}
+    return post_query(build_bulk_query(len(usernames)), variables, "bulk", BATCH)
+
+class BatchQueryError(Exception):
+    """
+    Raised for a bulk response without data or with errors other than unknown users.
+
+    GitHub answers timeouts and node or complexity limits of a query with
+    HTTP 200, `data: null` and top-level `errors`.
+    """
+
+def check_batch_response(data: dict):
+    """
+    Raise `BatchQueryError` with GitHub's messages if a bulk query failed as a whole.
+
+    Unknown users come back as a null `u{i}` with a NOT_FOUND error, the rest
+    of the batch is still valid.
+
+    Raises:
+        BatchQueryError: If `data` is null or an error is not a NOT_FOUND error.
+    """
+    errors = data.get("errors") or []
+    failures = [error for error in errors if error.get("type") != "NOT_FOUND"]
+    if data.get("data") is None or failures:
+        messages = [error.get("message", "Unknown error") for error in failures or errors]
+        raise BatchQueryError("; ".join(messages) or "GitHub returned no data")
+
+def process_user_node(username: str, node: dict) -> dict:
+    """
+    Turn the data of one aliased user into the same stats the interactive tools render.
+
+    Args:
+        username (str): GitHub username.
+        node (dict): The `u{i}` entry of a bulk response.
+
+    Returns:
+        dict: `username` and the `ProfileStats` as `profile`,
+        or `username` and `errors` if the user could not be resolved.
+    """
+    if node is None:
+        return {"username": username, "errors": f"Could not resolve to a User with the login of '{username}'."}
+
+    data = {"data": {"user": node}}
+    try:
+        user = UserStats.from_response(data)
+    except STATS_ERRORS as e:
+        return {"username": username, "errors": str(e)}
+    return {"username": username, "profile": ProfileStats(
+        user,
+        _section(lambda: repo_language_stats(iter_repositories(username, node['repositories']))),
+        _section(lambda: ContributionStats.from_response(data)),
+    )}
+
+def _section(build):
+    try:
+        return build()
+    except STATS_ERRORS:
+        return None
+
+class _BatchSizer:
+    """
+    Adapts the number of users per query to the reported query cost.
+
+    Batches shrink when a query costs more than `TARGET_QUERY_COST` or fails,
+    and grow by one while they stay cheap.
+    """
+
+    def __init__(self, size: int):
+        self.size = max(1, min(size, MAX_BATCH_SIZE))
+        self._lock = threading.Lock()
+
+    def on_success(self, batch_size: int, cost):
+        with self._lock:
+            if not cost:
+                return
+            if cost > TARGET_QUERY_COST:
+                self.size = max(1, batch_size * TARGET_QUERY_COST // cost)
+            elif cost * (batch_size + 1) <= TARGET_QUERY_COST * batch_size:
+                self.size = min(MAX_BATCH_SIZE, max(self.size, batch_size + 1))
+
+    def on_failure(self, batch_size: int):
+        with self._lock:
+            self.size = max(1, min(self.size, batch_size // 2))
+
+def analyze_users(usernames, batch_size: int = DEFAULT_BATCH_SIZE, concurrency: int = DEFAULT_CONCURRENCY):
+    """
+    Analyze many GitHub users with batched, aliased GraphQL queries.
+
+    Batches whose request fails or whose query GitHub could not run (see
+    `check_batch_response`) are halved and retried, a single user that still
+    fails is reported with the error.
+
+    Args:
+        usernames (iterable): GitHub usernames, duplicates are analyzed once.
+        batch_size (int): Users per query to start with, adapted to the query cost.
+        concurrency (int): Maximum number of batch queries in flight.
+
+    Yields:
+        dict: One result per username, see `process_user_node`, in completion order.
+    """
+    pending = deque(dict.fromkeys(username.strip() for username in usernames if username.strip()))
+    sizer = _BatchSizer(batch_size)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        running = {}
+
+        def submit():
+            while pending and len(running) < concurrency:
+                batch = [pending.popleft() for _ in range(min(sizer.size, len(pending)))]
+                running[pool.submit(_run_batch, batch)] = batch
+
+        submit()
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                batch = running.pop(future)
+                try:
+                    results, cost = future.result()
+                except (requests.exceptions.RequestException, BatchQueryError) as e:
+                    if len(batch) > 1:
+                        # Usually a timeout or a node limit on a heavy query, retry in smaller batches
+                        sizer.on_failure(len(batch))
+                        pending.extendleft(reversed(batch))
+                    else:
+                        yield {"username": batch[0], "errors": str(e)}
+                    continue
+                sizer.on_success(len(batch), cost)
+                yield from results
+            submit()
+
+def _run_batch(batch: list):
+    # Further repository and language pages are batch work too
+    with priority(BATCH):
+        data = fetch_users_batch(batch)
+        check_batch_response(data)
+        users = data["data"]
+        cost = (users.get("rateLimit") or {}).get("cost")
+        return [process_user_node(username, users.get(f"u{i}")) for i, username in enumerate(batch)], cost
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze GitHub users in bulk and print one JSON object per user.")
+    parser.add_argument("usernames", nargs="*", help="GitHub usernames")
+    parser.add_argument("-f", "--file", help="File with one username per line, '-' for stdin")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Users per query to start with")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Queries in flight")
+    parser.add_argument("--render", metavar="STYLE", help="Print the stats rendered in this style, e.g. llm or markdown, instead of as fields")
+    args = parser.parse_args(argv)
+
+    usernames = list(args.usernames)
+    if args.file:
+        stream = sys.stdin if args.file == "-" else open(args.file, encoding="UTF-8")
+        with stream:
+            usernames.extend(line for line in stream if line.strip() and not line.startswith("#"))
+    if not usernames:
+        parser.error("no usernames given")
+
+    for result in analyze_users(usernames, args.batch_size, args.concurrency):
+        profile = result.pop("profile", None)
+        if profile is not None and args.render:
+            result["stats"] = render(profile, args.render, username=result["username"])
+        elif profile is not None:
+            result.update(profile.to_dict())
+        sys.stdout.write(json.dumps(result, ensure_ascii=False) + "\n")
+        sys.stdout.flush()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+import os, time, json, hashlib, threading
+from collections import OrderedDict
+from sqlalchemy import create_engine, event, MetaData, Table, Column, String, Text, Integer, Float, select, delete, update, func
+from sqlalchemy.exc import SQLAlchemyError
+
+# SQLAlchemy URL of the persistent cache, empty to keep the cache in memory only.
+CACHE_URL = os.getenv("GITHUB_CACHE_URL", "sqlite:///" + os.path.join(os.path.expanduser("~"), ".cache", "github-agent", "cache.db"))
+CACHE_MAX_BYTES = int(os.getenv("GITHUB_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+CACHE_LRU_SIZE = int(os.getenv("GITHUB_CACHE_LRU_SIZE", "256"))
+
+# Time to live in seconds per field group, None keeps an entry until it is evicted.
+CACHE_TTLS = {
+    "user": float(os.getenv("GITHUB_CACHE_TTL_USER", str(6 * 60 * 60))),
+    "repo": float(os.getenv("GITHUB_CACHE_TTL_REPO", str(60 * 60))),
+    "contribution": float(os.getenv("GITHUB_CACHE_TTL_CONTRIBUTION", str(10 * 60))),
+    "contribution_year": None,
+}
+
+def fingerprint(query: str) -> str:
+    """
+    Short stable hash of a GraphQL query text.
+    """
+    return hashlib.sha1(" ".join(query.split()).encode("UTF-8")).hexdigest()[:16]
+
+def cache_key(query: str, username: str, *parts) -> str:
+    """
+    Cache key of a query for a username, optionally narrowed down by extra parts such as a year.
+    """
+    return ":".join([fingerprint(query), username.lower(), *map(str, parts)])
+
+class ResponseCache:
+    """
+    Persistent cache for GitHub API data with a small in-process LRU in front.
+
+    Entries are JSON documents stored in a SQL table (SQLite by default) with
+    an optional expiry time. When the stored documents grow past `max_bytes`
+    the least recently used ones are evicted. Several processes can share the
+    same SQLite file, so restarted or scaled out workers start warm.
+
+    Args:
+        url (str): SQLAlchemy database URL, empty for a memory only cache.
+        max_bytes (int): Size limit of the stored documents.
+        lru_size (int): Number of decoded entries kept in process memory.
+    """
+
+    def __init__(self, url: str = CACHE_URL, max_bytes: int = CACHE_MAX_BYTES, lru_size: int = CACHE_LRU_SIZE):
+        self.max_bytes = max_bytes
+        self.lru_size = lru_size
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.memory_hits = self.misses = self.evictions = 0
+
+        self.engine = None
+        if url:
+            try:
+                self.engine = _create_engine(url)
+                self.table = _cache_table(MetaData())
+                self.table.metadata.create_all(self.engine)
+            except (SQLAlchemyError, OSError) as e:
+                print(f"Persistent cache disabled: {str(e)}")
+                self.engine = None
+
+    def get(self, key: str):
+        """
+        Return the cached value of `key`, None if it is missing or expired.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is not None:
+                if entry[1] is None or entry[1] > now:
+                    self._lru.move_to_end(key)
+                    self.hits += 1
+                    self.memory_hits += 1
+                    return entry[0]
+                del self._lru[key]
+
+        row = None
+        if self.engine is not None:
+            try:
+                with self.engine.begin() as connection:
+                    row = connection.execute(
+                        select(self.table.c.value, self.table.c.expires_at).where(self.table.c.key == key)
+                    ).first()
+                    if row is not None and (row.expires_at is None or row.expires_at > now):
+                        connection.execute(update(self.table).where(self.table.c.key == key).values(accessed_at=now))
+                    else:
+                        row = None
+            except SQLAlchemyError as e:
+                print(f"Cache read failed: {str(e)}")
+                row = None
+
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        value = json.loads(row.value)
+        self._remember(key, value, row.expires_at)
+        return value
+
+    def set(self, key: str, value, ttl: float = None):
+        """
+        Store a JSON serializable value under `key` for `ttl` seconds, forever when `ttl` is None.
+        """
+        expires_at = None if ttl is None else time.time() + ttl
+        self._remember(key, value, expires_at)
+        if self.engine is None:
+            return
+
+        document = json.dumps(value, separators=(",", ":"))
+        try:
+            with self.engine.begin() as connection:
+                connection.execute(delete(self.table).where(self.table.c.key == key))
+                connection.execute(self.table.insert().values(
+                    key=key, value=document, size=len(document), expires_at=expires_at, accessed_at=time.time()
+                ))
+                self._evict(connection)
+        except SQLAlchemyError as e:
+            print(f"Cache write failed: {str(e)}")
+
+    def delete(self, key: str):
+        """
+        Remove `key` from the cache.
+        """
+        with self._lock:
+            self._lru.pop(key, None)
+        if self.engine is not None:
+            try:
+                with self.engine.begin() as connection:
+                    connection.execute(delete(self.table).where(self.table.c.key == key))
+            except SQLAlchemyError as e:
+                print(f"Cache delete failed: {str(e)}")
+
+    def clear(self):
+        """
+        Remove every entry from the cache.
+        """
+        with self._lock:
+            self._lru.clear()
+        if self.engine is not None:
+            try:
+                with self.engine.begin() as connection:
+                    connection.execute(delete(self.table))
+            except SQLAlchemyError as e:
+                print(f"Cache clear failed: {str(e)}")
+
+    def stats(self) -> dict:
+        """
+        Cache counters: hits (memory_hits of them from the LRU), misses, evictions,
+        hit_rate and the number and size of the stored entries.
+        """
+        entries = size = 0
+        if self.engine is not None:
+            try:
+                with self.engine.connect() as connection:
+                    entries, size = connection.execute(
+                        select(func.count(), func.coalesce(func.sum(self.table.c.size), 0))
+                    ).one()
+            except SQLAlchemyError:
+                pass
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "memory_hits": self.memory_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._lru),
+                "entries": entries,
+                "bytes": size,
+            }
+
+    def _remember(self, key: str, value, expires_at):
+        with self._lock:
+            self._lru[key] = (value, expires_at)
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+
+    def _evict(self, connection):
+        """
+        Drop expired entries, then the least recently used ones until the cache fits in `max_bytes`.
+        """
+        table = self.table
+        result = connection.execute(delete(table).where(table.c.expires_at.is_not(None), table.c.expires_at <= time.time()))
+        evicted = result.rowcount or 0
+
+        total = connection.execute(select(func.coalesce(func.sum(table.c.size), 0))).scalar()
+        if total > self.max_bytes:
+            rows = connection.execute(select(table.c.key, table.c.size).order_by(table.c.accessed_at)).all()
+            stale = []
+            for row in rows:
+                if total <= self.max_bytes:
+                    break
+                stale.append(row.key)
+                total -= row.size
+            connection.execute(delete(table).where(table.c.key.in_(stale)))
+            evicted += len(stale)
+
+        if evicted:
+            with self._lock:
+                self.evictions += evicted
+
+def _cache_table(metadata: MetaData) -> Table:
+    return Table(
+        "graphql_cache", metadata,
+        Column("key", String(200), primary_key=True),
+        Column("value", Text, nullable=False),
+        Column("size", Integer, nullable=False),
+        Column("expires_at", Float, nullable=True),
+        Column("accessed_at", Float, nullable=False, index=True),
+    )
+
+def _create_engine(url: str):
+    if url.startswith("sqlite:///"):
+        path = url[len("sqlite:///"):]
+        if path and path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    engine = create_engine(url)
+    if engine.dialect.name == "sqlite":
+        @event.listens_for(engine, "connect")
+        def _configure(dbapi_connection, _):
+            # WAL lets readers in other processes continue while one process writes
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA busy_timeout=5000")
+            cursor.close()
+    return engine
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache() -> ResponseCache:
+    """
+    Return the process wide response cache, creating it on first use.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache()
+    return _cache
+
+def cache_stats() -> dict:
+    """
+    Hit/miss counters and size of the process wide response cache, see `ResponseCache.stats`.
+    """
+    return get_cache().stats()
@@ -0,0 +1,365 @@
+import os, time, random, sqlite3, threading, asyncio, weakref, json
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+from github_tools.tracing import span
+from github_tools.singleflight import SingleFlight
+from github_tools.budget import get_budget
+load_dotenv()
+
+BASE_URL = os.getenv("GITHUB_GRAPHQL_URL", "https://api.github.com/graphql")
+TOKEN = os.getenv("GITHUB_ACCESS_TOKEN")
+
+CONNECT_TIMEOUT = float(os.getenv("GITHUB_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("GITHUB_READ_TIMEOUT", "30"))
+MAX_RETRIES = int(os.getenv("GITHUB_MAX_RETRIES", "4"))
+POOL_SIZE = int(os.getenv("GITHUB_POOL_SIZE", "16"))
+
+BACKOFF_BASE = 1.0      # seconds, doubled on every retry
+BACKOFF_MAX = 60.0      # upper bound of a single backoff sleep
+MAX_RATE_LIMIT_PAUSE = float(os.getenv("GITHUB_MAX_RATE_LIMIT_PAUSE", "900"))
+
+RETRY_STATUSES = {429, 502, 503, 504}
+
+def _should_retry(status_code: int, headers) -> bool:
+    if status_code in RETRY_STATUSES:
+        return True
+    if status_code == 403:
+        # Secondary rate limits come with Retry-After, primary ones with an empty budget
+        return "Retry-After" in headers or headers.get("X-RateLimit-Remaining") == "0"
+    return False
+
+def _backoff(attempt: int) -> float:
+    # Full jitter keeps retries from several workers from lining up
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+def _retry_delay(headers, attempt: int) -> float:
+    retry_after = headers.get("Retry-After")
+    if retry_after is not None:
+        try:
+            return min(float(retry_after), MAX_RATE_LIMIT_PAUSE)
+        except ValueError:
+            pass
+    reset = headers.get("X-RateLimit-Reset")
+    if headers.get("X-RateLimit-Remaining") == "0" and reset:
+        try:
+            return min(max(float(reset) - time.time(), 0), MAX_RATE_LIMIT_PAUSE)
+        except ValueError:
+            pass
+    return _backoff(attempt)
+
+def _rate_limited(data) -> bool:
+    # Secondary rate limits can also come as a 200 with a RATE_LIMITED error instead of data
+    errors = data.get("errors") if isinstance(data, dict) else None
+    return any(isinstance(error, dict) and error.get("type") == "RATE_LIMITED" for error in errors or ())
+
+def _record_response(current, size: int, data: dict, grant=None):
+    """
+    Add the response size, the `rateLimit` cost and the wait for budget of a GraphQL query to its span.
+    """
+    current.set(bytes=size)
+    if grant is not None and grant.waited:
+        current.set(budget_wait=grant.waited)
+    rate_limit = (data.get("data") or {}).get("rateLimit") if isinstance(data, dict) else None
+    if rate_limit:
+        current.set(graphql_cost=rate_limit.get("cost") or 0, rate_limit_remaining=rate_limit.get("remaining"))
+
+def _release(budget, grant, data: dict, response):
+    """
+    Release a budget grant without hiding the outcome of the query: a failing
+    budget write is logged, the response or the request error is kept.
+    """
+    try:
+        budget.release(grant, data, response.headers if response is not None else None)
+    except sqlite3.Error as e:
+        _release_failed(grant, e)
+
+async def _arelease(budget, grant, data: dict, response):
+    """
+    Async version of `_release`.
+    """
+    try:
+        await budget.arelease(grant, data, response.headers if response is not None else None)
+    except sqlite3.Error as e:
+        _release_failed(grant, e)
+
+def _release_failed(grant, e: Exception):
+    # The reservation expires after `budget.GRANT_TTL` and the next response reports the budget again
+    print(f"Could not update the rate limit budget after {grant.operation}: {str(e)}")
+
+class GraphQLClient:
+    """
+    Shared HTTP client for the GitHub GraphQL API.
+
+    Keeps one pooled keep-alive `requests.Session`, applies connect/read timeouts,
+    retries 502/503/504, secondary rate limit responses (403s, and 200s with a
+    `RATE_LIMITED` error) and bodies that are not valid JSON with jittered
+    exponential backoff, and waits before sending until the query fits the rate
+    limit budget GitHub reported, see `github_tools.budget`.
+
+    Args:
+        base_url (str): GraphQL endpoint, point it at a local stub server in tests.
+        token (str): GitHub access token sent as a Bearer token.
+        timeout (tuple): (connect, read) timeouts in seconds.
+        max_retries (int): How many times a failed request is retried.
+        pool_size (int): Maximum number of kept-alive connections.
+        budget (RateLimitBudget): Points reserved before each query, shared by all processes by default.
+    """
+
+    def __init__(self, base_url=BASE_URL, token=TOKEN, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+                 max_retries=MAX_RETRIES, pool_size=POOL_SIZE, budget=None):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.budget = budget or get_budget()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        if token:
+            self.session.headers["Authorization"] = f"Bearer {token}"
+
+    def execute(self, query: str, variables: dict = None, operation: str = "query", priority: str = None) -> dict:
+        """
+        Send a GraphQL query and return the decoded JSON response.
+
+        Waits until the query fits the shared rate limit budget, see `github_tools.budget`.
+
+        Args:
+            query (str): GraphQL query text.
+            variables (dict): Values for the query variables.
+            operation (str): Name of the query in traces and metrics.
+            priority (str): `budget.INTERACTIVE` or `budget.BATCH`, the priority of the current context by default.
+
+        Returns:
+            dict: JSON response from GitHub API.
+
+        Raises:
+            requests.exceptions.RequestException: If the request still fails after all retries.
+        """
+        with span("github.graphql", operation=operation) as current:
+            grant = self.budget.acquire(operation, priority)
+            response = data = None
+            try:
+                response, data = self._send(query, variables)
+            finally:
+                _release(self.budget, grant, data, response)
+            _record_response(current, len(response.content), data, grant)
+            return data
+
+    def _send(self, query: str, variables: dict):
+        payload = {"query": query}
+        if variables:
+            payload["variables"] = variables
+
+        attempt = 0
+        while True:
+            try:
+                response = self.session.post(self.base_url, json=payload, timeout=self.timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt >= self.max_retries:
+                    raise
+                time.sleep(_backoff(attempt))
+                attempt += 1
+                continue
+
+            if attempt < self.max_retries and _should_retry(response.status_code, response.headers):
+                time.sleep(_retry_delay(response.headers, attempt))
+                attempt += 1
+                continue
+
+            response.raise_for_status()
+            try:
+                data = response.json()
+            except requests.exceptions.JSONDecodeError:
+                # A cut off or non-JSON body, e.g. an error page of a proxy
+                if attempt >= self.max_retries:
+                    raise
+                time.sleep(_backoff(attempt))
+                attempt += 1
+                continue
+
+            if _rate_limited(data):
+                if attempt >= self.max_retries:
+                    raise requests.exceptions.RetryError("GitHub rate limit still exceeded after all retries", response=response)
+                time.sleep(_retry_delay(response.headers, attempt))
+                attempt += 1
+                continue
+            return response, data
+
+class AsyncGraphQLClient:
+    """
+    Asyncio counterpart of `GraphQLClient`, built on a pooled `httpx.AsyncClient`.
+
+    It follows the same timeout, retry and rate limit budget rules as the sync client. An instance is bound to the event loop it
+    is first used on.
+
+    Args:
+        base_url (str): GraphQL endpoint, point it at a local stub server in tests.
+        token (str): GitHub access token sent as a Bearer token.
+        timeout (tuple): (connect, read) timeouts in seconds.
+        max_retries (int): How many times a failed request is retried.
+        pool_size (int): Maximum number of kept-alive connections.
+        budget (RateLimitBudget): Points reserved before each query, shared by all processes by default.
+    """
+
+    def __init__(self, base_url=BASE_URL, token=TOKEN, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+                 max_retries=MAX_RETRIES, pool_size=POOL_SIZE, budget=None):
+        self.base_url = base_url
+        self.max_retries = max_retries
+        self.budget = budget or get_budget()
+
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        connect, read = timeout
+        self.session = httpx.AsyncClient(
+            headers=headers,
+            timeout=httpx.Timeout(read, connect=connect),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        )
+
+    async def execute(self, query: str, variables: dict = None, operation: str = "query", priority: str = None) -> dict:
+        """
+        Send a GraphQL query and return the decoded JSON response.
+
+        Waits until the query fits the shared rate limit budget, see `github_tools.budget`.
+
+        Args:
+            query (str): GraphQL query text.
+            variables (dict): Values for the query variables.
+            operation (str): Name of the query in traces and metrics.
+            priority (str): `budget.INTERACTIVE` or `budget.BATCH`, the priority of the current context by default.
+
+        Returns:
+            dict: JSON response from GitHub API.
+
+        Raises:
+            httpx.HTTPError: If the request still fails after all retries.
+        """
+        with span("github.graphql", operation=operation) as current:
+            grant = await self.budget.aacquire(operation, priority)
+            response = data = None
+            try:
+                response, data = await self._send(query, variables)
+            finally:
+                await _arelease(self.budget, grant, data, response)
+            _record_response(current, len(response.content), data, grant)
+            return data
+
+    async def _send(self, query: str, variables: dict):
+        payload = {"query": query}
+        if variables:
+            payload["variables"] = variables
+
+        attempt = 0
+        while True:
+            try:
+                response = await self.session.post(self.base_url, json=payload)
+            except httpx.TransportError:
+                if attempt >= self.max_retries:
+                    raise
+                await asyncio.sleep(_backoff(attempt))
+                attempt += 1
+                continue
+
+            if attempt < self.max_retries and _should_retry(response.status_code, response.headers):
+                await asyncio.sleep(_retry_delay(response.headers, attempt))
+                attempt += 1
+                continue
+
+            response.raise_for_status()
+            try:
+                data = response.json()
+            except ValueError as e:
+                # A cut off or non-JSON body, e.g. an error page of a proxy
+                if attempt >= self.max_retries:
+                    raise httpx.DecodingError(f"Invalid JSON in the GitHub response: {str(e)}", request=response.request) from e
+                await asyncio.sleep(_backoff(attempt))
+                attempt += 1
+                continue
+
+            if _rate_limited(data):
+                if attempt >= self.max_retries:
+                    raise httpx.HTTPError("GitHub rate limit still exceeded after all retries")
+                await asyncio.sleep(_retry_delay(response.headers, attempt))
+                attempt += 1
+                continue
+            return response, data
+
+    async def aclose(self):
+        await self.session.aclose()
+
+_client = None
+_client_lock = threading.Lock()
+_async_clients = weakref.WeakKeyDictionary()
+
+def get_client() -> GraphQLClient:
+    """
+    Return the process wide GraphQL client, creating it on first use.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = GraphQLClient()
+    return _client
+
+def get_async_client() -> AsyncGraphQLClient:
+    """
+    Return the async GraphQL client of the running event loop, creating it on first use.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = AsyncGraphQLClient()
+    return client
+
+# Identical queries in flight at the same time share one request. Sync and async
+# callers are kept apart since they expect different exception types.
+_in_flight = SingleFlight("graphql")
+
+def _query_key(flavor: str, query: str, variables: dict) -> tuple:
+    return flavor, query, json.dumps(variables, sort_keys=True)
+
+def post_query(query: str, variables: dict = None, operation: str = "query", priority: str = None) -> dict:
+    """
+    Send a GraphQL query through the shared client.
+
+    Threads sending the same query with the same variables at the same time
+    share one request and all receive its (shared, read-only) response.
+
+    Args:
+        query (str): GraphQL query text.
+        variables (dict): Values for the query variables.
+        operation (str): Name of the query in traces and metrics.
+        priority (str): Rate limit budget priority, see `github_tools.budget.priority`.
+
+    Returns:
+        dict: JSON response from GitHub API.
+
+    Raises:
+        requests.exceptions.RequestException: If the request still fails after all retries.
+    """
+    return _in_flight.do(_query_key("sync", query, variables), get_client().execute, query, variables, operation, priority)
+
+async def apost_query(query: str, variables: dict = None, operation: str = "query", priority: str = None) -> dict:
+    """
+    Send a GraphQL query through the async client of the running event loop.
+
+    Coroutines sending the same query with the same variables at the same
+    time, on any event loop, share one request.
+
+    Args:
+        query (str): GraphQL query text.
+        variables (dict): Values for the query variables.
+        operation (str): Name of the query in traces and metrics.
+        priority (str): Rate limit budget priority, see `github_tools.budget.priority`.
+
+    Returns:
+        dict: JSON response from GitHub API.
+
+    Raises:
+        httpx.HTTPError: If the request still fails after all retries.
+    """
+    return await _in_flight.ado(_query_key("async", query, variables), get_async_client().execute, query, variables, operation, priority)
@@ -0,0 +1,150 @@
+from array import array
+from datetime import date, datetime, timedelta
+
+class ContributionCalendar:
+    """
+    Compact contribution calendar: a start date plus one unsigned int per day.
+
+    A year of contributions takes about 1.5 KB instead of ~365 dicts, and all
+    metrics are computed in a single pass over the count vector.
+
+    Args:
+        start (date): Date of the first count.
+        counts (iterable): Contribution count of each consecutive day.
+    """
+    __slots__ = ("start", "counts")
+
+    def __init__(self, start: date, counts=()):
+        self.start = start
+        self.counts = counts if isinstance(counts, array) else array("I", counts)
+
+    @classmethod
+    def from_weeks(cls, weeks: list):
+        """
+        Build a calendar from the `contributionCalendar.weeks` of a GitHub API response.
+
+        Args:
+            weeks (list): Weeks containing `contributionDays` with `contributionCount` and `date`.
+
+        Returns:
+            ContributionCalendar: The calendar, empty if there are no days.
+
+        Raises:
+            KeyError: If a day misses `contributionCount` or `date`.
+            TypeError: If the input data is not of the expected type.
+        """
+        days = [day for week in weeks for day in week['contributionDays']]
+        if not days:
+            return cls(date.today())
+
+        start = date.fromisoformat(days[0]['date'])
+        end = date.fromisoformat(days[-1]['date'])
+        if (end - start).days + 1 == len(days):
+            return cls(start, (day['contributionCount'] for day in days))
+
+        # Days are not consecutive, place every count at its own offset
+        counts = array("I", bytes(4 * ((end - start).days + 1)))
+        for day in days:
+            counts[(date.fromisoformat(day['date']) - start).days] = day['contributionCount']
+        return cls(start, counts)
+
+    @classmethod
+    def merge(cls, calendars):
+        """
+        Join calendars of consecutive periods, such as yearly windows, into one.
+
+        Args:
+            calendars (iterable): Calendars to join, later ones win where they overlap.
+
+        Returns:
+            ContributionCalendar: One calendar spanning all of them, gaps count as 0.
+        """
+        calendars = [calendar for calendar in calendars if len(calendar)]
+        if not calendars:
+            return cls(date.today())
+
+        start = min(calendar.start for calendar in calendars)
+        end = max(calendar.end for calendar in calendars)
+        counts = array("I", bytes(4 * ((end - start).days + 1)))
+        for calendar in calendars:
+            offset = (calendar.start - start).days
+            counts[offset:offset + len(calendar)] = calendar.counts
+        return cls(start, counts)
+
+    def __len__(self):
+        return len(self.counts)
+
+    def __eq__(self, other):
+        if not isinstance(other, ContributionCalendar):
+            return NotImplemented
+        return self.start == other.start and self.counts == other.counts
+
+    @property
+    def end(self) -> date:
+        """
+        Date of the last count.
+        """
+        return self.start + timedelta(days=len(self.counts) - 1)
+
+    def date_at(self, index: int) -> date:
+        """
+        Date of the count at `index`.
+        """
+        return self.start + timedelta(days=index)
+
+    def count_on(self, day: date) -> int:
+        """
+        Contribution count on `day`, 0 outside of the calendar.
+        """
+        index = (day - self.start).days
+        if 0 <= index < len(self.counts):
+            return self.counts[index]
+        return 0
+
+    def to_days(self) -> list:
+        """
+        Expand the calendar into the `{'contributionCount': ..., 'date': ...}` dicts of the GitHub API.
+        """
+        return [
+            {'contributionCount': count, 'date': (self.start + timedelta(days=i)).isoformat()}
+            for i, count in enumerate(self.counts)
+        ]
+
+    def metrics(self, today: date = None) -> dict:
+        """
+        Compute the calendar metrics in a single pass.
+
+        Args:
+            today (date): Day to report `today_count` for, defaults to the current local date.
+
+        Returns:
+            dict: Metrics including:
+            - highest_contribution: Highest count on a single day, 0 for an empty calendar.
+            - highest_contribution_date (date): First day with that count, None for an empty calendar.
+            - current_streak: Consecutive active days up to the end of the calendar.
+            - longest_streak: Longest run of consecutive active days.
+            - active_days: Number of days with at least one contribution.
+            - today_count: Contributions on `today`.
+        """
+        highest = 0
+        highest_index = None
+        current = longest = active = 0
+        for i, count in enumerate(self.counts):
+            if count:
+                active += 1
+                current += 1
+                if current > longest:
+                    longest = current
+            else:
+                current = 0
+            if highest_index is None or count > highest:
+                highest, highest_index = count, i
+
+        return {
+            "highest_contribution": highest,
+            "highest_contribution_date": None if highest_index is None else self.date_at(highest_index),
+            "current_streak": current,
+            "longest_streak": longest,
+            "active_days": active,
+            "today_count": self.count_on(today or datetime.now().date()),
+        }
@@ -0,0 +1,102 @@
+import os
+from github_tools.contribution_calendar import ContributionCalendar
+
+# Rough number of prompt tokens the encoded contribution days may take.
+CONTRIBUTION_TOKEN_BUDGET = int(os.getenv("CONTRIBUTION_TOKEN_BUDGET", "600"))
+
+# "compact" encodes the days within the token budget, "raw" keeps the GitHub API day dicts.
+CONTRIBUTION_DAYS_FORMAT = os.getenv("CONTRIBUTION_DAYS_FORMAT", "compact")
+
+# Numbers and separators tokenize poorly, count about 3 characters per token.
+CHARS_PER_TOKEN = 3
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of LLM tokens of a string.
+    """
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def monthly_totals(calendar: ContributionCalendar) -> list:
+    """
+    Sum the calendar per calendar month.
+
+    Returns:
+        list: (YYYY-MM, total) pairs in date order.
+    """
+    totals = {}
+    for i, count in enumerate(calendar.counts):
+        month = calendar.date_at(i).strftime("%Y-%m")
+        totals[month] = totals.get(month, 0) + count
+    return list(totals.items())
+
+def weekly_totals(calendar: ContributionCalendar) -> list:
+    """
+    Sum the calendar per 7 day chunk, starting at the first day of the calendar.
+    """
+    counts = calendar.counts
+    return [sum(counts[i:i + 7]) for i in range(0, len(counts), 7)]
+
+def run_length(counts) -> str:
+    """
+    Encode counts as comma separated values, with repeated values written as `value*times`.
+
+    For example `[0, 0, 0, 2, 1, 1]` becomes `"0*3,2,1*2"`.
+    """
+    parts = []
+    previous, times = None, 0
+    for count in counts:
+        if count == previous:
+            times += 1
+            continue
+        if previous is not None:
+            parts.append(f"{previous}*{times}" if times > 1 else str(previous))
+        previous, times = count, 1
+    if previous is not None:
+        parts.append(f"{previous}*{times}" if times > 1 else str(previous))
+    return ",".join(parts)
+
+def encode_calendar(calendar: ContributionCalendar, token_budget: int = CONTRIBUTION_TOKEN_BUDGET) -> str:
+    """
+    Encode a contribution calendar for the LLM within a token budget.
+
+    Monthly totals are always included since they carry the trend. Weekly
+    totals and then the run-length encoded daily counts are added as long as
+    the result stays within `token_budget`.
+
+    Args:
+        calendar (ContributionCalendar): The calendar to encode.
+        token_budget (int): Approximate number of tokens the result may take.
+
+    Returns:
+        str: The encoded calendar.
+    """
+    if not len(calendar):
+        return "no contribution days"
+
+    start, end = calendar.start.isoformat(), calendar.end.isoformat()
+    monthly = ", ".join(f"{month}: {total}" for month, total in monthly_totals(calendar))
+    sections = [f"{start} to {end}", f"monthly totals: {monthly}"]
+
+    weekly = f"weekly totals (7 day chunks from {start}): {','.join(map(str, weekly_totals(calendar)))}"
+    daily = f"daily counts from {start} (value*n = n days in a row): {run_length(calendar.counts)}"
+    for section in (weekly, daily):
+        if estimate_tokens("; ".join(sections + [section])) > token_budget:
+            break
+        sections.append(section)
+    return "; ".join(sections)
+
+def encode_contribution_days(calendar: ContributionCalendar, days_format: str = None, token_budget: int = None):
+    """
+    Encode the contribution days of a calendar in the configured format.
+
+    Args:
+        calendar (ContributionCalendar): The calendar to encode.
+        days_format (str): "compact" or "raw", defaults to `CONTRIBUTION_DAYS_FORMAT`.
+        token_budget (int): Budget of the compact format, defaults to `CONTRIBUTION_TOKEN_BUDGET`.
+
+    Returns:
+        str or list: The compact encoding, or the GitHub API day dicts for "raw".
+    """
+    if (days_format or CONTRIBUTION_DAYS_FORMAT) == "raw":
+        return calendar.to_days()
+    return encode_calendar(calendar, CONTRIBUTION_TOKEN_BUDGET if token_budget is None else token_budget)
@@ -1,9 +1,336 @@
-import requests, os
-from dotenv import load_dotenv
-load_dotenv()
+import requests, httpx, os, asyncio
+from contextvars import copy_context
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from github_tools.client import post_query, apost_query
+from github_tools.cache import get_cache, cache_key, CACHE_TTLS
+from github_tools.tracing import span
+from github_tools.singleflight import SingleFlight
 
-BASE_URL = "https://api.github.com/graphql"
-TOKEN = os.getenv("GITHUB_ACCESS_TOKEN")
+# Worker threads used to fetch the next repository page and extra language pages.
+PAGINATION_WORKERS = int(os.getenv("GITHUB_PAGINATION_WORKERS", "4"))
+
+# Worker threads used to fetch the yearly contribution windows.
+HISTORY_WORKERS = int(os.getenv("GITHUB_HISTORY_WORKERS", "8"))
+
+# Selected on every query, so the cost of each request shows up in traces.
+RATE_LIMIT_SELECTION = """
+    rateLimit {
+        cost
+        remaining
+        resetAt
+    }"""
+
+# GraphQL fragments, one per field group. The stats tools each need one group,
+# but they are sent together so a username costs a single round trip.
+USER_FRAGMENT = """
+fragment UserFields on User {
+    name
+    bio
+    location
+    createdAt
+    avatarUrl
+    followers {
+        totalCount
+    }
+    following {
+        totalCount
+    }
+    repositoryCount: repositories(ownerAffiliations: OWNER, isFork: false) {
+        totalCount
+    }
+    contributionsCollection {
+        totalCommitContributions
+        totalPullRequestContributions
+        totalIssueContributions
+    }
+}
+"""
+
+LANGUAGE_CONNECTION_FRAGMENT = """
+fragment LanguageConnectionFields on LanguageConnection {
+    totalCount
+    totalSize
+    pageInfo {
+        hasNextPage
+        endCursor
+    }
+    edges {
+        node {
+            name
+            color
+        }
+        size
+    }
+}
+"""
+
+REPO_CONNECTION_FRAGMENT = """
+fragment RepoConnectionFields on RepositoryConnection {
+    totalCount
+    pageInfo {
+        hasNextPage
+        endCursor
+    }
+    edges {
+        node {
+            name
+            pushedAt
+            updatedAt
+            languages(first: 100, orderBy: {field: SIZE, direction: DESC}) {
+                ...LanguageConnectionFields
+            }
+        }
+    }
+}
+""" + LANGUAGE_CONNECTION_FRAGMENT
+
+REPO_FRAGMENT = """
+fragment RepoFields on User {
+    repositories(first: 100, ownerAffiliations: OWNER, isFork: false) {
+        ...RepoConnectionFields
+    }
+}
+""" + REPO_CONNECTION_FRAGMENT
+
+REPO_PAGE_QUERY = """
+query($login: String!, $after: String) {
+    user(login: $login) {
+        repositories(first: 100, after: $after, ownerAffiliations: OWNER, isFork: false) {
+            ...RepoConnectionFields
+        }
+    }""" + RATE_LIMIT_SELECTION + """
+}
+""" + REPO_CONNECTION_FRAGMENT
+
+LANGUAGE_PAGE_QUERY = """
+query($login: String!, $name: String!, $after: String) {
+    repository(owner: $login, name: $name) {
+        languages(first: 100, after: $after, orderBy: {field: SIZE, direction: DESC}) {
+            ...LanguageConnectionFields
+        }
+    }""" + RATE_LIMIT_SELECTION + """
+}
+""" + LANGUAGE_CONNECTION_FRAGMENT
+
+CONTRIBUTION_FRAGMENT = """
+fragment ContributionFields on User {
+    contributionsCollection {
+        restrictedContributionsCount
+        totalPullRequestContributions
+        totalIssueContributions
+        contributionCalendar {
+            totalContributions
+            weeks {
+                contributionDays {
+                    contributionCount
+                    date
+                }
+            }
+        }
+    }
+}
+"""
+
+CONTRIBUTION_YEAR_QUERY = """
+query($login: String!, $from: DateTime!, $to: DateTime!) {
+    user(login: $login) {
+        contributionsCollection(from: $from, to: $to) {
+            restrictedContributionsCount
+            contributionCalendar {
+                totalContributions
+                weeks {
+                    contributionDays {
+                        contributionCount
+                        date
+                    }
+                }
+            }
+        }
+    }""" + RATE_LIMIT_SELECTION + """
+}
+"""
+
+# field group -> (fragment name, fragment text, top-level keys of `user` it fills)
+FRAGMENTS = {
+    "user": ("UserFields", USER_FRAGMENT, ("name", "bio", "location", "createdAt", "avatarUrl", "followers", "following", "repositoryCount", "contributionsCollection")),
+    "repo": ("RepoFields", REPO_FRAGMENT, ("repositories",)),
+    "contribution": ("ContributionFields", CONTRIBUTION_FRAGMENT, ("contributionsCollection",)),
+}
+
+# Fields of `contributionsCollection` that belong to the "user" group, the
+# rest of the collection is cached with the "contribution" group.
+USER_CONTRIBUTION_FIELDS = ("totalCommitContributions", "totalPullRequestContributions", "totalIssueContributions")
+
+# Profile fetches in flight, keyed by username and missing field groups
+_profile_fetches = SingleFlight("profile")
+
+def build_profile_query(groups=tuple(FRAGMENTS)) -> str:
+    """
+    Build one GraphQL query for a user from the fragments of the given field groups.
+
+    Args:
+        groups (iterable): Field group names, any of "user", "repo" and "contribution".
+
+    Returns:
+        str: The query text, taking the username as the `$login` variable.
+    """
+    spreads = "\n        ".join(f"...{FRAGMENTS[group][0]}" for group in groups)
+    definitions = "".join(FRAGMENTS[group][1] for group in groups)
+    return f"""
+query($login: String!) {{
+    user(login: $login) {{
+        {spreads}
+    }}{RATE_LIMIT_SELECTION}
+}}
+{definitions}"""
+
+def fetch_profile_data(username: str, groups=tuple(FRAGMENTS)):
+    """
+    Fetch user, repository and contribution data in a single GitHub GraphQL request.
+
+    Every field group is cached on its own with its own time to live (see
+    `github_tools.cache.CACHE_TTLS`), so only the groups that are missing or
+    expired are requested, together in one query.
+
+    Args:
+        username (str): GitHub username.
+        groups (iterable): Field groups to return, all of them by default.
+
+    Returns:
+        dict: JSON response from GitHub API containing the requested field groups,
+        or an error message in case of a request failure.
+    """
+    parts, missing = _cached_groups(username, groups)
+    if not missing:
+        with span("fetch", operation="profile", cache_misses=0):
+            return _merge_groups(parts)
+
+    # Concurrent lookups of the same user share one fetch
+    data = _profile_fetches.do(_profile_key("sync", username, missing), _fetch_groups, username, missing)
+    if not _is_complete(data):
+        return data
+    parts.update(_split_groups(data, missing))
+    return _merge_groups(parts)
+
+async def afetch_profile_data(username: str, groups=tuple(FRAGMENTS)):
+    """
+    Async version of `fetch_profile_data`.
+
+    Concurrent calls for the same username, on any event loop, await a
+    single request instead of each sending their own.
+
+    Args:
+        username (str): GitHub username.
+        groups (iterable): Field groups to return, all of them by default.
+
+    Returns:
+        dict: JSON response from GitHub API containing the requested field groups,
+        or an error message in case of a request failure.
+    """
+    parts, missing = _cached_groups(username, groups)
+    if not missing:
+        with span("fetch", operation="profile", cache_misses=0):
+            return _merge_groups(parts)
+
+    data = await _profile_fetches.ado(_profile_key("async", username, missing), _afetch_groups, username, missing)
+    if not _is_complete(data):
+        return data
+    parts.update(_split_groups(data, missing))
+    return _merge_groups(parts)
+
+def _profile_key(flavor: str, username: str, groups: list) -> tuple:
+    # Sync and async callers are kept apart: a thread joining a coroutine that
+    # runs on its own event loop would block that loop for good
+    return flavor, username.lower(), tuple(groups)
+
+def _fetch_groups(username: str, groups: list):
+    with span("fetch", operation="profile", cache_misses=len(groups)):
+        try:
+            data = post_query(build_profile_query(groups), {"login": username}, "profile")
+        except requests.exceptions.RequestException as e:
+            return {"errors": str(e)}
+        _store_groups(username, groups, data)
+        return data
+
+async def _afetch_groups(username: str, groups: list):
+    with span("fetch", operation="profile", cache_misses=len(groups)):
+        try:
+            data = await apost_query(build_profile_query(groups), {"login": username}, "profile")
+        except httpx.HTTPError as e:
+            return {"errors": str(e)}
+        _store_groups(username, groups, data)
+        return data
+
+def _group_key(username: str, group: str) -> str:
+    return cache_key(FRAGMENTS[group][1], username)
+
+def _cached_groups(username: str, groups):
+    """
+    Split the field groups into the cached ones ({group: user fields}) and the missing ones.
+    """
+    cache = get_cache()
+    parts, missing = {}, []
+    for group in groups:
+        cached = cache.get(_group_key(username, group))
+        if cached is None:
+            missing.append(group)
+        else:
+            parts[group] = cached
+    return parts, missing
+
+def _is_complete(data: dict) -> bool:
+    # Only cache complete answers, errors are retried on the next call
+    return isinstance(data, dict) and not data.get("errors") and bool((data.get("data") or {}).get("user"))
+
+def _split_groups(data: dict, groups) -> dict:
+    """
+    Cut a profile response into the user fields of each field group.
+    """
+    user = data["data"]["user"]
+    parts = {}
+    for group in groups:
+        fields = {key: user[key] for key in FRAGMENTS[group][2] if key in user}
+        if group == "user" and isinstance(fields.get("contributionsCollection"), dict):
+            collection = fields["contributionsCollection"]
+            fields["contributionsCollection"] = {key: collection[key] for key in USER_CONTRIBUTION_FIELDS if key in collection}
+        parts[group] = fields
+    return parts
+
+def _store_groups(username: str, groups, data: dict):
+    """
+    Cache every field group of a fresh response, unless it is an error.
+    """
+    if not _is_complete(data):
+        return
+    cache = get_cache()
+    for group, fields in _split_groups(data, groups).items():
+        cache.set(_group_key(username, group), fields, CACHE_TTLS[group])
+
+def _merge_groups(parts: dict) -> dict:
+    """
+    Join the user fields of several field groups back into one profile response.
+    """
+    user = {}
+    for fields in parts.values():
+        for key, value in fields.items():
+            if isinstance(value, dict) and isinstance(user.get(key), dict):
+                user[key] = {**user[key], **value}
+            else:
+                user[key] = value
+    return {"data": {"user": user}}
+
+def _slice(data: dict, group: str):
+    """
+    Reduce a combined profile response to the fields of one field group.
+    """
+    try:
+        user = data["data"]["user"]
+    except (KeyError, TypeError):
+        return data
+    if user is None:
+        return data
+    return {"data": {"user": {key: user[key] for key in FRAGMENTS[group][2] if key in user}}}
 
 def fetch_user_data(username: str, ):
     """
@@ -21,42 +348,11 @@ def fetch_user_data(username: str, ):
             - avatarUrl: The URL of the user's avatar.
             - followers: The total count of followers.
             - following: The total count of users the user is following.
-            - repositories: The total count of repositories owned by the user.
+            - repositoryCount: The total count of repositories owned by the user.
             - contributionsCollection: The total count of commits, pull requests, and issues contributed by the user.
         or an error message in case of a request failure.
     """
-    headers = {"Authorization": f"Bearer {TOKEN}"}
-    query = f"""
-    {{
-        user(login: "{username}") {{
-            name
-            bio
-            location
-            createdAt
-            avatarUrl
-            followers {{
-                totalCount
-            }}
-            following {{
-                totalCount
-            }}
-            repositories(ownerAffiliations: OWNER, isFork: false){{
-                totalCount
-            }}
-            contributionsCollection {{
-                totalCommitContributions
-                totalPullRequestContributions
-                totalIssueContributions
-                }}
-        }}
-    }}
-    """
-    try:
-        response = requests.post(BASE_URL, json={"query": query}, headers=headers)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        return {"errors": str(e)}
+    return _slice(fetch_profile_data(username), "user")
 
 def fetch_repo_data(username: str, ):
     """
@@ -68,45 +364,126 @@ def fetch_repo_data(username: str, ):
     Returns:
         dict: JSON response from GitHub API containing repository data such as:
             - totalCount: The total number of repositories owned by the user.
-            - edges: A list of repositories with details including:
+            - pageInfo: Cursor of the next page, see `iter_repositories`.
+            - edges: The first 100 repositories with details including:
                 - name: The name of the repository.
-                - primaryLanguage: The primary language used in the repository, including:
+                - pushedAt / updatedAt: When the repository was last pushed to and updated.
+                - languages: The first 100 languages used in the repository, including:
                     - name: The name of the language.
                     - color: The color associated with the language.
+                    - size: The number of bytes written in the language.
         or an error message in case of a request failure.
     """
-    headers = {"Authorization": f"Bearer {TOKEN}"}
-    query = f"""
-    {{
-        user(login: "{username}") {{
-            repositories(first: 100, ownerAffiliations: OWNER, isFork: false) {{
-                totalCount
-                edges {{
-                    node {{
-                        name
-                        languages(first: 3) {{
-                            totalCount
-                            edges{{
-                                node{{
-                                    name
-                                    color
-                                }}
-                                size
-                            }}
-                            totalSize
-                        }}
-                    }}
-                }}
-            }}
-        }}
-    }}
+    return _slice(fetch_profile_data(username), "repo")
+
+def iter_repositories(username: str, connection: dict = None):
     """
-    try:
-        response = requests.post(BASE_URL, json={"query": query}, headers=headers)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        return {"errors": str(e)}
+    Stream every repository of a user with all of its language edges.
+
+    The first page comes from `connection` when given, otherwise from the
+    shared profile response. While a page is
+    being consumed the next one is already requested, and repositories with
+    more than 100 languages get their remaining language pages fetched
+    concurrently, so only about two pages are held in memory at a time.
+
+    Args:
+        username (str): GitHub username.
+        connection (dict): Already fetched first page of the user's `repositories` connection.
+
+    Yields:
+        dict: Repository node with `name`, `pushedAt`, `updatedAt` and a complete `languages` connection.
+
+    Raises:
+        KeyError: If the response does not contain the user's repositories.
+        requests.exceptions.RequestException: If fetching a later page fails.
+    """
+    if connection is None:
+        data = fetch_repo_data(username)
+        connection = data['data']['user']['repositories']
+
+    with ThreadPoolExecutor(max_workers=PAGINATION_WORKERS) as pool:
+        while True:
+            page_info = connection['pageInfo']
+            next_page = None
+            if page_info['hasNextPage']:
+                next_page = pool.submit(copy_context().run, post_query, REPO_PAGE_QUERY, {"login": username, "after": page_info['endCursor']}, "repo_page")
+
+            extra_languages = {
+                edge['node']['name']: pool.submit(copy_context().run, _fetch_remaining_languages, username, edge['node'])
+                for edge in connection['edges']
+                if edge['node']['languages']['pageInfo']['hasNextPage']
+            }
+            for edge in connection['edges']:
+                repo = edge['node']
+                if repo['name'] in extra_languages:
+                    repo = _with_languages(repo, extra_languages[repo['name']].result())
+                yield repo
+
+            if next_page is None:
+                return
+            connection = next_page.result()['data']['user']['repositories']
+
+async def aiter_repositories(username: str, ):
+    """
+    Async version of `iter_repositories`.
+    """
+    data = await afetch_repo_data(username)
+    connection = data['data']['user']['repositories']
+
+    while True:
+        page_info = connection['pageInfo']
+        next_page = None
+        if page_info['hasNextPage']:
+            next_page = asyncio.ensure_future(apost_query(REPO_PAGE_QUERY, {"login": username, "after": page_info['endCursor']}, "repo_page"))
+
+        try:
+            extra_languages = {
+                edge['node']['name']: asyncio.ensure_future(_afetch_remaining_languages(username, edge['node']))
+                for edge in connection['edges']
+                if edge['node']['languages']['pageInfo']['hasNextPage']
+            }
+            for edge in connection['edges']:
+                repo = edge['node']
+                if repo['name'] in extra_languages:
+                    repo = _with_languages(repo, await extra_languages[repo['name']])
+                yield repo
+        except BaseException:
+            if next_page is not None:
+                next_page.cancel()
+            raise
+
+        if next_page is None:
+            return
+        connection = (await next_page)['data']['user']['repositories']
+
+def _fetch_remaining_languages(username: str, repo: dict):
+    """
+    Fetch the language edges after the first page of a repository's languages.
+    """
+    edges = []
+    page_info = repo['languages']['pageInfo']
+    while page_info['hasNextPage']:
+        data = post_query(LANGUAGE_PAGE_QUERY, {"login": username, "name": repo['name'], "after": page_info['endCursor']}, "language_page")
+        languages = data['data']['repository']['languages']
+        edges.extend(languages['edges'])
+        page_info = languages['pageInfo']
+    return edges
+
+async def _afetch_remaining_languages(username: str, repo: dict):
+    edges = []
+    page_info = repo['languages']['pageInfo']
+    while page_info['hasNextPage']:
+        data = await apost_query(LANGUAGE_PAGE_QUERY, {"login": username, "name": repo['name'], "after": page_info['endCursor']}, "language_page")
+        languages = data['data']['repository']['languages']
+        edges.extend(languages['edges'])
+        page_info = languages['pageInfo']
+    return edges
+
+def _with_languages(repo: dict, extra_edges: list):
+    # Copy instead of extending in place, the first page is shared with other tools
+    languages = dict(repo['languages'], edges=repo['languages']['edges'] + extra_edges)
+    languages['pageInfo'] = {"hasNextPage": False, "endCursor": None}
+    return dict(repo, languages=languages)
 
 def fetch_contribution_data(username: str, ):
     """
@@ -128,31 +505,145 @@ def fetch_contribution_data(username: str, ):
                         - date: The date of the contributions.
         or an error message in case of a request failure.
     """
-    headers = {"Authorization": f"Bearer {TOKEN}"}
-    query = f"""
-    {{
-        user(login: "{username}") {{
-            contributionsCollection {{
-                restrictedContributionsCount
-                totalPullRequestContributions
-                totalIssueContributions
-                contributionCalendar {{
-                    totalContributions
-                    weeks {{
-                        contributionDays {{
-                            contributionCount
-                            date
-                        }}
-                    }}
-                }}
-            }}
-        }}
-    }}
+    return _slice(fetch_profile_data(username), "contribution")
+
+def cached_contribution_data(username: str):
+    """
+    The response `fetch_contribution_data` would return, from the cache only.
+
+    Args:
+        username (str): GitHub username.
+
+    Returns:
+        dict: The cached contribution data, None if any field group of the profile is not cached.
+    """
+    parts, missing = _cached_groups(username, tuple(FRAGMENTS))
+    if missing:
+        return None
+    return _slice(_merge_groups(parts), "contribution")
+
+async def afetch_user_data(username: str, ):
+    """
+    Async version of `fetch_user_data`.
+    """
+    return _slice(await afetch_profile_data(username), "user")
+
+async def afetch_repo_data(username: str, ):
     """
+    Async version of `fetch_repo_data`.
+    """
+    return _slice(await afetch_profile_data(username), "repo")
+
+async def afetch_contribution_data(username: str, ):
+    """
+    Async version of `fetch_contribution_data`.
+    """
+    return _slice(await afetch_profile_data(username), "contribution")
+
+def fetch_contribution_history(username: str, ):
+    """
+    Fetch the contributions of every year since the user joined GitHub.
+
+    Each year is requested as its own `contributionsCollection(from:, to:)`
+    window and the windows are fetched concurrently. Past years cannot change
+    anymore, so they are cached without expiry and only the current year is
+    requested again on later calls.
+
+    Args:
+        username (str): GitHub username.
+
+    Returns:
+        dict: Year (int) -> `contributionsCollection` with `restrictedContributionsCount`
+        and `contributionCalendar`, or an error message in case of a request failure.
+    """
+    years = _history_years(fetch_user_data(username))
+    if isinstance(years, dict):
+        return years
+
+    history = {}
+    missing = []
+    for year in years:
+        cached = _load_year(username, year)
+        if cached is None:
+            missing.append(year)
+        else:
+            history[year] = cached
+
+    try:
+        with span("fetch", operation="contribution_history", cache_misses=len(missing)), \
+                ThreadPoolExecutor(max_workers=HISTORY_WORKERS) as pool:
+            # One copied context per year, so the GraphQL spans land in the caller's trace
+            futures = [pool.submit(copy_context().run, _fetch_year, username, year) for year in missing]
+            for year, future in zip(missing, futures):
+                history[year] = future.result()
+    except (requests.exceptions.RequestException, KeyError, TypeError) as e:
+        return {"errors": str(e)}
+    return dict(sorted(history.items()))
+
+async def afetch_contribution_history(username: str, ):
+    """
+    Async version of `fetch_contribution_history`.
+    """
+    years = _history_years(await afetch_user_data(username))
+    if isinstance(years, dict):
+        return years
+
+    history = {}
+    missing = []
+    for year in years:
+        cached = _load_year(username, year)
+        if cached is None:
+            missing.append(year)
+        else:
+            history[year] = cached
+
     try:
-        response = requests.post(BASE_URL, json={"query": query}, headers=headers)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
+        with span("fetch", operation="contribution_history", cache_misses=len(missing)):
+            collections = await asyncio.gather(*(_afetch_year(username, year) for year in missing))
+    except (httpx.HTTPError, KeyError, TypeError) as e:
         return {"errors": str(e)}
-    
\ No newline at end of file
+    history.update(zip(missing, collections))
+    return dict(sorted(history.items()))
+
+def _history_years(user_data: dict):
+    """
+    Years from the user's `createdAt` up to the current year, or the error response.
+    """
+    try:
+        created_at = user_data['data']['user']['createdAt']
+    except (KeyError, TypeError):
+        return {"errors": user_data.get("errors", "User not found") if isinstance(user_data, dict) else "User not found"}
+    first_year = int(created_at[:4])
+    return range(first_year, datetime.now(timezone.utc).year + 1)
+
+def _year_window(year: int) -> dict:
+    now = datetime.now(timezone.utc)
+    end = f"{year}-12-31T23:59:59Z" if year < now.year else now.strftime("%Y-%m-%dT%H:%M:%SZ")
+    return {"from": f"{year}-01-01T00:00:00Z", "to": end}
+
+def _fetch_year(username: str, year: int) -> dict:
+    data = post_query(CONTRIBUTION_YEAR_QUERY, {"login": username, **_year_window(year)}, "contribution_year")
+    collection = data['data']['user']['contributionsCollection']
+    _store_year(username, year, collection)
+    return collection
+
+async def _afetch_year(username: str, year: int) -> dict:
+    data = await apost_query(CONTRIBUTION_YEAR_QUERY, {"login": username, **_year_window(year)}, "contribution_year")
+    collection = data['data']['user']['contributionsCollection']
+    _store_year(username, year, collection)
+    return collection
+
+def _year_key(username: str, year: int) -> str:
+    return cache_key(CONTRIBUTION_YEAR_QUERY, username, year)
+
+def _load_year(username: str, year: int):
+    """
+    Cached contributions of a finished year, None for the current year or a cache miss.
+    """
+    if year >= datetime.now(timezone.utc).year:
+        return None
+    return get_cache().get(_year_key(username, year))
+
+def _store_year(username: str, year: int, collection: dict):
+    if year < datetime.now(timezone.utc).year:
+        get_cache().set(_year_key(username, year), collection, CACHE_TTLS["contribution_year"])
@@ -1,13 +1,222 @@
-from datetime import datetime
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
 from github_tools.fetch_data import *
-from github_tools.util import format_duration, is_less_than_2_months_old, format_iso_date, format_date_ddmmyyyy, get_language_distribution, get_langugage_percent
+from github_tools.cache import get_cache, cache_key, CACHE_TTLS
+from github_tools.contribution_calendar import ContributionCalendar
+from github_tools.models import UserStats, RepoLanguageStats, ContributionStats, ProfileStats, encode, decode
+from github_tools.render import render
+from github_tools.repo_languages import repo_language_totals, arepo_language_totals, stored_language_totals
+from github_tools.analytics import contribution_trends, weekday_distribution, burnout_signals, forecast
+from github_tools.tracing import span, traced, traced_tool
+from github_tools.prefetch import prefetched, serve_prefetched
+from github_tools.util import format_date_ddmmyyyy, get_language_distribution
 
+# Raised while building or rendering stats from a failed, empty or malformed response
+STATS_ERRORS = (LookupError, TypeError, AttributeError, ValueError)
+
+def load_user_stats(username:str):
+    """
+    Get the profile stats of a GitHub user as a `UserStats`.
+
+    The stats are computed once per fetched profile and cached in their
+    compact form next to the response, for as long as the response.
+
+    Args:
+      username (str): GitHub username.
+
+    Returns:
+      UserStats: The profile stats.
+
+    Raises:
+      LookupError: If the user cannot be fetched, KeyError if expected keys are missing.
+      TypeError: If the response is not of the expected type.
+    """
+    stats = _cached_model(username, "user")
+    if stats is None:
+        stats = _store_model(username, "user", _build(UserStats, fetch_user_data(username)))
+    return stats
+
+async def aload_user_stats(username:str):
+    """
+    Async version of `load_user_stats`.
+    """
+    stats = _cached_model(username, "user")
+    if stats is None:
+        stats = _store_model(username, "user", _build(UserStats, await afetch_user_data(username)))
+    return stats
+
+def load_contribution_stats(username:str):
+    """
+    Get the contribution stats of the last 12 months of a GitHub user as a `ContributionStats`, cached like `load_user_stats`.
+
+    Raises:
+      LookupError: If the user cannot be fetched, KeyError if expected keys are missing.
+      TypeError: If the response is not of the expected type.
+    """
+    stats = _cached_model(username, "contribution")
+    if stats is None:
+        stats = _store_model(username, "contribution", _build(ContributionStats, fetch_contribution_data(username)))
+    return stats
+
+async def aload_contribution_stats(username:str):
+    """
+    Async version of `load_contribution_stats`.
+    """
+    stats = _cached_model(username, "contribution")
+    if stats is None:
+        stats = _store_model(username, "contribution", _build(ContributionStats, await afetch_contribution_data(username)))
+    return stats
+
+def load_language_stats(username:str):
+    """
+    Get the language totals across the repositories of a GitHub user as a `RepoLanguageStats`.
+
+    The totals are kept per repository and refreshed incrementally, see
+    `github_tools.repo_languages.repo_language_totals`.
+    """
+    return RepoLanguageStats(repo_language_totals(username))
+
+async def aload_language_stats(username:str):
+    """
+    Async version of `load_language_stats`.
+    """
+    return RepoLanguageStats(await arepo_language_totals(username))
+
+def cached_contribution_stats(username:str):
+    """
+    `load_contribution_stats` from the cache only, for callers that must not wait for GitHub.
+
+    Returns:
+      ContributionStats: The stats, None if the contribution data is not cached.
+
+    Raises:
+      KeyError: If the cached data misses expected keys.
+      TypeError: If the cached data is not of the expected type.
+    """
+    stats = _cached_model(username, "contribution")
+    if stats is None:
+        data = cached_contribution_data(username)
+        if data is not None:
+            stats = _store_model(username, "contribution", _build(ContributionStats, data))
+    return stats
+
+def cached_language_stats(username:str):
+    """
+    `load_language_stats` from the stored totals only, however old, for callers that must not wait for GitHub.
+
+    Returns:
+      RepoLanguageStats: The stats, None if the repositories of the user were never walked.
+    """
+    totals = stored_language_totals(username)
+    return None if totals is None else RepoLanguageStats(totals)
+
+def load_profile_stats(username:str):
+    """
+    Get the user, language and contribution stats of a GitHub user as a `ProfileStats`.
+
+    The language and contribution stats are loaded on worker threads while
+    the user stats load, in a copy of the caller's context so their spans and
+    budget priority carry over. Identical queries are shared, so the user and
+    contribution stats still come from one combined GraphQL query. Languages
+    or contributions that cannot be fetched are left out.
+
+    Raises:
+      LookupError: If the user cannot be fetched, KeyError if expected keys are missing.
+      TypeError: If the response is not of the expected type.
+    """
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        languages = pool.submit(copy_context().run, _optional, load_language_stats, username, "language data")
+        contributions = pool.submit(copy_context().run, _optional, load_contribution_stats, username, "contribution data")
+        user = load_user_stats(username)
+        return ProfileStats(user, languages.result(), contributions.result())
+
+async def aload_profile_stats(username:str):
+    """
+    Async version of `load_profile_stats`, fetching the user, language and contribution stats concurrently.
+    """
+    user, languages, contributions = await asyncio.gather(
+        aload_user_stats(username),
+        aload_language_stats(username),
+        aload_contribution_stats(username),
+        return_exceptions=True,
+    )
+    if isinstance(user, BaseException):
+        raise user
+    return ProfileStats(user, _present(languages, "language data"), _present(contributions, "contribution data"))
+
+def gather_profile(username:str):
+    """
+    `load_profile_stats` answered from the prefetched stats of watched users.
+
+    Runs on the pooled sync client, so it is safe to call on hot paths and
+    from code that already runs inside an event loop.
+    """
+    warm = prefetched(username)
+    if warm is not None:
+        return warm
+    return load_profile_stats(username)
+
+def _build(model, data:dict):
+    with span("process", operation=model.__name__):
+        return model.from_response(data)
+
+def _model_key(username:str, group:str) -> str:
+    return cache_key(FRAGMENTS[group][1], username, "stats")
+
+def _cached_model(username:str, group:str):
+    cached = get_cache().get(_model_key(username, group))
+    return None if cached is None else decode(cached)
+
+def _store_model(username:str, group:str, stats):
+    get_cache().set(_model_key(username, group), encode(stats), CACHE_TTLS[group])
+    return stats
+
+def _stats_error(what:str, e:Exception) -> dict:
+    print(f"Error processing {what}: {str(e)}")
+    return {"errors": str(e)}
+
+def _optional(load, username:str, what:str):
+    # A section that cannot be fetched is left out instead of failing the whole profile
+    try:
+        return load(username)
+    except Exception as e:
+        _stats_error(what, e)
+        return None
+
+def _present(result, what:str):
+    if isinstance(result, Exception):
+        _stats_error(what, result)
+        return None
+    return result
+
+@traced_tool
+@serve_prefetched("contributions")
 def get_contribution_stats(username:str):
+    """
+    Get the processed contribution stats of a GitHub user.
+
+    Args:
+      username (str): GitHub username.
+
+    Returns:
+      str: Formatted contribution stats, see `process_contribution_data`.
+    """
+    try:
+        return render(load_contribution_stats(username))
+    except STATS_ERRORS as e:
+        return _stats_error("contribution data", e)
+
+@traced("process")
+def process_contribution_data(data:dict, days_format:str=None, token_budget:int=None):
     """
     Process the contribution data from GitHub API response.
 
     Args:
       data (dict): JSON response from GitHub API containing contribution data.
+      days_format (str): "compact" (default) encodes the contribution days as monthly/weekly
+        totals and run-length daily counts within `token_budget`, "raw" lists every day.
+      token_budget (int): Approximate token budget of the compact contribution days.
 
     Returns:
       str: Formatted string containing processed contribution data including:
@@ -20,141 +229,175 @@ def get_contribution_stats(username:str):
       - Longest Streak
       - Active Days
       - Contribution Days
+      dict: An error message if the data could not be processed.
+    """
+    try:
+        return render(ContributionStats.from_response(data), days_format=days_format, token_budget=token_budget)
+    except STATS_ERRORS as e:
+        return _stats_error("contribution data", e)
 
-    Raises:
-      KeyError: If the expected keys are not found in the input data.
-      TypeError: If the input data is not of the expected type.
+@traced_tool
+def get_contribution_history(username:str):
+    """
+    Get the lifetime contribution stats of a GitHub user, across every year since they joined.
+
+    Args:
+      username (str): GitHub username.
+
+    Returns:
+      str: Formatted lifetime contribution stats, see `process_contribution_history`.
+    """
+    return process_contribution_history(fetch_contribution_history(username))
+
+@traced("process")
+def process_contribution_history(history:dict):
+    """
+    Process the yearly contribution windows from `fetch_contribution_history`.
+
+    Args:
+      history (dict): Year -> `contributionsCollection` of that year.
+
+    Returns:
+      str: Formatted string containing lifetime contribution data including:
+      - Years covered
+      - Total, Public and Private Contributions
+      - Contributions per Year
+      - Highest Contribution and its date
+      - Current Streak
+      - Longest Streak
+      - Active Days
     """
     try:
-        data = fetch_contribution_data(username)
-        contributions_collection = data['data']['user']['contributionsCollection']
-        calendar = contributions_collection['contributionCalendar']
-        days = [day for week in calendar['weeks'] for day in week['contributionDays']]
-        
-        # Safely get contribution counts with fallbacks to 0
-        public_contributions = calendar.get('totalContributions', 0)
-        private_contributions = contributions_collection.get('restrictedContributionsCount', 0)
-        total_contributions = public_contributions + private_contributions
-        
-        # Ensure we have valid contribution counts
-        if not isinstance(public_contributions, (int, float)):
-            public_contributions = 0
-        if not isinstance(private_contributions, (int, float)):
-            private_contributions = 0
-            
-        # Calculate highest contribution
-        try:
-            highest_day = max(days, key=lambda day: day['contributionCount'])
-            highest_contribution = highest_day['contributionCount']
-            highest_contribution_date = format_date_ddmmyyyy(highest_day['date'])
-        except (ValueError, KeyError):
-            highest_contribution = 0
-            highest_contribution_date = None
-        
-        current_streak = 0
-        longest_streak = 0
-        
-        # Calculate streaks with validation
-        try:
-            for day in days:
-                if day.get('contributionCount', 0) > 0:
-                    current_streak += 1
-                    longest_streak = max(longest_streak, current_streak)
-                else:
-                    current_streak = 0
-        except (TypeError, KeyError):
-            current_streak = 0
-            longest_streak = 0
-
-        # Extract contribution days
-        weeks = calendar.get("weeks", [])
-        contribution_days = [day["date"] for week in weeks for day in week["contributionDays"] if day["contributionCount"] > 0]
-        active_days = len(set(contribution_days))  # Unique active contribution days
-        
-        # Today's Date in format of how it's fetched from GraohQL
-        today = datetime.now().strftime("%Y-%m-%d") 
-
-        # Find today's contributions
-        today_commits = sum(
-            day["contributionCount"]
-            for week in weeks
-            for day in week["contributionDays"]
-            if day["date"] == today
-        )
+        if "errors" in history:
+            return {"errors": history["errors"]}
+
+        public_contributions = 0
+        private_contributions = 0
+        yearly_totals = []
+        calendars = []
+        for year, collection in history.items():
+            calendar = collection['contributionCalendar']
+            public = calendar.get('totalContributions', 0) or 0
+            private = collection.get('restrictedContributionsCount', 0) or 0
+            public_contributions += public
+            private_contributions += private
+            yearly_totals.append(f"{year}: {public + private}")
+            calendars.append(ContributionCalendar.from_weeks(calendar['weeks']))
+
+        metrics = ContributionCalendar.merge(calendars).metrics()
+        highest_contribution_date = metrics["highest_contribution_date"]
+        if highest_contribution_date is not None:
+            highest_contribution_date = format_date_ddmmyyyy(highest_contribution_date.isoformat())
+        years = list(history)
 
         return f"""
-        🔢 Total Contributions: {total_contributions}
+        🗓️ Years: {f"{years[0]} - {years[-1]}" if years else None}
+        🔢 Total Contributions: {public_contributions + private_contributions}
         🌐 Public Contributions: {public_contributions}
         🔒 Private Contributions: {private_contributions}
-        📈 Highest Contribution: {highest_contribution} on {highest_contribution_date}
-        📅 Today's Commits: {today_commits}
-        🔥 Current Streak: {current_streak} days
-        🏆 Longest Streak: {longest_streak} days
-        📆 Active Days: {active_days}
-        📜 Contribution Days: {days}
+        📊 Contributions per Year: {", ".join(yearly_totals)}
+        📈 Highest Contribution: {metrics["highest_contribution"]} on {highest_contribution_date}
+        🔥 Current Streak: {metrics["current_streak"]} days
+        🏆 Longest Streak: {metrics["longest_streak"]} days
+        📆 Active Days: {metrics["active_days"]}
         """
-    except (KeyError, TypeError) as e:
-        print(f"Error processing contribution data: {str(e)}")
+    except (KeyError, TypeError, ValueError) as e:
+        print(f"Error processing contribution history: {str(e)}")
         return {
-            "total_contributions": 0,
-            "public_contributions": 0,
-            "private_contributions": 0,
-            "highest_contribution": 0,
-            "current_streak": 0,
-            "longest_streak": 0,
-            "days": []
+            "errors": str(e)
         }
 
+@traced_tool
+@serve_prefetched("languages")
 def get_repo_stats(username:str):
+    """
+    Get the language distribution across the repositories of a GitHub user.
+
+    The totals are kept per repository and refreshed incrementally, only
+    repositories pushed since the last call are downloaded again, see
+    `github_tools.repo_languages.repo_language_totals`.
+
+    Args:
+      username (str): GitHub username.
+
+    Returns:
+      str: Formatted language percentages, see `process_repo_data`.
+    """
+    try:
+        return render(load_language_stats(username))
+
+    except Exception as e:
+        return _stats_error("language data", e)
+
+def process_repo_data(repositories):
     """
     Process the repository data from GitHub API response.
 
+    The repositories are folded into the language totals one at a time, so a
+    generator such as `iter_repositories` is never materialized.
+
     Args:
-      data (dict): JSON response from GitHub API containing repository data.
+      repositories (iterable): Repository nodes, each with a `name` and a `languages` connection.
 
     Returns:
-      dict: Processed repository data including:
-      - language_data (dict): Dictionary of languages with their usage counts and colors.
+      str: Percentage of each language across all repositories.
+      dict: An error message if the data could not be processed.
+    """
+    try:
+        return render(repo_language_stats(repositories))
+
+    except Exception as e:
+        return _stats_error("language data", e)
+
+def repo_language_stats(repositories):
+    """
+    Fold repository nodes into a `RepoLanguageStats`, see `process_repo_data`.
 
     Raises:
       KeyError: If the expected keys are not found in the input data.
       TypeError: If the input data is not of the expected type.
     """
-    try:
-        data = fetch_repo_data(username)
-        # Get repositories from the user data
-        repositories = data['data']['user']['repositories']['edges']
-        
-        # Process language data
-        repo_language_data = {}
-        
-        for edge in repositories:
-            repo = edge['node']
-            repo_name = repo['name']
-            languages_node = repo['languages']
-            language_count = languages_node['totalCount']
-
-            if language_count > 0:
-
-                languages = languages_node['edges']
-                lang_list = []
-                for language in languages:
-                    language_name = language['node']['name']
-                    language_size = language['size']
-                    lang_list.append({language_name: language_size})
-
-                repo_language_data[repo_name] = lang_list
-        
-        lang_distribution = get_language_distribution(repo_language_data)
-        lang_percent = get_langugage_percent(lang_distribution)
-
-        return lang_percent
+    return RepoLanguageStats(get_language_distribution(_iter_repo_languages(repositories)))
 
-    except Exception as e:
-        print(f"Error processing language data: {str(e)}")
-        return None
+def _iter_repo_languages(repositories):
+    """
+    Yield (repository name, [{language: size}, ...]) for every repository that uses a language.
+    """
+    for repo in repositories:
+        repo_name = repo['name']
+        languages_node = repo['languages']
+        language_count = languages_node['totalCount']
+
+        if language_count > 0:
+
+            languages = languages_node['edges']
+            lang_list = []
+            for language in languages:
+                language_name = language['node']['name']
+                language_size = language['size']
+                lang_list.append({language_name: language_size})
+
+            yield repo_name, lang_list
 
+@traced_tool
+@serve_prefetched("user")
 def get_user_stats(username:str):
+    """
+    Get the processed profile stats of a GitHub user.
+
+    Args:
+      username (str): GitHub username.
+
+    Returns:
+      str: Formatted profile stats, see `process_user_data`.
+    """
+    try:
+        return render(load_user_stats(username))
+    except STATS_ERRORS as e:
+        return _stats_error("user data", e)
+
+@traced("process")
+def process_user_data(data:dict):
     """
     Process the user data from GitHub API response.
 
@@ -178,44 +421,239 @@ def get_user_stats(username:str):
       - Joined Since
       - GitHub Days
       - Less Than 2 Months Old
+      dict: An error message if the data could not be processed.
+    """
+    try:
+        return render(UserStats.from_response(data))
+    except STATS_ERRORS as e:
+        return _stats_error("user data", e)
+
+def gather_stats(username:str):
+    """
+    Get the user, repository and contribution stats of a GitHub user concurrently.
+
+    The three tools run on worker threads in copies of the caller's context,
+    like the sections of `load_profile_stats`.
+
+    Args:
+      username (str): GitHub username.
+
+    Returns:
+      tuple: (user stats, repository stats, contribution stats) as returned by
+      `get_user_stats`, `get_repo_stats` and `get_contribution_stats`.
+    """
+    warm = prefetched(username)
+    if warm is not None and warm.languages is not None and warm.contributions is not None:
+        return render(warm.user), render(warm.languages), render(warm.contributions)
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        results = [pool.submit(copy_context().run, tool, username) for tool in (get_user_stats, get_repo_stats, get_contribution_stats)]
+        return tuple(result.result() for result in results)
+
+@traced_tool
+@serve_prefetched()
+def get_full_profile(username:str):
+    """
+    Get the profile, language and contribution stats of a GitHub user in a single call.
+
+    Use this for whole-profile questions instead of calling get_user_stats,
+    get_repo_stats and get_contribution_stats one after another: all three
+    come from one combined GraphQL query, with further repository pages
+    fetched in the background.
+
+    Args:
+      username (str): GitHub username.
+
+    Returns:
+      str: One section per dataset with one "key: value" line per stat, the
+      largest languages and the rest as "Other", see `github_tools.render.profile_llm`.
+    """
+    try:
+        return render(load_profile_stats(username))
+    except STATS_ERRORS as e:
+        return _stats_error("user data", e)
+
+def _contribution_calendar(username:str):
+    """
+    The `ContributionCalendar` of the last 12 months of a GitHub user, from the
+    prefetched stats of watched users or `load_contribution_stats`.
 
     Raises:
-      KeyError: If the expected keys are not found in the input data.
-      TypeError: If the input data is not of the expected type.
+      LookupError: If the user cannot be fetched, KeyError if expected keys are missing.
+      TypeError: If the response is not of the expected type.
+    """
+    warm = prefetched(username)
+    if warm is not None and warm.contributions is not None:
+        return warm.contributions.calendar
+    return load_contribution_stats(username).calendar
+
+@traced_tool
+def get_contribution_trends(username:str):
+    """
+    Get the contribution trends of a GitHub user over the last 12 months:
+    7/30/90 day rolling averages against the period before, monthly totals and weekly totals.
+
+    Args:
+      username (str): GitHub username.
+
+    Returns:
+      str: Formatted trends, see `process_contribution_trends`.
+    """
+    try:
+        return process_contribution_trends(_contribution_calendar(username))
+    except STATS_ERRORS as e:
+        return _stats_error("contribution trends", e)
+
+@traced("process")
+def process_contribution_trends(calendar:ContributionCalendar):
+    """
+    Compute the rolling averages and weekly/monthly aggregates of a contribution calendar.
+
+    Args:
+      calendar (ContributionCalendar): Contribution calendar of the last 12 months.
+
+    Returns:
+      str: Formatted string containing:
+      - Rolling daily averages of the last 7, 30 and 90 days and their change
+      - Monthly Totals, Best and Worst Month
+      - Weekly Totals of the complete weeks up to today
+    """
+    trends = contribution_trends(calendar)
+    rolling = "; ".join(
+        f"{window}d: {values['average']}/day"
+        + (f" ({values['change']:+d}% vs previous {window}d)" if values['change'] is not None else "")
+        for window, values in trends['rolling'].items()
+    )
+    best, worst = trends['best_month'], trends['worst_month']
+    return f"""
+        📈 Rolling Averages: {rolling}
+        🗓️ Monthly Totals: {", ".join(f"{month}: {total}" for month, total in trends['monthly'])}
+        🏆 Best Month: {f"{best[0]} ({best[1]})" if best else None}
+        📉 Worst Month: {f"{worst[0]} ({worst[1]})" if worst else None}
+        📊 Weekly Totals (oldest first): {",".join(map(str, trends['weekly']))}
+        """
+
+@traced_tool
+def get_weekday_distribution(username:str):
+    """
+    Get how the contributions of a GitHub user over the last 12 months spread across the weekdays.
+
+    Args:
+      username (str): GitHub username.
+
+    Returns:
+      str: Formatted weekday distribution, see `process_weekday_distribution`.
     """
     try:
-        data = fetch_user_data(username)
-        user_data = data['data']['user']
-        
-        # Calculate total GitHub days
-        created_at = user_data.get("createdAt")
-        formatted_date = format_iso_date(created_at) 
+        return process_weekday_distribution(_contribution_calendar(username))
+    except STATS_ERRORS as e:
+        return _stats_error("weekday distribution", e)
 
-        less_than_2_months_old = is_less_than_2_months_old(created_at)
-        github_days = (datetime.now() - datetime.strptime(created_at, "%Y-%m-%dT%H:%M:%SZ")).days
+@traced("process")
+def process_weekday_distribution(calendar:ContributionCalendar):
+    """
+    Compute the weekday distribution of a contribution calendar.
 
-        joined_since = format_duration(created_at)
+    Args:
+      calendar (ContributionCalendar): Contribution calendar of the last 12 months.
 
-        return f"""
-        👤 Name: {user_data.get("name", "")}
-        📝 Bio: {user_data.get("bio", "")}
-        📍 Location: {user_data.get("location", "")}
-        📅 Created At: {created_at}
-        🖼️ Avatar URL: {user_data.get("avatarUrl")}
-        👥 Followers: {user_data.get("followers").get("totalCount", 0)}
-        👤 Following: {user_data.get("following").get("totalCount", 0)}
-        📦 Repositories: {user_data.get("repositories").get("totalCount", 0)}
-        📝 Total Commits: {user_data.get("contributionsCollection").get("totalCommitContributions", 0)}
-        🔀 Total Pull Requests: {user_data.get("contributionsCollection").get("totalPullRequestContributions", 0)}
-        🐛 Total Issues: {user_data.get("contributionsCollection").get("totalIssueContributions", 0)}
-        📅 Formatted Date: {formatted_date}
-        ⏳ Joined Since: {joined_since}
-        📆 GitHub Days: {github_days}
-        🕒 Less Than 2 Months Old: {less_than_2_months_old}
+    Returns:
+      str: One line per weekday with its total, share of all contributions and
+      the share of those weekdays with any activity, plus the busiest and quietest weekday.
+    """
+    weekdays = weekday_distribution(calendar)
+    busiest = max(weekdays, key=lambda weekday: weekday['total'])
+    quietest = min(weekdays, key=lambda weekday: weekday['total'])
+    lines = "\n        ".join(
+        f"📆 {weekday['weekday']}: {weekday['total']} ({weekday['share']}%), active {weekday['active_rate']}% of them"
+        for weekday in weekdays
+    )
+    return f"""
+        {lines}
+        💪 Busiest Weekday: {busiest['weekday']}
+        😴 Quietest Weekday: {quietest['weekday']}
+        """
+
+@traced_tool
+def get_burnout_signals(username:str):
+    """
+    Get burnout and inactivity signals of a GitHub user over the last 12 months:
+    recent activity against the usual level, inactivity gaps and bursts followed by breaks.
+
+    Args:
+      username (str): GitHub username.
+
+    Returns:
+      str: Formatted signals and a low/moderate/high risk, see `process_burnout_signals`.
+    """
+    try:
+        return process_burnout_signals(_contribution_calendar(username))
+    except STATS_ERRORS as e:
+        return _stats_error("burnout signals", e)
+
+@traced("process")
+def process_burnout_signals(calendar:ContributionCalendar):
+    """
+    Compute the burnout signals of a contribution calendar.
+
+    Args:
+      calendar (ContributionCalendar): Contribution calendar of the last 12 months.
+
+    Returns:
+      str: Formatted string containing:
+      - Burnout Risk
+      - Recent (last 4 weeks) and Usual (12 weeks before) daily averages and their change
+      - Days Since Last Contribution
+      - Longest Gap and the most recent inactivity gaps
+      - Bursts of activity that were followed by a gap
+    """
+    signals = burnout_signals(calendar)
+    change = signals['recent_change']
+    gaps = ", ".join(
+        f"{format_date_ddmmyyyy(start.isoformat())} ({days} days)" for start, days in signals['gaps'][-5:]
+    )
+    bursts = ", ".join(format_date_ddmmyyyy(start.isoformat()) for start in signals['bursts_before_breaks'])
+    return f"""
+        🚦 Burnout Risk: {signals['risk']}
+        📊 Recent vs Usual: {signals['recent_average']}/day vs {signals['usual_average']}/day{f" ({change:+d}%)" if change is not None else ""}
+        ⏸️ Days Since Last Contribution: {signals['days_since_last_contribution']}
+        🕳️ Longest Gap: {signals['longest_gap']} days
+        📅 Recent Gaps: {gaps or "none"}
+        🔥 Bursts Before Breaks: {bursts or "none"}
+        """
+
+@traced_tool
+def get_activity_forecast(username:str):
+    """
+    Forecast the contributions of a GitHub user for the next 4 weeks from the trend of the last 12 weeks.
+
+    Args:
+      username (str): GitHub username.
+
+    Returns:
+      str: Formatted forecast, see `process_activity_forecast`.
+    """
+    try:
+        return process_activity_forecast(_contribution_calendar(username))
+    except STATS_ERRORS as e:
+        return _stats_error("activity forecast", e)
+
+@traced("process")
+def process_activity_forecast(calendar:ContributionCalendar):
+    """
+    Compute the activity forecast of a contribution calendar.
+
+    Args:
+      calendar (ContributionCalendar): Contribution calendar of the last 12 months.
+
+    Returns:
+      str: Formatted string containing the expected total of each coming week,
+      their sum, the weekly trend and the expected active days.
+    """
+    prediction = forecast(calendar)
+    return f"""
+        🔮 Forecast From: {format_date_ddmmyyyy(prediction['start'].isoformat())}
+        📅 Expected Weekly Totals: {", ".join(map(str, prediction['weekly']))}
+        🔢 Expected Total (4 weeks): {prediction['total']}
+        📈 Trend: {prediction['trend']:+} contributions per week
+        📆 Expected Active Days: {prediction['expected_active_days']}
         """
-    except (KeyError, TypeError) as e:
-        print(f"Error processing contribution data: {str(e)}")
-        return {
-            "errors": str(e)
-        }
-    
\ No newline at end of file
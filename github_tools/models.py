@@ -0,0 +1,302 @@
+"""
+Typed results of the stats tools.
+
+The user, language and contribution stats are computed once from the GitHub
+API responses into slotted dataclasses, cached in their compact form and
+rendered per consumer: the agent tools, the fast path and the bulk export
+all start from the same objects, see `github_tools.render`.
+
+Models encode to a positional list (`encode`) for the cache, to a readable
+dict (`to_dict`) for exports, and to bytes with `dumps`: JSON, or MessagePack
+when the optional `msgpack` package is installed.
+"""
+import json
+from dataclasses import dataclass
+from datetime import date, datetime
+from github_tools.contribution_calendar import ContributionCalendar
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Format `dumps` uses by default
+DEFAULT_FORMAT = "msgpack" if msgpack is not None else "json"
+
+class _Model:
+    """
+    Encoding shared by the stats models, field values in declaration order.
+    """
+    __slots__ = ()
+
+    def to_list(self) -> list:
+        """
+        Field values in declaration order, JSON serializable.
+        """
+        return [_compact(getattr(self, name)) for name in self.__slots__]
+
+    def to_dict(self) -> dict:
+        """
+        Field names and values, JSON serializable.
+        """
+        return {name: _readable(getattr(self, name)) for name in self.__slots__}
+
+    @classmethod
+    def from_list(cls, values: list):
+        """
+        Inverse of `to_list`.
+        """
+        return cls(*values)
+
+    @classmethod
+    def from_dict(cls, values: dict):
+        """
+        Inverse of `to_dict`.
+        """
+        return cls.from_list([values.get(name) for name in cls.__slots__])
+
+@dataclass(slots=True)
+class UserStats(_Model):
+    """
+    Profile stats of a GitHub user.
+
+    Values that depend on the current date (account age, "joined since") are
+    derived when rendering, so cached stats never report an outdated age.
+    """
+    name: str = None
+    bio: str = None
+    location: str = None
+    created_at: str = None
+    avatar_url: str = None
+    followers: int = 0
+    following: int = 0
+    repositories: int = 0
+    commits: int = 0
+    pull_requests: int = 0
+    issues: int = 0
+
+    @classmethod
+    def from_response(cls, data: dict):
+        """
+        Build the stats from a GitHub API response with the `UserFields` fragment.
+
+        Raises:
+            LookupError: If the response has no user, KeyError if expected keys are missing.
+            TypeError: If the input data is not of the expected type.
+            ValueError: If the creation date cannot be parsed.
+        """
+        user = _user(data)
+        created_at = user.get("createdAt")
+        datetime.strptime(created_at, "%Y-%m-%dT%H:%M:%SZ")
+        collection = user.get("contributionsCollection")
+        return cls(
+            name=user.get("name", ""),
+            bio=user.get("bio", ""),
+            location=user.get("location", ""),
+            created_at=created_at,
+            avatar_url=user.get("avatarUrl"),
+            followers=user.get("followers").get("totalCount", 0),
+            following=user.get("following").get("totalCount", 0),
+            repositories=user.get("repositoryCount").get("totalCount", 0),
+            commits=collection.get("totalCommitContributions", 0),
+            pull_requests=collection.get("totalPullRequestContributions", 0),
+            issues=collection.get("totalIssueContributions", 0),
+        )
+
+    @property
+    def github_days(self) -> int:
+        """
+        Days since the account was created.
+        """
+        return (datetime.now() - datetime.strptime(self.created_at, "%Y-%m-%dT%H:%M:%SZ")).days
+
+@dataclass(slots=True)
+class RepoLanguageStats(_Model):
+    """
+    Bytes of code per language across the repositories of a user, in first seen order.
+    """
+    sizes: dict
+
+    def percentages(self) -> list:
+        """
+        (language, percent of all bytes rounded to 2 decimals) pairs.
+        """
+        total = sum(self.sizes.values()) or 1
+        return [(language, round(size / total * 100, 2)) for language, size in self.sizes.items()]
+
+@dataclass(slots=True)
+class ContributionStats(_Model):
+    """
+    Contribution counts and calendar metrics of the last 12 months.
+    """
+    public: int
+    private: int
+    highest: int
+    highest_date: date
+    today: int
+    current_streak: int
+    longest_streak: int
+    active_days: int
+    calendar: ContributionCalendar
+
+    @classmethod
+    def from_response(cls, data: dict):
+        """
+        Build the stats from a GitHub API response with the `ContributionFields` fragment.
+
+        Raises:
+            LookupError: If the response has no user, KeyError if expected keys are missing.
+            TypeError: If the input data is not of the expected type.
+        """
+        collection = _user(data)['contributionsCollection']
+        calendar = collection['contributionCalendar']
+        return cls.from_calendar(
+            ContributionCalendar.from_weeks(calendar['weeks']),
+            calendar.get('totalContributions', 0),
+            collection.get('restrictedContributionsCount', 0),
+        )
+
+    @classmethod
+    def from_calendar(cls, calendar: ContributionCalendar, public: int = 0, private: int = 0):
+        """
+        Build the stats from a calendar and the public and private totals, invalid totals count as 0.
+        """
+        metrics = calendar.metrics()
+        return cls(
+            public=public if isinstance(public, (int, float)) else 0,
+            private=private if isinstance(private, (int, float)) else 0,
+            highest=metrics["highest_contribution"],
+            highest_date=metrics["highest_contribution_date"],
+            today=metrics["today_count"],
+            current_streak=metrics["current_streak"],
+            longest_streak=metrics["longest_streak"],
+            active_days=metrics["active_days"],
+            calendar=calendar,
+        )
+
+    @classmethod
+    def from_list(cls, values: list):
+        public, private, highest, highest_date, today, current, longest, active, calendar = values
+        return cls(public, private, highest, _date(highest_date), today, current, longest, active, _calendar(calendar))
+
+    @property
+    def total(self) -> int:
+        return self.public + self.private
+
+    def days_idle(self, today: date = None):
+        """
+        Days since the last contribution, None without any in the calendar.
+        """
+        counts = self.calendar.counts
+        last = next((i for i in range(len(counts) - 1, -1, -1) if counts[i]), None)
+        if last is None:
+            return None
+        return ((today or date.today()) - self.calendar.date_at(last)).days
+
+@dataclass(slots=True)
+class ProfileStats(_Model):
+    """
+    The user, language and contribution stats of one user, languages and
+    contributions are None when they could not be fetched.
+    """
+    user: UserStats
+    languages: RepoLanguageStats = None
+    contributions: ContributionStats = None
+
+    @classmethod
+    def from_list(cls, values: list):
+        user, languages, contributions = values
+        return cls(_nested(UserStats, user), _nested(RepoLanguageStats, languages), _nested(ContributionStats, contributions))
+
+    @property
+    def days_idle(self):
+        """
+        Days since the last contribution, None without any.
+        """
+        return None if self.contributions is None else self.contributions.days_idle()
+
+# Short type tags of the encoded models
+TAGS = {"u": UserStats, "l": RepoLanguageStats, "c": ContributionStats, "p": ProfileStats}
+_TAG_OF = {model: tag for tag, model in TAGS.items()}
+
+def encode(model) -> list:
+    """
+    Compact JSON serializable form of a model: its type tag followed by its field values.
+    """
+    return [_TAG_OF[type(model)], *model.to_list()]
+
+def decode(value: list):
+    """
+    Inverse of `encode`.
+
+    Raises:
+        KeyError: If the type tag is unknown.
+    """
+    return TAGS[value[0]].from_list(value[1:])
+
+def dumps(model, format: str = DEFAULT_FORMAT) -> bytes:
+    """
+    Serialize a model as "json" or "msgpack" bytes.
+
+    Raises:
+        ValueError: If the format is unknown or msgpack is not installed.
+    """
+    value = encode(model)
+    if format == "json":
+        return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("UTF-8")
+    if format == "msgpack" and msgpack is not None:
+        return msgpack.packb(value)
+    raise ValueError(f"Cannot serialize to {format}")
+
+def loads(data: bytes):
+    """
+    Inverse of `dumps`, the format is detected from the first byte.
+    """
+    # An encoded model is a JSON array ("[") or a MessagePack array (0x90 and up)
+    if data[:1] == b"[":
+        return decode(json.loads(data))
+    if msgpack is None:
+        raise ValueError("msgpack is not installed")
+    return decode(msgpack.unpackb(data))
+
+def _user(data: dict) -> dict:
+    user = (data.get('data') or {}).get('user') if isinstance(data, dict) else None
+    if user is None:
+        errors = data.get('errors') if isinstance(data, dict) else None
+        if isinstance(errors, list):
+            errors = "; ".join(error.get('message', str(error)) if isinstance(error, dict) else str(error) for error in errors)
+        raise LookupError(errors or "User not found")
+    return user
+
+def _compact(value):
+    if isinstance(value, _Model):
+        return value.to_list()
+    if isinstance(value, ContributionCalendar):
+        return [value.start.isoformat(), value.counts.tolist()]
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+def _readable(value):
+    if isinstance(value, _Model):
+        return value.to_dict()
+    if isinstance(value, ContributionCalendar):
+        return {"start": value.start.isoformat(), "counts": value.counts.tolist()}
+    return _compact(value)
+
+def _date(value):
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+def _calendar(value) -> ContributionCalendar:
+    if isinstance(value, ContributionCalendar):
+        return value
+    if isinstance(value, dict):
+        return ContributionCalendar(date.fromisoformat(value["start"]), value["counts"])
+    return ContributionCalendar(date.fromisoformat(value[0]), value[1])
+
+def _nested(model, value):
+    if value is None or isinstance(value, model):
+        return value
+    if isinstance(value, dict):
+        return model.from_dict(value)
+    return model.from_list(value)
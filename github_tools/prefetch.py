@@ -0,0 +1,335 @@
+"""
+Background refresh of the stats of watched GitHub users.
+
+Users on the watchlist (`GITHUB_WATCHLIST`, `GITHUB_WATCHLIST_FILE`) have
+their user, language and contribution stats (a `ProfileStats`) computed
+ahead of time by a `PrefetchScheduler` running in worker threads next to
+the app. The stats tools render watched users from that memory instead of
+fetching and processing on the first question.
+
+Refresh cadence adapts to activity: a user who contributed today is
+refreshed every `PREFETCH_MIN_INTERVAL` seconds, the interval grows with
+every idle day up to `PREFETCH_MAX_INTERVAL` for dormant profiles. Refreshes
+run with batch priority, so they only spend the rate limit budget that
+interactive lookups leave over (see `github_tools.budget`).
+
+Run on its own, the scheduler keeps the shared persistent cache warm for
+other processes:
+
+    python -m github_tools.prefetch -f team.txt
+"""
+import argparse, functools, heapq, os, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from github_tools.budget import priority, BATCH
+from github_tools.render import render
+from github_tools.tracing import metrics
+
+# Comma separated usernames and/or a file with one username per line
+WATCHLIST = os.getenv("GITHUB_WATCHLIST", "")
+WATCHLIST_FILE = os.getenv("GITHUB_WATCHLIST_FILE", "")
+
+PREFETCH_MIN_INTERVAL = float(os.getenv("PREFETCH_MIN_INTERVAL", "600"))
+PREFETCH_MAX_INTERVAL = float(os.getenv("PREFETCH_MAX_INTERVAL", str(6 * 60 * 60)))
+PREFETCH_WORKERS = int(os.getenv("PREFETCH_WORKERS", "4"))
+
+# Prefetched stats older than this many refresh intervals are not served, e.g. when refreshes keep failing
+MAX_STALE_INTERVALS = 2
+# Seconds between two reports of the staleness gauges
+REPORT_INTERVAL = 15.0
+
+def load_watchlist(names: str = WATCHLIST, path: str = WATCHLIST_FILE) -> list:
+    """
+    Usernames of the watchlist, from a comma separated string and a file with one username per line.
+
+    Args:
+        names (str): Comma or whitespace separated usernames.
+        path (str): File of usernames, lines starting with `#` are ignored.
+
+    Returns:
+        list: Usernames without duplicates, in the order given.
+    """
+    usernames = names.replace(",", " ").split()
+    if path:
+        with open(path, encoding="UTF-8") as stream:
+            usernames.extend(line.strip() for line in stream if line.strip() and not line.startswith("#"))
+    return list(dict.fromkeys(usernames))
+
+def refresh_interval(days_idle, min_interval: float = PREFETCH_MIN_INTERVAL, max_interval: float = PREFETCH_MAX_INTERVAL) -> float:
+    """
+    Seconds until the next refresh of a user who last contributed `days_idle` days ago.
+
+    Every idle day adds one minimum interval, None (no contributions in the last year) gets the maximum.
+    """
+    if days_idle is None:
+        return max_interval
+    return min(max_interval, min_interval * (1 + days_idle))
+
+def compute_stats(username: str):
+    """
+    The stats of a user, from one profile query plus the stored language totals.
+
+    Returns:
+        ProfileStats: The stats the tools render, see `github_tools.github_tools.load_profile_stats`.
+
+    Raises:
+        LookupError: If the user cannot be resolved.
+    """
+    # The tools import this module, so they are imported on first use
+    from github_tools.github_tools import load_profile_stats
+    return load_profile_stats(username)
+
+class PrefetchScheduler:
+    """
+    Keeps the stats of watched users computed, refreshing each on its own adaptive interval.
+
+    A scheduling thread hands due users to `workers` refresh threads. A failed
+    refresh keeps the previous stats and is retried after the minimum interval.
+
+    Args:
+        usernames (iterable): The watchlist.
+        min_interval (float): Refresh interval of users active today, in seconds.
+        max_interval (float): Refresh interval of dormant users, in seconds.
+        workers (int): Users refreshed at the same time.
+        compute (callable): Computes the `ProfileStats` of a username, `compute_stats` by default.
+    """
+
+    def __init__(self, usernames=(), min_interval: float = PREFETCH_MIN_INTERVAL, max_interval: float = PREFETCH_MAX_INTERVAL,
+                 workers: int = PREFETCH_WORKERS, compute=compute_stats):
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.workers = workers
+        self.compute = compute
+        # username (lowercase) -> {"username", "profile", "refreshed_at", "interval"}
+        self._entries = {}
+        self._watched = {}
+        self._due = []
+        self._running = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._pool = None
+        self._thread = None
+        for username in usernames:
+            self.watch(username)
+
+    def watch(self, username: str):
+        """
+        Add a user to the watchlist, due for a refresh right away.
+        """
+        key = username.lower()
+        with self._lock:
+            if key in self._watched:
+                return
+            self._watched[key] = username
+            heapq.heappush(self._due, (time.monotonic(), key))
+        self._wake.set()
+
+    def unwatch(self, username: str):
+        """
+        Remove a user from the watchlist and drop their prefetched stats.
+        """
+        key = username.lower()
+        with self._lock:
+            self._watched.pop(key, None)
+            self._entries.pop(key, None)
+
+    def get(self, username: str):
+        """
+        The prefetched entry of a watched user, None if they are not warm or too stale to serve.
+        """
+        entry = self._entries.get(username.lower())
+        if entry is None or time.monotonic() - entry["refreshed_at"] > MAX_STALE_INTERVALS * entry["interval"]:
+            return None
+        return entry
+
+    def refresh(self, username: str) -> bool:
+        """
+        Refresh one watched user now, in the calling thread.
+
+        Returns:
+            bool: False if the refresh failed and the previous stats were kept.
+        """
+        key = username.lower()
+        start = time.monotonic()
+        try:
+            with priority(BATCH):
+                profile = self.compute(self._watched.get(key, username))
+        except Exception as e:
+            print(f"Prefetch of {username} failed: {str(e)}")
+            metrics.inc("github_agent_prefetch_refreshes_total", help="Background refreshes of watched users", result="error")
+            self._schedule(key, self.min_interval)
+            return False
+
+        interval = refresh_interval(profile.days_idle, self.min_interval, self.max_interval)
+        now = time.monotonic()
+        with self._lock:
+            if key in self._watched:
+                self._entries[key] = {"username": self._watched[key], "profile": profile, "refreshed_at": now, "interval": interval}
+        metrics.inc("github_agent_prefetch_refreshes_total", help="Background refreshes of watched users", result="ok")
+        metrics.observe("github_agent_prefetch_refresh_seconds", now - start, help="Time a background refresh took")
+        self._schedule(key, interval)
+        return True
+
+    def start(self):
+        """
+        Start the scheduling thread and the refresh workers.
+        """
+        if self._thread is not None:
+            return self
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="prefetch")
+        self._thread = threading.Thread(target=self._loop, name="prefetch-scheduler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop scheduling refreshes, running ones are finished.
+        """
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._pool.shutdown(wait=True)
+
+    def stats(self) -> dict:
+        """
+        Watched and warm users, refreshes running and overdue, and the age of the prefetched stats in seconds.
+        """
+        now = time.monotonic()
+        with self._lock:
+            ages = [now - entry["refreshed_at"] for entry in self._entries.values()]
+            overdue = sum(1 for due, key in self._due if due < now - REPORT_INTERVAL and key in self._watched)
+            return {
+                "watched": len(self._watched),
+                "warm": len(self._entries),
+                "running": len(self._running),
+                "overdue": overdue,
+                "max_staleness": round(max(ages, default=0.0), 1),
+                "mean_staleness": round(sum(ages) / len(ages), 1) if ages else 0.0,
+            }
+
+    def _schedule(self, key: str, delay: float):
+        with self._lock:
+            self._running.discard(key)
+            if key in self._watched:
+                heapq.heappush(self._due, (time.monotonic() + delay, key))
+        self._wake.set()
+
+    def _loop(self):
+        last_report = 0.0
+        while not self._stopped.is_set():
+            self._wake.clear()
+            now = time.monotonic()
+            with self._lock:
+                due = []
+                while self._due and self._due[0][0] <= now and len(self._running) < self.workers:
+                    _, key = heapq.heappop(self._due)
+                    if key in self._watched and key not in self._running:
+                        self._running.add(key)
+                        due.append(key)
+                if len(self._running) >= self.workers or not self._due:
+                    # Users may be overdue, but only a finished refresh frees a worker, and `_schedule` wakes us then
+                    next_due = now + REPORT_INTERVAL
+                else:
+                    next_due = self._due[0][0]
+            for key in due:
+                self._pool.submit(self.refresh, key)
+
+            if now - last_report >= REPORT_INTERVAL:
+                self._report()
+                last_report = now
+            self._wake.wait(min(max(next_due - now, 0.0), REPORT_INTERVAL))
+
+    def _report(self):
+        stats = self.stats()
+        metrics.gauge("github_agent_prefetch_watched", stats["watched"], help="Users on the prefetch watchlist")
+        metrics.gauge("github_agent_prefetch_warm", stats["warm"], help="Watched users with prefetched stats")
+        metrics.gauge("github_agent_prefetch_overdue", stats["overdue"], help="Watched users whose refresh is overdue")
+        metrics.gauge("github_agent_prefetch_max_staleness_seconds", stats["max_staleness"], help="Age of the oldest prefetched stats")
+        metrics.gauge("github_agent_prefetch_mean_staleness_seconds", stats["mean_staleness"], help="Average age of the prefetched stats")
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def start_prefetch(usernames=None):
+    """
+    Start the process wide scheduler for the given usernames, the configured watchlist by default.
+
+    Returns:
+        PrefetchScheduler: The running scheduler, None when the watchlist is empty.
+    """
+    global _scheduler
+    usernames = load_watchlist() if usernames is None else list(usernames)
+    with _scheduler_lock:
+        if _scheduler is None:
+            if not usernames:
+                return None
+            _scheduler = PrefetchScheduler(usernames).start()
+        else:
+            for username in usernames:
+                _scheduler.watch(username)
+    return _scheduler
+
+def get_scheduler():
+    """
+    The process wide scheduler, None if `start_prefetch` did not start one.
+    """
+    return _scheduler
+
+def prefetched(username: str):
+    """
+    The prefetched `ProfileStats` of a watched user, None if the user is not watched or not warm.
+    """
+    if _scheduler is None or not isinstance(username, str):
+        return None
+    entry = _scheduler.get(username)
+    if entry is None:
+        return None
+    metrics.inc("github_agent_prefetch_served_total", help="Tool calls answered from prefetched stats")
+    return entry["profile"]
+
+def serve_prefetched(field: str = None):
+    """
+    Decorator answering a stats tool with the rendered prefetched stats of a watched user.
+
+    Args:
+        field (str): The `ProfileStats` field the tool returns ("user",
+            "languages" or "contributions"), None for the whole profile.
+
+    Calls for users that are not warm, or whose `field` could not be fetched, run the tool as usual.
+    """
+    def warm(username, args, kwargs):
+        profile = None if args or kwargs else prefetched(username)
+        return profile if profile is None or field is None else getattr(profile, field)
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(username, *args, **kwargs):
+            stats = warm(username, args, kwargs)
+            if stats is not None:
+                return render(stats)
+            return function(username, *args, **kwargs)
+        return wrapper
+    return decorator
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Keep the stats of watched GitHub users warm in the shared cache.")
+    parser.add_argument("usernames", nargs="*", help="GitHub usernames")
+    parser.add_argument("-f", "--file", default=WATCHLIST_FILE, help="File with one username per line")
+    parser.add_argument("--workers", type=int, default=PREFETCH_WORKERS, help="Users refreshed at the same time")
+    args = parser.parse_args(argv)
+
+    usernames = load_watchlist(" ".join(args.usernames) or WATCHLIST, args.file)
+    if not usernames:
+        parser.error("no usernames given")
+
+    scheduler = PrefetchScheduler(usernames, workers=args.workers).start()
+    try:
+        while True:
+            time.sleep(REPORT_INTERVAL)
+            print(scheduler.stats(), flush=True)
+    except KeyboardInterrupt:
+        scheduler.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+Rendering of the stats models for their consumers.
+
+A renderer turns one model type into one output style. Built in are "llm",
+the "emoji key: value" lines the agent tools return, "markdown", the
+answer the fast path shows without any LLM call, and "vega_lite", the
+chart specs the Streamlit app draws. Other consumers register their own
+style:
+
+    @renderer("csv", UserStats)
+    def user_csv(stats: UserStats, **options):
+        return f"{stats.name},{stats.followers}"
+
+    render(load_user_stats("octocat"), "csv")
+"""
+from github_tools.models import UserStats, RepoLanguageStats, ContributionStats, ProfileStats
+from github_tools.encoding import encode_contribution_days
+from github_tools.util import format_duration, is_less_than_2_months_old, format_iso_date, format_date_ddmmyyyy
+
+# Languages listed in a profile, the rest is folded into "Other"
+PROFILE_TOP_LANGUAGES = 10
+
+# (style, model type) -> function(model, **options) -> rendered output
+_RENDERERS = {}
+
+def renderer(style: str, model_type: type):
+    """
+    Decorator registering a function as the `style` renderer of `model_type`, replacing any previous one.
+    """
+    def decorator(function):
+        _RENDERERS[(style, model_type)] = function
+        return function
+    return decorator
+
+def render(model, style: str = "llm", **options):
+    """
+    Render a stats model in the given style.
+
+    Args:
+        model: A `UserStats`, `RepoLanguageStats`, `ContributionStats` or `ProfileStats`.
+        style (str): A registered style, "llm" or "markdown" built in.
+        **options: Passed on to the renderer, e.g. `days_format` and `token_budget` for
+            contributions or `username` for a markdown profile. Renderers ignore the
+            options they do not use, so every style can be called the same way.
+
+    Raises:
+        ValueError: If no renderer is registered for the style and model type.
+    """
+    function = _RENDERERS.get((style, type(model)))
+    if function is None:
+        raise ValueError(f"No {style} renderer for {type(model).__name__}")
+    return function(model, **options)
+
+def user_lines(stats: UserStats) -> list:
+    """
+    One "emoji key: value" line per profile stat.
+    """
+    return [
+        f"👤 Name: {stats.name}",
+        f"📝 Bio: {stats.bio}",
+        f"📍 Location: {stats.location}",
+        f"📅 Created At: {stats.created_at}",
+        f"🖼️ Avatar URL: {stats.avatar_url}",
+        f"👥 Followers: {stats.followers}",
+        f"👤 Following: {stats.following}",
+        f"📦 Repositories: {stats.repositories}",
+        f"📝 Total Commits: {stats.commits}",
+        f"🔀 Total Pull Requests: {stats.pull_requests}",
+        f"🐛 Total Issues: {stats.issues}",
+        f"📅 Formatted Date: {format_iso_date(stats.created_at)}",
+        f"⏳ Joined Since: {format_duration(stats.created_at)}",
+        f"📆 GitHub Days: {stats.github_days}",
+        f"🕒 Less Than 2 Months Old: {is_less_than_2_months_old(stats.created_at)}",
+    ]
+
+def language_lines(stats: RepoLanguageStats) -> list:
+    """
+    One "language: percent%" line per language.
+    """
+    return [f"{language}: {percent}%" for language, percent in stats.percentages()]
+
+def top_languages_of(stats: RepoLanguageStats, top: int = PROFILE_TOP_LANGUAGES) -> list:
+    """
+    (language, percent) pairs of the `top` largest languages of `stats`, largest first, the rest summed up as "Other (n languages)".
+
+    All languages if `top` is None.
+    """
+    # The totals keep the order languages were first seen in
+    percentages = RepoLanguageStats(dict(sorted(stats.sizes.items(), key=lambda item: item[1], reverse=True))).percentages()
+    if top is None:
+        return percentages
+    largest, rest = percentages[:top], percentages[top:]
+    if rest:
+        largest.append((f"Other ({len(rest)} languages)", round(sum(percent for _, percent in rest), 2)))
+    return largest
+
+def contribution_lines(stats: ContributionStats, days_format: str = None, token_budget: int = None, days: bool = True) -> list:
+    """
+    One "emoji key: value" line per contribution stat, the contribution days
+    encoded as in `encode_contribution_days` unless `days` is False.
+    """
+    highest_date = None if stats.highest_date is None else format_date_ddmmyyyy(stats.highest_date.isoformat())
+    lines = [
+        f"🔢 Total Contributions: {stats.total}",
+        f"🌐 Public Contributions: {stats.public}",
+        f"🔒 Private Contributions: {stats.private}",
+        f"📈 Highest Contribution: {stats.highest} on {highest_date}",
+        f"📅 Today's Commits: {stats.today}",
+        f"🔥 Current Streak: {stats.current_streak} days",
+        f"🏆 Longest Streak: {stats.longest_streak} days",
+        f"📆 Active Days: {stats.active_days}",
+    ]
+    if days:
+        lines.append(f"📜 Contribution Days: {encode_contribution_days(stats.calendar, days_format, token_budget)}")
+    return lines
+
+def _indented(lines: list) -> str:
+    # The layout the tools always returned, one indented line per stat
+    return "\n" + "".join(f"        {line}\n" for line in lines) + "        "
+
+def _bullets(lines: list) -> str:
+    return "\n".join(f"- {line}" for line in lines)
+
+@renderer("llm", UserStats)
+def user_llm(stats: UserStats, **options) -> str:
+    return _indented(user_lines(stats))
+
+@renderer("llm", RepoLanguageStats)
+def languages_llm(stats: RepoLanguageStats, **options) -> str:
+    return "".join(f"\n{line}" for line in language_lines(stats))
+
+@renderer("llm", ContributionStats)
+def contributions_llm(stats: ContributionStats, days_format: str = None, token_budget: int = None, **options) -> str:
+    return _indented(contribution_lines(stats, days_format, token_budget))
+
+@renderer("llm", ProfileStats)
+def profile_llm(stats: ProfileStats, top_languages: int = PROFILE_TOP_LANGUAGES, **options) -> str:
+    """
+    One section per dataset with one "key: value" line per stat, the
+    `top_languages` largest languages and the rest as "Other".
+    """
+    # The raw creation timestamp repeats the formatted date
+    sections = ["[Profile]", *(line for line in user_lines(stats.user) if not line.startswith("📅 Created At"))]
+
+    if stats.languages is not None and stats.languages.sizes:
+        sections += ["[Languages]", *(f"{language}: {percent}%" for language, percent in top_languages_of(stats.languages, top_languages))]
+
+    if stats.contributions is not None:
+        sections += ["[Contributions, last 12 months]", *contribution_lines(stats.contributions)]
+    return "\n".join(sections)
+
+@renderer("markdown", UserStats)
+def user_markdown(stats: UserStats, **options) -> str:
+    return _bullets(user_lines(stats))
+
+@renderer("markdown", RepoLanguageStats)
+def languages_markdown(stats: RepoLanguageStats, **options) -> str:
+    return _bullets(language_lines(stats))
+
+@renderer("markdown", ContributionStats)
+def contributions_markdown(stats: ContributionStats, **options) -> str:
+    # The encoded contribution days are meant for the model, not for people
+    return _bullets(contribution_lines(stats, days=False))
+
+@renderer("markdown", ProfileStats)
+def profile_markdown(stats: ProfileStats, username: str = "", **options) -> str:
+    """
+    Markdown answer with a section per dataset, headed by a link to the GitHub profile of `username`.
+    """
+    sections = [f"## 📊 GitHub Stats for [{username}](https://github.com/{username})"]
+    sections.append(f"### 👤 Profile\n{user_markdown(stats.user)}")
+    if stats.languages is not None and stats.languages.sizes:
+        sections.append(f"### 💻 Languages\n{languages_markdown(stats.languages)}")
+    if stats.contributions is not None:
+        sections.append(f"### 📈 Contributions (last 12 months)\n{contributions_markdown(stats.contributions)}")
+    return "\n\n".join(sections)
+
+@renderer("vega_lite", RepoLanguageStats)
+def languages_vega_lite(stats: RepoLanguageStats, top_languages: int = PROFILE_TOP_LANGUAGES, **options) -> dict:
+    """
+    Vega-Lite spec of a bar chart of the `top_languages` largest languages and "Other", largest first, all languages if None.
+    """
+    return {
+        "data": {"values": [{"language": language, "percent": percent} for language, percent in top_languages_of(stats, top_languages)]},
+        "mark": {"type": "bar", "tooltip": True},
+        "encoding": {
+            "x": {"field": "percent", "type": "quantitative", "title": "% of code"},
+            "y": {"field": "language", "type": "nominal", "sort": "-x", "title": None},
+        },
+    }
+
+@renderer("vega_lite", ContributionStats)
+def contributions_vega_lite(stats: ContributionStats, **options) -> dict:
+    """
+    Vega-Lite spec of a heatmap of the contribution calendar, one column per week and one row per weekday like on GitHub.
+    """
+    calendar = stats.calendar
+    return {
+        "data": {"values": [{"date": calendar.date_at(i).isoformat(), "count": count} for i, count in enumerate(calendar.counts)]},
+        "mark": {"type": "rect", "tooltip": True},
+        "encoding": {
+            "x": {"field": "date", "timeUnit": "yearweek", "type": "ordinal", "title": None, "axis": {"format": "%b", "labelOverlap": True}},
+            "y": {"field": "date", "timeUnit": "day", "type": "ordinal", "title": None},
+            "color": {"field": "count", "type": "quantitative", "title": "Contributions", "scale": {"scheme": "greens", "domainMin": 0}},
+        },
+        "config": {"view": {"stroke": None}},
+    }
@@ -0,0 +1,261 @@
+import asyncio, os, sys, time
+from contextvars import copy_context
+from concurrent.futures import ThreadPoolExecutor
+from github_tools.client import post_query, apost_query
+from github_tools.cache import get_cache, cache_key, CACHE_TTLS
+from github_tools.fetch_data import (
+    RATE_LIMIT_SELECTION, LANGUAGE_CONNECTION_FRAGMENT, PAGINATION_WORKERS,
+    iter_repositories, aiter_repositories, _fetch_remaining_languages, _afetch_remaining_languages,
+)
+from github_tools.tracing import span
+from github_tools.singleflight import SingleFlight
+
+# Changed repositories whose languages are requested together, as aliased fields of one query
+LANGUAGE_BATCH_SIZE = int(os.getenv("GITHUB_LANGUAGE_BATCH_SIZE", "50"))
+
+# Repository names and push times only, the cheap part of a refresh
+REPO_LIST_QUERY = """
+query($login: String!, $after: String) {
+    user(login: $login) {
+        repositories(first: 100, after: $after, ownerAffiliations: OWNER, isFork: false) {
+            totalCount
+            pageInfo {
+                hasNextPage
+                endCursor
+            }
+            nodes {
+                name
+                pushedAt
+                updatedAt
+            }
+        }
+    }""" + RATE_LIMIT_SELECTION + """
+}
+"""
+
+REPO_LANGUAGE_FRAGMENT = """
+fragment RepoLanguageFields on Repository {
+    languages(first: 100, orderBy: {field: SIZE, direction: DESC}) {
+        ...LanguageConnectionFields
+    }
+}
+""" + LANGUAGE_CONNECTION_FRAGMENT
+
+# Refreshes in flight, keyed by username, sync and async callers apart like `fetch_data._profile_key`
+_refreshes = SingleFlight("repo_languages")
+
+def build_language_query(count: int) -> str:
+    """
+    Build one GraphQL query for the languages of `count` repositories of a user.
+
+    Args:
+        count (int): Number of repositories, aliased as `r0`, `r1`, ...
+
+    Returns:
+        str: The query text, taking the owner as `$login` and the repository names as `$n0`, `$n1`, ...
+    """
+    parameters = "".join(f", $n{i}: String!" for i in range(count))
+    repositories = "\n    ".join(f"r{i}: repository(owner: $login, name: $n{i}) {{ ...RepoLanguageFields }}" for i in range(count))
+    return f"""
+query($login: String!{parameters}) {{
+    {repositories}{RATE_LIMIT_SELECTION}
+}}
+{REPO_LANGUAGE_FRAGMENT}"""
+
+def repo_language_totals(username: str, max_age: float = CACHE_TTLS["repo"]) -> dict:
+    """
+    Bytes per language across the repositories of a user, maintained incrementally.
+
+    The languages of every repository are stored with its `pushedAt` (or
+    `updatedAt` for a repository without pushes) next to the summed totals.
+    The first call walks all repositories with `iter_repositories`. Once the
+    stored totals are older than `max_age`, a refresh only lists the
+    repositories with their push times, requests the languages of the ones
+    that were pushed, created or renamed since, and moves the difference into
+    the totals. Deleted repositories are subtracted.
+
+    Args:
+        username (str): GitHub username.
+        max_age (float): Seconds the stored totals are returned without checking for pushes.
+
+    Returns:
+        dict: Language name -> bytes, ordered as they were first seen.
+
+    Raises:
+        KeyError: If the response does not contain the user's repositories.
+        requests.exceptions.RequestException: If a request fails.
+    """
+    return _refreshes.do(("sync", username.lower(), max_age), _refresh, username, max_age)
+
+async def arepo_language_totals(username: str, max_age: float = CACHE_TTLS["repo"]) -> dict:
+    """
+    Async version of `repo_language_totals`.
+
+    Raises:
+        KeyError: If the response does not contain the user's repositories.
+        httpx.HTTPError: If a request fails.
+    """
+    return await _refreshes.ado(("async", username.lower(), max_age), _arefresh, username, max_age)
+
+def stored_language_totals(username: str):
+    """
+    The language totals `repo_language_totals` stored last, however old, without sending any request.
+
+    Returns:
+        dict: Language name -> bytes, None if the repositories of the user were never walked.
+    """
+    state = get_cache().get(_state_key(username))
+    return None if state is None else state["totals"]
+
+def _state_key(username: str) -> str:
+    return cache_key(REPO_LIST_QUERY, username, "languages")
+
+def _refresh(username: str, max_age: float) -> dict:
+    state = get_cache().get(_state_key(username))
+    if state is not None and time.time() - state["checked_at"] < max_age:
+        return state["totals"]
+
+    if state is None:
+        with span("fetch", operation="repo_languages", cache_misses=1):
+            state = _build_state(iter_repositories(username))
+    else:
+        listing = _list_repositories(username)
+        changed = _changed(state, listing)
+        with span("fetch", operation="repo_languages", cache_misses=len(changed)), \
+                ThreadPoolExecutor(max_workers=PAGINATION_WORKERS) as pool:
+            batches = [changed[i:i + LANGUAGE_BATCH_SIZE] for i in range(0, len(changed), LANGUAGE_BATCH_SIZE)]
+            futures = [pool.submit(copy_context().run, _fetch_languages, username, batch) for batch in batches]
+            languages = {}
+            for future in futures:
+                languages.update(future.result())
+        state = _fold(state, listing, languages)
+
+    get_cache().set(_state_key(username), state, None)
+    return state["totals"]
+
+async def _arefresh(username: str, max_age: float) -> dict:
+    state = get_cache().get(_state_key(username))
+    if state is not None and time.time() - state["checked_at"] < max_age:
+        return state["totals"]
+
+    if state is None:
+        with span("fetch", operation="repo_languages", cache_misses=1):
+            state = _build_state([repo async for repo in aiter_repositories(username)])
+    else:
+        listing = await _alist_repositories(username)
+        changed = _changed(state, listing)
+        with span("fetch", operation="repo_languages", cache_misses=len(changed)):
+            languages = {}
+            for result in await asyncio.gather(*(
+                _afetch_languages(username, changed[i:i + LANGUAGE_BATCH_SIZE])
+                for i in range(0, len(changed), LANGUAGE_BATCH_SIZE)
+            )):
+                languages.update(result)
+        state = _fold(state, listing, languages)
+
+    get_cache().set(_state_key(username), state, None)
+    return state["totals"]
+
+def _version(repo: dict) -> str:
+    return repo.get("pushedAt") or repo.get("updatedAt")
+
+def _sizes(languages: dict) -> dict:
+    # A handful of language names repeat across all repositories, store them once
+    return {sys.intern(edge['node']['name']): edge['size'] for edge in languages['edges']}
+
+def _build_state(repositories) -> dict:
+    """
+    Stored state of a complete walk over the repositories.
+
+    `repos` maps each name to [version, {language: bytes}], `totals` holds their sum.
+    """
+    repos, totals = {}, {}
+    for repo in repositories:
+        sizes = _sizes(repo['languages'])
+        repos[repo['name']] = [_version(repo), sizes]
+        _add(totals, sizes, 1)
+    return {"repos": repos, "totals": totals, "checked_at": time.time()}
+
+def _changed(state: dict, listing: dict) -> list:
+    """
+    Names of the listed repositories that are new or were pushed since they were stored.
+    """
+    repos = state["repos"]
+    return [name for name, version in listing.items() if name not in repos or repos[name][0] != version]
+
+def _fold(state: dict, listing: dict, languages: dict) -> dict:
+    """
+    New state with the refreshed repositories replaced and the unlisted ones removed.
+
+    The stored state is shared through the cache, so it is copied rather than updated in place.
+    """
+    repos, totals = dict(state["repos"]), dict(state["totals"])
+    for name in [name for name in repos if name not in listing or listing[name] != repos[name][0]]:
+        _add(totals, repos.pop(name)[1], -1)
+    for name, sizes in languages.items():
+        # A repository deleted between the listing and the language query stays out until the next refresh
+        if sizes is not None:
+            repos[name] = [listing[name], sizes]
+            _add(totals, sizes, 1)
+    return {"repos": repos, "totals": totals, "checked_at": time.time()}
+
+def _add(totals: dict, sizes: dict, sign: int):
+    for name, size in sizes.items():
+        total = totals.get(name, 0) + sign * size
+        if total > 0:
+            totals[name] = total
+        else:
+            totals.pop(name, None)
+
+def _list_repositories(username: str) -> dict:
+    """
+    Name -> version of every repository of a user.
+    """
+    listing, after = {}, None
+    while True:
+        data = post_query(REPO_LIST_QUERY, {"login": username, "after": after}, "repo_list")
+        connection = data['data']['user']['repositories']
+        listing.update((repo['name'], _version(repo)) for repo in connection['nodes'])
+        if not connection['pageInfo']['hasNextPage']:
+            return listing
+        after = connection['pageInfo']['endCursor']
+
+async def _alist_repositories(username: str) -> dict:
+    listing, after = {}, None
+    while True:
+        data = await apost_query(REPO_LIST_QUERY, {"login": username, "after": after}, "repo_list")
+        connection = data['data']['user']['repositories']
+        listing.update((repo['name'], _version(repo)) for repo in connection['nodes'])
+        if not connection['pageInfo']['hasNextPage']:
+            return listing
+        after = connection['pageInfo']['endCursor']
+
+def _language_variables(username: str, names: list) -> dict:
+    return {"login": username, **{f"n{i}": name for i, name in enumerate(names)}}
+
+def _fetch_languages(username: str, names: list) -> dict:
+    """
+    Name -> {language: bytes} of the given repositories, None for one that no longer exists.
+    """
+    data = post_query(build_language_query(len(names)), _language_variables(username, names), "repo_languages")
+    languages = {}
+    for i, name in enumerate(names):
+        repo = data['data'].get(f"r{i}")
+        if repo is None:
+            languages[name] = None
+            continue
+        edges = repo['languages']['edges'] + _fetch_remaining_languages(username, {"name": name, **repo})
+        languages[name] = _sizes({"edges": edges})
+    return languages
+
+async def _afetch_languages(username: str, names: list) -> dict:
+    data = await apost_query(build_language_query(len(names)), _language_variables(username, names), "repo_languages")
+    languages = {}
+    for i, name in enumerate(names):
+        repo = data['data'].get(f"r{i}")
+        if repo is None:
+            languages[name] = None
+            continue
+        edges = repo['languages']['edges'] + await _afetch_remaining_languages(username, {"name": name, **repo})
+        languages[name] = _sizes({"edges": edges})
+    return languages
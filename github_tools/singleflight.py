@@ -0,0 +1,89 @@
+import asyncio, threading
+from concurrent.futures import Future
+from github_tools.tracing import metrics
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one execution.
+
+    The first caller of a key runs the call; everyone asking for the same key
+    while it is in flight waits for that call and receives its result (or its
+    exception) instead of running it again. Waiters can be threads (`do`) or
+    coroutines on any event loop (`ado`), since the result is handed over
+    through a `concurrent.futures.Future`. Once the call finishes the key is
+    released, so later calls run again (or hit the cache).
+
+    Results are shared between all waiters and must not be mutated.
+
+    Args:
+        name (str): Label of the coalesced calls counter.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, function, *args, **kwargs):
+        """
+        Run `function(*args, **kwargs)` unless a call with `key` is already in flight, then wait for that one.
+
+        Returns:
+            The result of the call.
+
+        Raises:
+            Whatever the call raised.
+        """
+        future, leader = self._join(key)
+        if not leader:
+            return future.result()
+        try:
+            result = function(*args, **kwargs)
+        except BaseException as e:
+            self._settle(key, future, error=e)
+            raise
+        self._settle(key, future, result)
+        return result
+
+    async def ado(self, key, function, *args, **kwargs):
+        """
+        Async version of `do` for a coroutine function.
+
+        The call runs as its own task, so cancelling one waiter does not cancel it for the others.
+        """
+        future, leader = self._join(key)
+        if leader:
+            task = asyncio.ensure_future(function(*args, **kwargs))
+            task.add_done_callback(lambda task: self._settle_task(key, future, task))
+        return await asyncio.shield(asyncio.wrap_future(future))
+
+    def in_flight(self) -> int:
+        """
+        Number of keys with a call running.
+        """
+        with self._lock:
+            return len(self._calls)
+
+    def _join(self, key):
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                metrics.inc("github_agent_coalesced_calls_total", help="Calls that waited for an identical call in flight", flight=self.name)
+                return future, False
+            future = self._calls[key] = Future()
+            return future, True
+
+    def _settle(self, key, future: Future, result=None, error: BaseException = None):
+        # Release the key first, callers arriving after this start a new call
+        with self._lock:
+            self._calls.pop(key, None)
+        if error is None:
+            future.set_result(result)
+        else:
+            future.set_exception(error)
+
+    def _settle_task(self, key, future: Future, task: asyncio.Future):
+        if task.cancelled():
+            self._settle(key, future, error=asyncio.CancelledError())
+        else:
+            self._settle(key, future, task.result() if task.exception() is None else None, task.exception())
@@ -0,0 +1,283 @@
+import time, threading, functools, inspect
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Buckets of the duration histograms, in seconds
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+# Numeric span attributes that are levels rather than amounts, summaries keep the lowest
+LEVEL_ATTRIBUTES = {"rate_limit_remaining"}
+
+class Span:
+    """
+    One timed stage of a request, such as a GraphQL call, a tool invocation or a model call.
+
+    Attributes:
+        name (str): Stage name, e.g. "github.graphql", "tool" or "llm".
+        attributes (dict): Details such as the tool name, bytes transferred, query cost or tokens.
+        start (float): `time.perf_counter()` when the span started.
+        duration (float): Seconds the span took, None while it is running.
+    """
+    __slots__ = ("name", "attributes", "start", "duration")
+
+    def __init__(self, name: str, attributes: dict):
+        self.name = name
+        self.attributes = attributes
+        self.start = time.perf_counter()
+        self.duration = None
+
+    def set(self, **attributes):
+        """
+        Add attributes to the span, e.g. once the response size is known.
+        """
+        self.attributes.update(attributes)
+
+class Trace:
+    """
+    Spans recorded while handling one request, see `start_trace`.
+
+    Args:
+        parent (Trace): Enclosing trace, which receives every span as well.
+    """
+
+    def __init__(self, parent: "Trace" = None):
+        self.spans = []
+        self.start = time.perf_counter()
+        self.parent = parent
+        self._lock = threading.Lock()
+
+    def add(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+        if self.parent is not None:
+            self.parent.add(span)
+
+    def summary(self) -> list:
+        """
+        Total time, count and summed numeric attributes per stage, slowest stage first.
+        """
+        stages = {}
+        with self._lock:
+            spans = list(self.spans)
+        for span in spans:
+            stage = stages.setdefault(span.name, {"stage": span.name, "count": 0, "seconds": 0.0})
+            stage["count"] += 1
+            stage["seconds"] += span.duration or 0.0
+            for key, value in span.attributes.items():
+                if not isinstance(value, (int, float)) or isinstance(value, bool):
+                    continue
+                if key in LEVEL_ATTRIBUTES:
+                    stage[key] = min(stage.get(key, value), value)
+                else:
+                    stage[key] = stage.get(key, 0) + value
+        return sorted(stages.values(), key=lambda stage: stage["seconds"], reverse=True)
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+_current_trace = ContextVar("github_agent_trace", default=None)
+
+@contextmanager
+def start_trace():
+    """
+    Collect the spans of everything run inside the `with` block (and the threads
+    started from it with a copied context) into a new `Trace`. Spans still reach
+    the trace of an enclosing `start_trace` too.
+    """
+    trace = Trace(_current_trace.get())
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+def current_trace():
+    """
+    The trace of the running request, None outside of `start_trace`.
+    """
+    return _current_trace.get()
+
+class MetricsRegistry:
+    """
+    In-process counters, gauges and histograms, rendered in the Prometheus text format.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._help = {}
+
+    def inc(self, name: str, value: float = 1, help: str = None, **labels):
+        """
+        Add `value` to the counter `name` with the given labels.
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            if help:
+                self._help.setdefault(name, help)
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def gauge(self, name: str, value: float, help: str = None, **labels):
+        """
+        Set the gauge `name` with the given labels to `value`.
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            if help:
+                self._help.setdefault(name, help)
+            self._gauges[key] = value
+
+    def observe(self, name: str, value: float, help: str = None, **labels):
+        """
+        Record `value` in the histogram `name` with the given labels.
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            if help:
+                self._help.setdefault(name, help)
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * len(DURATION_BUCKETS), 0, 0.0]
+            buckets, _, _ = histogram
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if value <= bound:
+                    buckets[i] += 1
+            histogram[1] += 1
+            histogram[2] += value
+
+    def snapshot(self) -> dict:
+        """
+        Counter and gauge values and histogram count/sum keyed by "name{labels}".
+        """
+        with self._lock:
+            values = {_series(name, labels): value for (name, labels), value in self._counters.items()}
+            values.update({_series(name, labels): value for (name, labels), value in self._gauges.items()})
+            for (name, labels), (_, count, total) in self._histograms.items():
+                values[_series(f"{name}_count", labels)] = count
+                values[_series(f"{name}_sum", labels)] = total
+        return values
+
+    def render(self) -> str:
+        """
+        All metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        with self._lock:
+            for kind, values in (("counter", self._counters), ("gauge", self._gauges)):
+                for name in sorted({name for name, _ in values}):
+                    lines.append(f"# HELP {name} {self._help.get(name, name)}")
+                    lines.append(f"# TYPE {name} {kind}")
+                    for (series, labels), value in sorted(values.items()):
+                        if series == name:
+                            lines.append(f"{_series(name, labels)} {value}")
+            for name in sorted({name for name, _ in self._histograms}):
+                lines.append(f"# HELP {name} {self._help.get(name, name)}")
+                lines.append(f"# TYPE {name} histogram")
+                for (series, labels), (buckets, count, total) in sorted(self._histograms.items()):
+                    if series != name:
+                        continue
+                    for bound, bucket in zip(DURATION_BUCKETS, buckets):
+                        lines.append(f"{_series(f'{name}_bucket', labels + (('le', str(bound)),))} {bucket}")
+                    lines.append(f"{_series(f'{name}_bucket', labels + (('le', '+Inf'),))} {count}")
+                    lines.append(f"{_series(f'{name}_count', labels)} {count}")
+                    lines.append(f"{_series(f'{name}_sum', labels)} {total}")
+        return "\n".join(lines) + "\n"
+
+def _series(name: str, labels: tuple) -> str:
+    if not labels:
+        return name
+    rendered = ",".join(f'{key}="{str(value)}"' for key, value in labels)
+    return f"{name}{{{rendered}}}"
+
+metrics = MetricsRegistry()
+
+# Numeric span attributes that are also exported as counters
+COUNTED_ATTRIBUTES = {
+    "bytes": ("github_agent_bytes_total", "Response bytes received from GitHub"),
+    "graphql_cost": ("github_agent_graphql_cost_total", "GitHub GraphQL rate limit points spent"),
+    "prompt_tokens": ("github_agent_prompt_tokens_total", "Prompt tokens sent to the model"),
+    "completion_tokens": ("github_agent_completion_tokens_total", "Completion tokens generated by the model"),
+}
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Time a stage of the current request.
+
+    The duration goes into the `github_agent_stage_seconds` histogram, counted
+    attributes (bytes, GraphQL cost, tokens) into their counters, and the span
+    into the current trace when there is one.
+
+    Args:
+        name (str): Stage name, e.g. "github.graphql", "tool" or "llm".
+        **attributes: Details of the span, the `tool`, `operation` and `model` ones become labels.
+
+    Yields:
+        Span: The running span, to add attributes with `Span.set`.
+    """
+    current = Span(name, attributes)
+    try:
+        yield current
+    finally:
+        current.duration = time.perf_counter() - current.start
+        labels = {key: current.attributes[key] for key in ("tool", "operation", "model") if key in current.attributes}
+        metrics.observe("github_agent_stage_seconds", current.duration, help="Time spent per request stage", stage=name, **labels)
+        for attribute, (counter, description) in COUNTED_ATTRIBUTES.items():
+            value = current.attributes.get(attribute)
+            if value:
+                metrics.inc(counter, value, help=description, stage=name, **labels)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add(current)
+
+def traced(name: str, label: str = "operation", arguments=()):
+    """
+    Decorator recording every call of the decorated function as a `name` span,
+    labelled with the function name under `label`.
+
+    The wrapper keeps the signature and docstring, so agno builds the same tool schema.
+
+    Args:
+        name (str): Stage name of the spans.
+        label (str): Attribute holding the function name.
+        arguments (tuple): Names of call arguments to record as span attributes, e.g. ("username",).
+    """
+    def decorator(function):
+        base = {label: function.__name__}
+        signature = inspect.signature(function)
+        recorded = [argument for argument in arguments if argument in signature.parameters]
+
+        def attributes(args, kwargs):
+            if not recorded:
+                return base
+            bound = signature.bind_partial(*args, **kwargs).arguments
+            return dict(base, **{argument: bound[argument] for argument in recorded if argument in bound})
+
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                with span(name, **attributes(args, kwargs)):
+                    return await function(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name, **attributes(args, kwargs)):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def traced_tool(function):
+    """
+    Decorator recording every call of an agent tool as a "tool" span with the
+    `username` it was called for, see `traced`.
+    """
+    return traced("tool", label="tool", arguments=("username",))(function)
+
+def render_metrics() -> str:
+    """
+    Prometheus text of the process wide metrics.
+    """
+    return metrics.render()
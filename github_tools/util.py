@@ -70,19 +70,23 @@ def is_less_than_2_months_old(iso_date:str) -> bool:
     two_months_ago = datetime.now() - relativedelta(months=2)
     return created_date > two_months_ago
 
-def get_language_distribution(language_data:dict):
+def get_language_distribution(language_data, lang_dist:dict=None):
     """
     Calculate the distribution of programming languages based on the provided language data.
     Args:
-        language_data (dict): A dictionary where keys are repository names and values are lists of dictionaries.
+        language_data (dict or iterable): A dictionary where keys are repository names and values are lists of dictionaries,
+                                or an iterable of (repository name, list) pairs, which is consumed one repository at a time.
                                 Each dictionary in the list represents a programming language and its size in the repository.
+        lang_dist (dict): Running totals to add to, a new dictionary is used when omitted.
     Returns:
         dict: A dictionary where keys are programming language names and values are the total size of each language
                 across all repositories.
     """
 
-    lang_dist = {}
-    for repo, language in language_data.items():
+    if lang_dist is None:
+        lang_dist = {}
+    items = language_data.items() if isinstance(language_data, dict) else language_data
+    for repo, language in items:
         for lang in language:
             for lang_name, size in lang.items():
                 if lang_name not in lang_dist:
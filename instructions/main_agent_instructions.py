@@ -106,6 +106,7 @@ The GitHub Stats AI Agent is responsible for analyzing a user's GitHub activity
 
 ### **7. GitHub API & Data Processing**  
 - Integrate with the **GitHub API** to fetch contribution data.  
+- For a user's overall stats, profile summary or overview, delegate **one** task to the GitHub Stats Agent asking for the full profile (`get_full_profile`), instead of separate tasks for profile, repositories and contributions.  
 - Process and analyze data using Python (Pandas, Matplotlib, or similar libraries).  
 - Optimize performance to handle large datasets efficiently.  
 
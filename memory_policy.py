@@ -0,0 +1,122 @@
+"""
+Conversation memory with a token budget.
+
+`BoundedMemory` is a drop-in `AgentMemory` for the agents in `github_agent.py`.
+The most recent runs go back into the prompt verbatim. Tool outputs of older
+runs are replaced by a few summary lines plus a note that the tool can be
+called again (its data is cached), and whole runs are dropped, oldest first,
+once the history would exceed the budget. Prompt size therefore stays flat
+however long a session gets.
+"""
+import os
+from typing import List, Optional, Tuple
+from agno.memory.agent import AgentMemory, AgentRun
+from agno.models.message import Message
+from github_tools.encoding import estimate_tokens
+
+# Defaults, each agent can override them in `github_agent.py`
+HISTORY_TOKEN_BUDGET = int(os.getenv("AGENT_HISTORY_TOKEN_BUDGET", "2000"))
+VERBATIM_RUNS = int(os.getenv("AGENT_HISTORY_VERBATIM_RUNS", "1"))
+# Runs kept in memory at all, older ones are forgotten
+MAX_STORED_RUNS = 50
+
+# Summary of an old tool output: its first lines, skipping long encoded ones like the contribution days
+SUMMARY_LINES = 8
+SUMMARY_LINE_CHARS = 160
+
+def summarize_tool_output(message: Message) -> str:
+    """
+    Compact replacement of a tool result that left the verbatim window.
+
+    Args:
+        message (Message): A `tool` role message.
+
+    Returns:
+        str: The first `SUMMARY_LINES` short lines of the output and a reference to the call that produced it.
+    """
+    content = message.get_content_string() or ""
+    lines = [line.strip() for line in content.splitlines() if line.strip()]
+    kept = [line for line in lines if len(line) <= SUMMARY_LINE_CHARS][:SUMMARY_LINES]
+    arguments = ", ".join(f"{key}={value!r}" for key, value in (message.tool_args or {}).items())
+    reference = f"{message.tool_name or 'the tool'}({arguments})"
+    omitted = len(lines) - len(kept)
+    note = f"[summarized from an earlier turn, {omitted} lines omitted; call {reference} again for the full, cached data]"
+    return "\n".join(kept + [note])
+
+def remember_turn(agent, prompt: str, answer: str):
+    """
+    Record a turn answered without running `agent`, e.g. from the answer cache
+    or the fast path, as a run of it, so follow-up questions see it in the chat history.
+
+    Args:
+        agent: The agent team of the session.
+        prompt (str): The user's message.
+        answer (str): The answer shown to the user.
+    """
+    from agno.run.response import RunResponse
+
+    question = Message(role="user", content=prompt)
+    reply = Message(role="assistant", content=answer)
+    agent.memory.add_run(AgentRun(message=question, response=RunResponse(content=answer, messages=[question, reply])))
+
+class BoundedMemory(AgentMemory):
+    """
+    `AgentMemory` whose history never exceeds `token_budget` estimated tokens.
+
+    Attributes:
+        token_budget (int): Tokens the history messages of a run may take.
+        verbatim_runs (int): Most recent runs whose tool outputs are kept unchanged.
+    """
+    token_budget: int = HISTORY_TOKEN_BUDGET
+    verbatim_runs: int = VERBATIM_RUNS
+
+    def add_run(self, agent_run: AgentRun) -> None:
+        super().add_run(agent_run)
+        if len(self.runs) > MAX_STORED_RUNS:
+            self.runs = self.runs[-MAX_STORED_RUNS:]
+
+    def get_messages_from_last_n_runs(self, last_n: Optional[int] = None, skip_role: Optional[str] = None) -> List[Message]:
+        """
+        Messages of the last `last_n` runs, compacted to fit the token budget.
+        """
+        runs = self.runs if last_n is None else self.runs[-last_n:]
+        per_run = []
+        for age, run in enumerate(reversed(runs)):
+            if not (run.response and run.response.messages):
+                continue
+            messages = [
+                message for message in run.response.messages
+                if not (skip_role and message.role == skip_role) and not message.from_history
+            ]
+            if age >= self.verbatim_runs:
+                messages = [self._compact(message) for message in messages]
+            per_run.append(messages)
+
+        # Newest runs first, whole runs only so tool calls keep their results
+        history, used = [], 0
+        for messages in per_run:
+            tokens = sum(estimate_tokens(message.get_content_string() or "") for message in messages)
+            if history and used + tokens > self.token_budget:
+                break
+            history.insert(0, messages)
+            used += tokens
+        return [message for messages in history for message in messages]
+
+    def get_message_pairs(self, user_role: str = "user", assistant_role: Optional[List[str]] = None) -> List[Tuple[Message, Message]]:
+        """
+        The most recent (user message, answer) pairs that fit the token budget, oldest first.
+        """
+        pairs = super().get_message_pairs(user_role, assistant_role)
+        kept, used = [], 0
+        for user_message, answer in reversed(pairs):
+            tokens = estimate_tokens(user_message.get_content_string() or "") + estimate_tokens(answer.get_content_string() or "")
+            if kept and used + tokens > self.token_budget:
+                break
+            kept.insert(0, (user_message, answer))
+            used += tokens
+        return kept
+
+    def _compact(self, message: Message) -> Message:
+        if message.role != "tool":
+            return message
+        return message.model_copy(update={"content": summarize_tool_output(message)})
@@ -0,0 +1,311 @@
+"""
+Serving layer for the agent team.
+
+Every chat session gets its own agent team from a `SessionPool`, so sessions
+never share chat history. Turns are scheduled on a background event loop:
+at most `max_concurrency` run at once, one at a time per session, and at most
+`max_queue` wait for a slot. Past that `submit` raises `ServerBusy` instead of
+letting the wait grow without bound. Queue depth, turns in flight and live
+sessions are exported as gauges next to the tracing metrics. With an
+`answer_cache.AnswerCache`, repeated questions are answered from it while
+the GitHub data they were built from is unchanged.
+
+    server = get_server()
+    for chunk in server.submit(session_id, "Show me the stats of octocat"):
+        print(chunk.content)
+"""
+import asyncio, os, queue, threading, time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from functools import lru_cache, partial
+from uuid import uuid4
+from github_tools.tracing import metrics
+
+MAX_CONCURRENT_TURNS = int(os.getenv("AGENT_MAX_CONCURRENT_TURNS", "8"))
+MAX_QUEUED_TURNS = int(os.getenv("AGENT_MAX_QUEUED_TURNS", "32"))
+MAX_SESSIONS = int(os.getenv("AGENT_MAX_SESSIONS", "64"))
+
+class ServerBusy(Exception):
+    """
+    Raised by `AgentServer.submit` when the queue of waiting turns is full.
+    """
+
+class SessionPool:
+    """
+    One agent per session, the least recently used idle ones are recycled.
+
+    The pool never holds more than `max_sessions` agents: when all of them
+    are running a turn, `acquire` for a new session waits until one is released.
+
+    Args:
+        factory (callable): Builds a new agent team.
+        max_sessions (int): Sessions kept before idle agents are reset and reused for new sessions.
+    """
+
+    def __init__(self, factory, max_sessions: int = MAX_SESSIONS):
+        self.factory = factory
+        self.max_sessions = max(1, max_sessions)
+        self._agents = OrderedDict()
+        self._busy = set()
+        self._free = []
+        self._building = 0
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+
+    def __len__(self):
+        return len(self._agents)
+
+    def acquire(self, session_id: str):
+        """
+        The agent of `session_id`, recycled or built on its first turn. Call `release` when the turn is done.
+        """
+        with self._lock:
+            self._busy.add(session_id)
+            agent = self._agents.pop(session_id, None)
+            while agent is None:
+                self._evict()
+                if self._free:
+                    agent = self._free.pop()
+                elif len(self._agents) + self._building < self.max_sessions:
+                    break
+                else:
+                    # Every agent is running a turn, wait for one of them to finish
+                    self._released.wait()
+            if agent is not None:
+                self._agents[session_id] = agent
+                return agent
+            self._building += 1
+
+        # Building an agent team takes a while, do not hold up the other sessions
+        try:
+            agent = self.factory()
+        except BaseException:
+            with self._lock:
+                self._building -= 1
+                self._released.notify_all()
+            raise
+        with self._lock:
+            self._building -= 1
+            self._agents[session_id] = agent
+        return agent
+
+    def release(self, session_id: str):
+        with self._lock:
+            self._busy.discard(session_id)
+            self._released.notify_all()
+
+    def _evict(self):
+        while len(self._agents) >= self.max_sessions:
+            idle = next((session_id for session_id in self._agents if session_id not in self._busy), None)
+            if idle is None:
+                return
+            agent = self._agents.pop(idle)
+            for member in [agent, *(agent.team or [])]:
+                # Not `Agent.new_session`, it also drops the model's tool functions
+                member.memory.clear()
+                member.session_id = str(uuid4())
+            self._free.append(agent)
+
+class Turn:
+    """
+    The run response chunks of one submitted turn, iterable from sync and async code.
+
+    Errors raised by the agent are re-raised by the iteration.
+    """
+    _DONE = object()
+
+    def __init__(self, session_id: str, prompt: str, run_kwargs: dict):
+        self.session_id = session_id
+        self.prompt = prompt
+        self.run_kwargs = run_kwargs
+        self.submitted = time.perf_counter()
+        self._events = queue.Queue()
+
+    def put(self, item):
+        self._events.put(item)
+
+    def finish(self):
+        self._events.put(self._DONE)
+
+    def __iter__(self):
+        while True:
+            item = self._events.get()
+            if item is self._DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+    async def __aiter__(self):
+        while True:
+            item = await asyncio.to_thread(self._events.get)
+            if item is self._DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+class AgentServer:
+    """
+    Runs agent turns for many sessions with bounded concurrency and a bounded queue.
+
+    agno runs tools and team members synchronously, so each turn executes
+    `agent.run(stream=True)` on one of `max_concurrency` worker threads; the
+    scheduling around it (queueing, per-session ordering, slots) happens on a
+    background event loop.
+
+    Args:
+        factory (callable): Builds a new agent team for a session.
+        max_concurrency (int): Turns running at the same time.
+        max_queue (int): Turns waiting for a slot before `submit` raises `ServerBusy`.
+        max_sessions (int): See `SessionPool`.
+        answer_cache (AnswerCache): Cache of answers in front of the agents, None to always run them.
+    """
+
+    def __init__(self, factory, max_concurrency: int = MAX_CONCURRENT_TURNS, max_queue: int = MAX_QUEUED_TURNS, max_sessions: int = MAX_SESSIONS,
+                 answer_cache=None):
+        self.pool = SessionPool(factory, max_sessions)
+        self.answer_cache = answer_cache
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="agent-turn")
+        self._loop = asyncio.new_event_loop()
+        self._slots = asyncio.Semaphore(max_concurrency)
+        # Session -> [lock, turns holding or waiting for it], only touched on the loop
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._in_flight = 0
+        threading.Thread(target=self._loop.run_forever, name="agent-server", daemon=True).start()
+
+    def submit(self, session_id: str, prompt: str, **run_kwargs) -> Turn:
+        """
+        Queue a turn of `session_id`.
+
+        The turn runs in a copy of the caller's context, so its spans land in
+        the caller's trace (see `github_tools.tracing.start_trace`).
+
+        Args:
+            session_id (str): Chat session, turns of one session run one after another.
+            prompt (str): The user's message.
+            **run_kwargs: Passed to `agent.run`, e.g. `stream_intermediate_steps=True`.
+
+        Returns:
+            Turn: Iterate it for the streamed run response chunks.
+
+        Raises:
+            ServerBusy: If `max_queue` turns are already waiting.
+        """
+        with self._lock:
+            if self._queued >= self.max_queue:
+                metrics.inc("github_agent_rejected_turns_total", help="Turns rejected because the queue was full")
+                raise ServerBusy(f"{self._queued} turns are already waiting, try again shortly")
+            self._queued += 1
+        self._report()
+
+        turn = Turn(session_id, prompt, run_kwargs)
+        asyncio.run_coroutine_threadsafe(self._run(turn, copy_context()), self._loop)
+        return turn
+
+    def remember(self, session_id: str, prompt: str, answer: str):
+        """
+        Add a turn answered without the agents, e.g. by the fast path, to the chat history of `session_id`.
+
+        It is recorded in order with the turns of the session, so a follow-up
+        submitted right after sees it. It takes no slot.
+
+        Returns:
+            concurrent.futures.Future: Done once the turn is recorded.
+        """
+        return asyncio.run_coroutine_threadsafe(self._remember(session_id, prompt, answer), self._loop)
+
+    def stats(self) -> dict:
+        """
+        Turns waiting and running, live sessions and the limits.
+        """
+        with self._lock:
+            return {
+                "queued": self._queued,
+                "in_flight": self._in_flight,
+                "sessions": len(self.pool),
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+            }
+
+    async def _run(self, turn: Turn, context):
+        session = self._sessions.setdefault(turn.session_id, [asyncio.Lock(), 0])
+        session[1] += 1
+        try:
+            async with session[0], self._slots:
+                with self._lock:
+                    self._queued -= 1
+                    self._in_flight += 1
+                self._report()
+                metrics.observe("github_agent_queue_wait_seconds", time.perf_counter() - turn.submitted, help="Time turns waited for a slot")
+                try:
+                    await self._loop.run_in_executor(self._executor, context.run, self._execute, turn)
+                finally:
+                    with self._lock:
+                        self._in_flight -= 1
+                    self._report()
+        finally:
+            session[1] -= 1
+            if not session[1]:
+                del self._sessions[turn.session_id]
+
+    async def _remember(self, session_id: str, prompt: str, answer: str):
+        from memory_policy import remember_turn
+
+        def record():
+            agent = self.pool.acquire(session_id)
+            try:
+                remember_turn(agent, prompt, answer)
+            finally:
+                self.pool.release(session_id)
+
+        session = self._sessions.setdefault(session_id, [asyncio.Lock(), 0])
+        session[1] += 1
+        try:
+            async with session[0]:
+                # The first turn of a session builds its agent team
+                await self._loop.run_in_executor(self._executor, record)
+        finally:
+            session[1] -= 1
+            if not session[1]:
+                del self._sessions[session_id]
+
+    def _execute(self, turn: Turn):
+        agent = self.pool.acquire(turn.session_id)
+        try:
+            if self.answer_cache is None:
+                chunks = agent.run(turn.prompt, stream=True, **turn.run_kwargs)
+            else:
+                chunks = self.answer_cache.run(agent, turn.prompt, **turn.run_kwargs)
+            for chunk in chunks:
+                turn.put(chunk)
+        except Exception as e:
+            turn.put(e)
+        finally:
+            self.pool.release(turn.session_id)
+            turn.finish()
+
+    def _report(self):
+        stats = self.stats()
+        metrics.gauge("github_agent_queued_turns", stats["queued"], help="Turns waiting for a slot")
+        metrics.gauge("github_agent_in_flight_turns", stats["in_flight"], help="Turns running")
+        metrics.gauge("github_agent_sessions", stats["sessions"], help="Sessions with an agent in the pool")
+
+@lru_cache(maxsize=None)
+def get_server(charts: bool = False) -> AgentServer:
+    """
+    The process wide server, building one agent team per session with
+    `github_agent.build_main_agent`, in front of the process wide answer cache.
+
+    Args:
+        charts (bool): The UI draws the contribution and language charts, so
+            the agents answer with a short narrative, see `charts.py`.
+    """
+    from github_agent import build_main_agent
+    from answer_cache import get_answer_cache
+    return AgentServer(partial(build_main_agent, charts=charts), answer_cache=get_answer_cache())